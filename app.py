@@ -1,6 +1,6 @@
 """
 Main entry point for Resume Relevance System
-- JSON-based storage instead of SQLAlchemy
+- JSON-based storage instead of SQLAlchemy (or stdlib sqlite3, see STORAGE_BACKEND)
 - Loads config from config.py (DevelopmentConfig / ProductionConfig)
 - Registers all route blueprints
 - Handles global errors gracefully
@@ -27,6 +27,40 @@ if env == "production":
 else:
     app.config.from_object("config.DevelopmentConfig")
 
+# start-up side effects (migrations, background threads) only where the app
+# serves: a job worker spawned from `python app.py` re-imports this file as
+# __mp_main__ and must not run them again
+SERVING = __name__ != "__mp_main__"
+
+# storage backend (json / sqlite) selected by config
+from utils import storage
+storage.configure(app.config)
+# move any inline parsed_text left from older versions into the blob store
+if SERVING:
+    storage.migrate_texts_to_blobs()
+
+# embedding backend (in-process model or shared model server), warmed up in
+# the background so the first request doesn't pay for loading it
+import threading
+from utils import embedding
+embedding.configure(app.config)
+if SERVING and app.config.get("EMBEDDING_WARMUP"):
+    threading.Thread(target=embedding.warm_up, name="embedding-warmup", daemon=True).start()
+
+# background bulk-evaluation jobs, run by `python -m utils.jobs`; with
+# JOBS_IN_WEB the dispatcher runs here instead (and resumes jobs left
+# behind by a recycled worker)
+from utils import jobs
+jobs.configure(app.config)
+if SERVING and app.config.get("JOBS_IN_WEB"):
+    jobs.start()
+
+# rescoring of evaluations whose resume / JD changed (+ any left stale by a restart)
+from utils import reevaluation
+reevaluation.configure(app.config)
+if SERVING:
+    reevaluation.start()
+
 # --------------------------
 # REGISTER ROUTES (BLUEPRINTS)
 # --------------------------
@@ -70,6 +104,15 @@ def index():
         ]
     }), 200
 
+# --------------------------
+# READINESS (embedding model warmed up)
+# --------------------------
+@app.route("/ready", methods=["GET"])
+def ready():
+    if embedding.is_ready():
+        return jsonify({"status": "success", "ready": True}), 200
+    return jsonify({"status": "error", "ready": False, "message": "embedding model is warming up"}), 503
+
 # --------------------------
 # GLOBAL ERROR HANDLERS
 # --------------------------
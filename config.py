@@ -26,6 +26,37 @@ class Config:
     os.makedirs(TEMPLATES_DIR, exist_ok=True)
     os.makedirs(STATIC_DIR, exist_ok=True)
 
+    # Storage backend: "json" (per-entity files + journals) or "sqlite" (stdlib sqlite3, WAL)
+    STORAGE_BACKEND = os.environ.get("STORAGE_BACKEND", "json").lower()
+    SQLITE_DB_FILE = os.environ.get("SQLITE_DB_FILE", os.path.join(INSTANCE_DIR, "db.sqlite3"))
+    # json backend: split resumes / jds / evaluations into N per-tenant shards
+    STORAGE_SHARDS = int(os.environ.get("STORAGE_SHARDS", 1))
+
+    # Embeddings: socket of a shared model server (python -m utils.embedding_server),
+    # unset = each worker loads its own model; warm the model up at startup
+    EMBEDDING_SERVER_SOCKET = os.environ.get("EMBEDDING_SERVER_SOCKET")
+    EMBEDDING_SERVER_TIMEOUT = float(os.environ.get("EMBEDDING_SERVER_TIMEOUT", 30))
+    EMBEDDING_WARMUP = os.environ.get("EMBEDDING_WARMUP", "1") == "1"
+    # micro-batching of concurrent encodes: collect for up to N ms or M texts
+    EMBEDDING_BATCH_WINDOW_MS = float(os.environ.get("EMBEDDING_BATCH_WINDOW_MS", 5))
+    EMBEDDING_MAX_BATCH = int(os.environ.get("EMBEDDING_MAX_BATCH", 64))
+
+    # Background bulk-evaluation jobs (utils/jobs.py): worker processes per job,
+    # resumes per task, evaluations per storage commit. Jobs are run by
+    # `python -m utils.jobs` next to the web server (submitting answers 503
+    # while none runs); JOBS_IN_WEB=1 runs the dispatcher inside the web
+    # process instead (single-process setups)
+    JOB_WORKERS = int(os.environ.get("JOB_WORKERS", 2))
+    JOB_CHUNK_SIZE = int(os.environ.get("JOB_CHUNK_SIZE", 256))
+    JOB_BATCH_SIZE = int(os.environ.get("JOB_BATCH_SIZE", 500))
+    JOBS_IN_WEB = os.environ.get("JOBS_IN_WEB", "0") == "1"
+    # finished jobs (and their result ids) are deleted after this many days (0 = kept)
+    JOB_RETENTION_DAYS = int(os.environ.get("JOB_RETENTION_DAYS", 7))
+
+    # Re-evaluation after a resume / JD is replaced: edits of one document
+    # within this many seconds are rescored together (0 = rescore at once)
+    REEVALUATION_DEBOUNCE_SECONDS = float(os.environ.get("REEVALUATION_DEBOUNCE_SECONDS", 2))
+
     # Logging
     LOGGING_LEVEL = os.environ.get("LOGGING_LEVEL", "INFO")
 
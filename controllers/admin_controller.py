@@ -3,8 +3,13 @@ from flask import jsonify, current_app
 from werkzeug.utils import secure_filename
 
 from models import Admin, JD, User
-from utils.storage import load_data, save_data
+from utils.storage import (
+    get_record, find_by, count, count_by, next_id,
+    append_to, delete_record, transaction, ConflictError,
+)
 from utils.jd_parser import extract_text_from_jd
+from utils.evaluator import profile_fields
+from utils.pagination import paginate
 
 
 # --------------------------
@@ -19,23 +24,25 @@ def register_admin(data):
         if not email:
             return jsonify({"status": "error", "message": "email is required"}), 400
 
-        db = load_data()
-        if any(a["email"] == email for a in db["admins"]):
-            return jsonify({"status": "error", "message": "admin already exists"}), 409
+        with transaction() as tx:
+            if tx.find_by("admins", "email", email):
+                return jsonify({"status": "error", "message": "admin already exists"}), 409
 
-        new_admin = Admin(
-            id=len(db["admins"]) + 1,
-            name=name,
-            email=email,
-            password=password,
-            created_at=datetime.datetime.utcnow().isoformat()
-        )
+            new_admin = Admin(
+                id=tx.next_id("admins"),
+                name=name,
+                email=email,
+                password=password,
+                created_at=datetime.datetime.utcnow().isoformat()
+            )
 
-        db["admins"].append(new_admin.to_dict())
-        save_data(db)
+            tx.append_to("admins", new_admin.to_dict())
 
         return jsonify({"status": "success", "data": new_admin.to_dict()}), 201
 
+    except (ValueError, ConflictError):
+        # another request registered the same email meanwhile
+        return jsonify({"status": "error", "message": "admin already exists"}), 409
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)}), 500
 
@@ -45,8 +52,7 @@ def register_admin(data):
 # --------------------------
 def login_admin(email, password):
     try:
-        db = load_data()
-        admin = next((a for a in db["admins"] if a["email"] == email and a["password"] == password), None)
+        admin = next((a for a in find_by("admins", "email", email) if a["password"] == password), None)
         if not admin:
             return jsonify({"status": "error", "message": "invalid credentials"}), 401
         return jsonify({"status": "success", "message": "login successful", "data": admin}), 200
@@ -62,10 +68,10 @@ def logout_admin():
 # --------------------------
 # list all admins
 # --------------------------
-def get_all_admins():
+def get_all_admins(limit=None, after=None, fields=None):
     try:
-        db = load_data()
-        return jsonify({"status": "success", "data": db["admins"]}), 200
+        page = paginate("admins", limit, after, fields)
+        return jsonify({"status": "success", **page}), 200
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)}), 500
 
@@ -75,8 +81,7 @@ def get_all_admins():
 # --------------------------
 def get_admin(admin_id: int):
     try:
-        db = load_data()
-        admin = next((a for a in db["admins"] if a["id"] == admin_id), None)
+        admin = get_record("admins", admin_id)
         if not admin:
             return jsonify({"status": "error", "message": "admin not found"}), 404
         return jsonify({"status": "success", "data": admin}), 200
@@ -89,23 +94,24 @@ def get_admin(admin_id: int):
 # --------------------------
 def update_admin_profile(admin_id: int, data: dict):
     try:
-        db = load_data()
-        admin = next((a for a in db["admins"] if a["id"] == admin_id), None)
-        if not admin:
-            return jsonify({"status": "error", "message": "admin not found"}), 404
-
-        admin["name"] = data.get("name", admin["name"])
-        admin["email"] = data.get("email", admin["email"])
-        admin["password"] = data.get("password", admin["password"])
-
-        for i, a in enumerate(db["admins"]):
-            if a["id"] == admin_id:
-                db["admins"][i] = admin
-                break
-
-        save_data(db)
+        with transaction() as tx:
+            admin = tx.get_record("admins", admin_id)
+            if not admin:
+                return jsonify({"status": "error", "message": "admin not found"}), 404
+
+            changes = {
+                "name": data.get("name", admin["name"]),
+                "email": data.get("email", admin["email"]),
+                "password": data.get("password", admin["password"]),
+            }
+            admin = {**admin, **changes}
+            tx.update_record("admins", admin_id, changes)
         return jsonify({"status": "success", "data": admin}), 200
 
+    except ValueError:
+        return jsonify({"status": "error", "message": "email already exists"}), 409
+    except ConflictError:
+        return jsonify({"status": "error", "message": "admin changed meanwhile, retry"}), 409
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)}), 500
 
@@ -115,15 +121,11 @@ def update_admin_profile(admin_id: int, data: dict):
 # --------------------------
 def delete_admin(admin_id: int):
     try:
-        db = load_data()
-        before = len(db["admins"])
-        db["admins"] = [a for a in db["admins"] if a["id"] != admin_id]
-        after = len(db["admins"])
-
-        save_data(db)
-        if before == after:
+        if not get_record("admins", admin_id):
             return jsonify({"status": "error", "message": "admin not found"}), 404
 
+        delete_record("admins", admin_id)
+
         return jsonify({"status": "success", "message": f"admin {admin_id} deleted"}), 200
 
     except Exception as e:
@@ -135,9 +137,8 @@ def delete_admin(admin_id: int):
 # --------------------------
 def get_admin_dashboard(admin_id: int):
     try:
-        db = load_data()
-        jd_count = sum(1 for jd in db["jds"] if jd["admin_id"] == admin_id)
-        user_count = len(db["users"])
+        jd_count = count_by("jds", "admin_id", admin_id)
+        user_count = count("users")
 
         return jsonify({
             "status": "success",
@@ -154,10 +155,10 @@ def get_admin_dashboard(admin_id: int):
 # --------------------------
 # super-admin: list all users
 # --------------------------
-def get_all_users():
+def get_all_users(limit=None, after=None, fields=None):
     try:
-        db = load_data()
-        return jsonify({"status": "success", "data": db["users"]}), 200
+        page = paginate("users", limit, after, fields)
+        return jsonify({"status": "success", **page}), 200
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)}), 500
 
@@ -184,9 +185,8 @@ def upload_jd(admin_id: int, file):
 
         parsed_text = extract_text_from_jd(raw_bytes, filename)
 
-        db = load_data()
         jd = JD(
-            id=len(db["jds"]) + 1,
+            id=next_id("jds"),
             admin_id=admin_id,
             filename=newname,
             file_path=path,
@@ -196,8 +196,7 @@ def upload_jd(admin_id: int, file):
             uploaded_at=datetime.datetime.utcnow().isoformat()
         )
 
-        db["jds"].append(jd.to_dict())
-        save_data(db)
+        append_to("jds", {**jd.to_dict(), **profile_fields(parsed_text)})
 
         return jsonify({"status": "success", "data": jd.to_dict()}), 201
 
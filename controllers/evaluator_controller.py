@@ -1,8 +1,22 @@
 import datetime, json
 from flask import jsonify
 from models import Evaluation, Resume, JD
-from utils.evaluator import evaluate_texts
-from utils.storage import load_data, save_data
+from utils.evaluator import evaluate_batch, evaluate_records, load_profile, load_profiles
+from utils.storage import (
+    get_record, find_by, delete_record, transaction, iter_records, ConflictError,
+)
+from utils.pagination import paginate, project
+from utils.streaming import stream_records
+from utils.similarity import get_engine
+from utils.ann_index import get_resume_index
+from utils import jobs
+
+
+# --------------------------
+# helper: decode stored evaluation (copy - the db image is shared)
+# --------------------------
+def _decode(ev: dict) -> dict:
+    return {**ev, "missing_skills": json.loads(ev.get("missing_skills", "[]"))}
 
 
 # --------------------------
@@ -10,36 +24,40 @@ from utils.storage import load_data, save_data
 # --------------------------
 async def evaluate_resume_against_jd(resume_id: int, jd_id: int):
     try:
-        db = load_data()
-        resume = next((r for r in db["resumes"] if r["id"] == resume_id), None)
-        jd = next((j for j in db["jds"] if j["id"] == jd_id), None)
+        with transaction() as tx:
+            resume = tx.get_record("resumes", resume_id)
+            jd = tx.get_record("jds", jd_id)
 
-        if not resume:
-            return jsonify({"status": "error", "message": "resume not found"}), 404
-        if not jd:
-            return jsonify({"status": "error", "message": "job description not found"}), 404
+            if not resume:
+                return jsonify({"status": "error", "message": "resume not found"}), 404
+            if not jd:
+                return jsonify({"status": "error", "message": "job description not found"}), 404
 
-        # prevent duplicate
-        existing = next((e for e in db["evaluations"] if e["resume_id"] == resume_id and e["jd_id"] == jd_id), None)
-        if existing:
-            return jsonify({"status": "error", "message": "evaluation already exists"}), 409
+            # prevent duplicate
+            if tx.find_evaluation(resume_id, jd_id):
+                return jsonify({"status": "error", "message": "evaluation already exists"}), 409
 
-        score, verdict, missing = evaluate_texts(resume.get("parsed_text", ""), jd.get("parsed_text", ""))
+            score, verdict, missing = evaluate_records(resume, jd)
 
-        evaluation = Evaluation(
-            id=len(db["evaluations"]) + 1,
-            resume_id=resume_id,
-            jd_id=jd_id,
-            score=score,
-            verdict=verdict,
-            missing_skills=json.dumps(missing),
-            created_at=datetime.datetime.utcnow().isoformat(),
-        )
+            evaluation = Evaluation(
+                id=tx.next_id("evaluations"),
+                resume_id=resume_id,
+                jd_id=jd_id,
+                score=score,
+                verdict=verdict,
+                missing_skills=json.dumps(missing),
+                created_at=datetime.datetime.utcnow().isoformat(),
+            )
 
-        db["evaluations"].append(evaluation.to_dict())
-        save_data(db)
+            tx.append_to("evaluations", evaluation.to_dict())
 
         return jsonify({"status": "success", "data": evaluation.to_dict()}), 201
+    except ValueError:
+        # another request stored the same pair while we were scoring
+        return jsonify({"status": "error", "message": "evaluation already exists"}), 409
+    except ConflictError:
+        # something read above was changed by another request before the commit
+        return jsonify({"status": "error", "message": "records changed meanwhile, retry"}), 409
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)}), 500
 
@@ -49,12 +67,10 @@ async def evaluate_resume_against_jd(resume_id: int, jd_id: int):
 # --------------------------
 async def get_evaluation(evaluation_id: int):
     try:
-        db = load_data()
-        ev = next((e for e in db["evaluations"] if e["id"] == evaluation_id), None)
+        ev = get_record("evaluations", evaluation_id)
         if not ev:
             return jsonify({"status": "error", "message": "evaluation not found"}), 404
-        ev["missing_skills"] = json.loads(ev.get("missing_skills", "[]"))
-        return jsonify({"status": "success", "data": ev}), 200
+        return jsonify({"status": "success", "data": _decode(ev)}), 200
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)}), 500
 
@@ -62,13 +78,12 @@ async def get_evaluation(evaluation_id: int):
 # --------------------------
 # 3. get all evaluations
 # --------------------------
-async def get_all_evaluations():
+async def get_all_evaluations(limit=None, after=None, fields=None, stream=None):
     try:
-        db = load_data()
-        data = db["evaluations"]
-        for ev in data:
-            ev["missing_skills"] = json.loads(ev.get("missing_skills", "[]"))
-        return jsonify({"status": "success", "data": data}), 200
+        if stream:
+            return stream_records("evaluations", stream, fields=fields, decode=_decode)
+        page = paginate("evaluations", limit, after, fields, decode=_decode)
+        return jsonify({"status": "success", **page}), 200
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)}), 500
 
@@ -76,16 +91,15 @@ async def get_all_evaluations():
 # --------------------------
 # 4. get evaluations by user
 # --------------------------
-async def get_evaluations_by_user(user_id: int):
+async def get_evaluations_by_user(user_id: int, limit=None, after=None, fields=None, stream=None):
     try:
-        db = load_data()
-        resumes = [r["id"] for r in db["resumes"] if r["user_id"] == user_id]
-        evals = [e for e in db["evaluations"] if e["resume_id"] in resumes]
-        if not evals:
+        resumes = [r["id"] for r in find_by("resumes", "user_id", user_id)]
+        if stream:
+            return stream_records("evaluations", stream, "resume_id", resumes, fields, decode=_decode)
+        page = paginate("evaluations", limit, after, fields, "resume_id", resumes, decode=_decode)
+        if not page["data"] and after is None:
             return jsonify({"status": "error", "message": "no evaluations for this user"}), 404
-        for ev in evals:
-            ev["missing_skills"] = json.loads(ev.get("missing_skills", "[]"))
-        return jsonify({"status": "success", "data": evals}), 200
+        return jsonify({"status": "success", **page}), 200
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)}), 500
 
@@ -93,16 +107,15 @@ async def get_evaluations_by_user(user_id: int):
 # --------------------------
 # 5. get evaluations by admin
 # --------------------------
-async def get_evaluations_by_admin(admin_id: int):
+async def get_evaluations_by_admin(admin_id: int, limit=None, after=None, fields=None, stream=None):
     try:
-        db = load_data()
-        jds = [j["id"] for j in db["jds"] if j["admin_id"] == admin_id]
-        evals = [e for e in db["evaluations"] if e["jd_id"] in jds]
-        if not evals:
+        jds = [j["id"] for j in find_by("jds", "admin_id", admin_id)]
+        if stream:
+            return stream_records("evaluations", stream, "jd_id", jds, fields, decode=_decode)
+        page = paginate("evaluations", limit, after, fields, "jd_id", jds, decode=_decode)
+        if not page["data"] and after is None:
             return jsonify({"status": "error", "message": "no evaluations for this admin"}), 404
-        for ev in evals:
-            ev["missing_skills"] = json.loads(ev.get("missing_skills", "[]"))
-        return jsonify({"status": "success", "data": evals}), 200
+        return jsonify({"status": "success", **page}), 200
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)}), 500
 
@@ -112,23 +125,21 @@ async def get_evaluations_by_admin(admin_id: int):
 # --------------------------
 async def update_evaluation(evaluation_id: int, data: dict):
     try:
-        db = load_data()
-        ev = next((e for e in db["evaluations"] if e["id"] == evaluation_id), None)
-        if not ev:
-            return jsonify({"status": "error", "message": "evaluation not found"}), 404
-
-        if "score" in data: ev["score"] = int(data["score"])
-        if "verdict" in data: ev["verdict"] = data["verdict"]
-        if "missing_skills" in data: ev["missing_skills"] = json.dumps(data["missing_skills"])
-
-        for i, e in enumerate(db["evaluations"]):
-            if e["id"] == evaluation_id:
-                db["evaluations"][i] = ev
-                break
-
-        save_data(db)
-        ev["missing_skills"] = json.loads(ev.get("missing_skills", "[]"))
-        return jsonify({"status": "success", "data": ev}), 200
+        with transaction() as tx:
+            ev = tx.get_record("evaluations", evaluation_id)
+            if not ev:
+                return jsonify({"status": "error", "message": "evaluation not found"}), 404
+
+            changes = {}
+            if "score" in data: changes["score"] = int(data["score"])
+            if "verdict" in data: changes["verdict"] = data["verdict"]
+            if "missing_skills" in data: changes["missing_skills"] = json.dumps(data["missing_skills"])
+
+            tx.update_record("evaluations", evaluation_id, changes)
+        return jsonify({"status": "success", "data": _decode({**ev, **changes})}), 200
+    except ConflictError:
+        # something read above was changed by another request before the commit
+        return jsonify({"status": "error", "message": "records changed meanwhile, retry"}), 409
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)}), 500
 
@@ -138,12 +149,9 @@ async def update_evaluation(evaluation_id: int, data: dict):
 # --------------------------
 async def delete_evaluation(evaluation_id: int):
     try:
-        db = load_data()
-        before = len(db["evaluations"])
-        db["evaluations"] = [e for e in db["evaluations"] if e["id"] != evaluation_id]
-        save_data(db)
-        if len(db["evaluations"]) == before:
+        if not get_record("evaluations", evaluation_id):
             return jsonify({"status": "error", "message": "evaluation not found"}), 404
+        delete_record("evaluations", evaluation_id)
         return jsonify({"status": "success", "message": f"evaluation {evaluation_id} deleted"}), 200
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)}), 500
@@ -154,52 +162,55 @@ async def delete_evaluation(evaluation_id: int):
 # --------------------------
 async def compare_multiple_resumes_to_jd(user_id: int, jd_id: int):
     try:
-        db = load_data()
-        resumes = [r for r in db["resumes"] if r["user_id"] == user_id]
-        jd = next((j for j in db["jds"] if j["id"] == jd_id), None)
+        resumes = find_by("resumes", "user_id", user_id)
+        jd = get_record("jds", jd_id)
         if not resumes:
             return jsonify({"status": "error", "message": "no resumes found"}), 404
         if not jd:
             return jsonify({"status": "error", "message": "job description not found"}), 404
 
         results = []
-        for r in resumes:
-            score, verdict, missing = evaluate_texts(r.get("parsed_text", ""), jd.get("parsed_text", ""))
-            exists = next((e for e in db["evaluations"] if e["resume_id"] == r["id"] and e["jd_id"] == jd_id), None)
-            if exists:
-                continue
-            evaluation = Evaluation(
-                id=len(db["evaluations"]) + 1,
-                resume_id=r["id"],
-                jd_id=jd_id,
-                score=score,
-                verdict=verdict,
-                missing_skills=json.dumps(missing),
-                created_at=datetime.datetime.utcnow().isoformat(),
-            )
-            db["evaluations"].append(evaluation.to_dict())
-            results.append(evaluation.to_dict())
+        # all new evaluations are committed as one batch
+        with transaction() as tx:
+            pending = [r for r in resumes if not tx.find_evaluation(r["id"], jd_id)]
+            # shared jd profiled once, resumes embedded + scored in one batch
+            scored = evaluate_batch(load_profiles(pending), load_profile(jd))
+            for r, (score, verdict, missing) in zip(pending, scored):
+                evaluation = Evaluation(
+                    id=tx.next_id("evaluations"),
+                    resume_id=r["id"],
+                    jd_id=jd_id,
+                    score=score,
+                    verdict=verdict,
+                    missing_skills=json.dumps(missing),
+                    created_at=datetime.datetime.utcnow().isoformat(),
+                )
+                tx.append_to("evaluations", evaluation.to_dict())
+                results.append(evaluation.to_dict())
 
-        save_data(db)
         return jsonify({"status": "success", "data": results}), 201
+    except ValueError:
+        return jsonify({"status": "error", "message": "evaluation already exists"}), 409
+    except ConflictError:
+        # something read above was changed by another request before the commit
+        return jsonify({"status": "error", "message": "records changed meanwhile, retry"}), 409
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)}), 500
 
 
 
 # Add this function to evaluator_controller.py
-async def get_evaluations_by_admin_jds(admin_id: int):
+async def get_evaluations_by_admin_jds(admin_id: int, limit=None, after=None, fields=None, stream=None):
     """Get evaluations for all JDs owned by an admin"""
     try:
-        db = load_data()
         # Get all JDs for this admin
-        admin_jds = [j["id"] for j in db["jds"] if j["admin_id"] == admin_id]
+        admin_jds = [j["id"] for j in find_by("jds", "admin_id", admin_id)]
+        if stream:
+            return stream_records("evaluations", stream, "jd_id", admin_jds, fields, decode=_decode)
         # Get evaluations for these JDs
-        evals = [e for e in db["evaluations"] if e["jd_id"] in admin_jds]
-        
-        for ev in evals:
-            ev["missing_skills"] = json.loads(ev.get("missing_skills", "[]"))
-        return jsonify({"status": "success", "data": evals}), 200
+        page = paginate("evaluations", limit, after, fields, "jd_id", admin_jds, decode=_decode)
+
+        return jsonify({"status": "success", **page}), 200
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)}), 500
 
@@ -209,9 +220,8 @@ async def get_evaluations_by_admin_jds(admin_id: int):
 # --------------------------
 async def compare_multiple_jds_to_resume(resume_id: int, admin_id: int):
     try:
-        db = load_data()
-        resume = next((r for r in db["resumes"] if r["id"] == resume_id), None)
-        jds = [j for j in db["jds"] if j["admin_id"] == admin_id]
+        resume = get_record("resumes", resume_id)
+        jds = find_by("jds", "admin_id", admin_id)
 
         if not resume:
             return jsonify({"status": "error", "message": "resume not found"}), 404
@@ -219,24 +229,169 @@ async def compare_multiple_jds_to_resume(resume_id: int, admin_id: int):
             return jsonify({"status": "error", "message": "no job descriptions found"}), 404
 
         results = []
-        for jd in jds:
-            score, verdict, missing = evaluate_texts(resume.get("parsed_text", ""), jd.get("parsed_text", ""))
-            exists = next((e for e in db["evaluations"] if e["resume_id"] == resume_id and e["jd_id"] == jd["id"]), None)
-            if exists:
-                continue
-            evaluation = Evaluation(
-                id=len(db["evaluations"]) + 1,
-                resume_id=resume_id,
-                jd_id=jd["id"],
-                score=score,
-                verdict=verdict,
-                missing_skills=json.dumps(missing),
-                created_at=datetime.datetime.utcnow().isoformat(),
-            )
-            db["evaluations"].append(evaluation.to_dict())
-            results.append(evaluation.to_dict())
+        # all new evaluations are committed as one batch
+        with transaction() as tx:
+            pending = [jd for jd in jds if not tx.find_evaluation(resume_id, jd["id"])]
+            # shared resume profiled once, jds embedded + scored in one batch
+            scored = evaluate_batch(load_profile(resume), load_profiles(pending))
+            for jd, (score, verdict, missing) in zip(pending, scored):
+                evaluation = Evaluation(
+                    id=tx.next_id("evaluations"),
+                    resume_id=resume_id,
+                    jd_id=jd["id"],
+                    score=score,
+                    verdict=verdict,
+                    missing_skills=json.dumps(missing),
+                    created_at=datetime.datetime.utcnow().isoformat(),
+                )
+                tx.append_to("evaluations", evaluation.to_dict())
+                results.append(evaluation.to_dict())
 
-        save_data(db)
         return jsonify({"status": "success", "data": results}), 201
+    except ValueError:
+        return jsonify({"status": "error", "message": "evaluation already exists"}), 409
+    except ConflictError:
+        # something read above was changed by another request before the commit
+        return jsonify({"status": "error", "message": "records changed meanwhile, retry"}), 409
+    except Exception as e:
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+
+# --------------------------
+# 10. jd x resume similarity matrix
+# --------------------------
+async def get_similarity_matrix(admin_id: int, resume_ids=None, user_id=None, jd_ids=None, min_score=None):
+    """
+    Scores of every JD owned by the admin against the candidate resumes
+    (all resumes, or the given resume_ids / one user's), in one matmul.
+    min_score drops resumes whose best score is below it.
+    """
+    try:
+        jds = find_by("jds", "admin_id", admin_id)
+        if jd_ids is not None:
+            wanted = set(jd_ids)
+            jds = [j for j in jds if j["id"] in wanted]
+        if not jds:
+            return jsonify({"status": "error", "message": "no job descriptions found"}), 404
+
+        if resume_ids is not None:
+            resumes = [r for r in (get_record("resumes", i) for i in dict.fromkeys(resume_ids)) if r]
+        elif user_id is not None:
+            resumes = find_by("resumes", "user_id", user_id)
+        else:
+            resumes = list(iter_records("resumes"))
+
+        scores = get_engine().score_matrix(jds, resumes)
+        if min_score is not None and resumes:
+            keep = scores.max(axis=0) >= min_score
+            resumes = [r for r, k in zip(resumes, keep) if k]
+            scores = scores[:, keep]
+
+        return jsonify({
+            "status": "success",
+            "data": {
+                "jds": [{"id": j["id"], "title": j.get("title")} for j in jds],
+                "resumes": [{"id": r["id"], "user_id": r["user_id"], "filename": r.get("filename")} for r in resumes],
+                "scores": scores.tolist(),
+            },
+        }), 200
+    except Exception as e:
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+
+# --------------------------
+# 11. top-k candidate resumes for a jd
+# --------------------------
+async def get_top_resumes_for_jd(jd_id: int, k: int = 50, nprobe: int = None):
+    """
+    The k resumes closest to the JD by embedding, from the ANN index
+    (no evaluations are created). Scores use the evaluation scale.
+    """
+    try:
+        jd = get_record("jds", jd_id)
+        if not jd:
+            return jsonify({"status": "error", "message": "job description not found"}), 404
+        k = max(1, min(k or 50, 500))
+
+        hits = get_resume_index().search(load_profile(jd).embedding, k, nprobe)
+        data = []
+        for rid, sim in hits:
+            resume = get_record("resumes", rid)
+            if resume:
+                data.append({
+                    "resume_id": rid,
+                    "user_id": resume["user_id"],
+                    "filename": resume.get("filename"),
+                    "score": int(sim * 100),
+                })
+        return jsonify({"status": "success", "jd_id": jd_id, "data": data}), 200
+    except Exception as e:
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+
+# --------------------------
+# 12. background bulk evaluation jobs
+# --------------------------
+def _job_view(job: dict) -> dict:
+    total = job.get("total")
+    return {**job, "progress": round(job["done"] / total, 4) if total else (1.0 if total == 0 else 0.0)}
+
+
+async def submit_evaluation_job(data: dict):
+    """
+    Queue a bulk evaluation (see utils/jobs.py): JDs of admin_id (or all),
+    narrowed to jd_ids, against resumes of user_id (or all), narrowed to
+    resume_ids. Returns 202 with the job; poll its status / results.
+    """
+    try:
+        scope = {}
+        for key in ("admin_id", "user_id"):
+            if data.get(key) is not None:
+                scope[key] = int(data[key])
+        for key in ("jd_ids", "resume_ids"):
+            if data.get(key) is not None:
+                if not isinstance(data[key], list):
+                    return jsonify({"status": "error", "message": f"{key} must be a list"}), 400
+                scope[key] = [int(v) for v in data[key]]
+
+        if "admin_id" in scope and not get_record("admins", scope["admin_id"]):
+            return jsonify({"status": "error", "message": "admin not found"}), 404
+        if "user_id" in scope and not get_record("users", scope["user_id"]):
+            return jsonify({"status": "error", "message": "user not found"}), 404
+
+        job = jobs.submit(scope)
+        return jsonify({"status": "success", "data": _job_view(job)}), 202
+    except jobs.NoDispatcherError as e:
+        return jsonify({"status": "error", "message": str(e)}), 503
+    except (TypeError, ValueError):
+        return jsonify({"status": "error", "message": "ids must be integers"}), 400
+    except Exception as e:
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+
+async def get_evaluation_job(job_id: str):
+    try:
+        job = jobs.get_job(job_id)
+        if not job:
+            return jsonify({"status": "error", "message": "job not found"}), 404
+        return jsonify({"status": "success", "data": _job_view(job)}), 200
+    except Exception as e:
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+
+async def get_evaluation_job_results(job_id: str, limit=None, after=None, fields=None):
+    """Evaluations created by a job so far (paged by evaluation id)"""
+    try:
+        job = jobs.get_job(job_id)
+        if not job:
+            return jsonify({"status": "error", "message": "job not found"}), 404
+        ids, next_cursor = jobs.job_results(job_id, after, limit)
+        rows = [ev for ev in (get_record("evaluations", i) for i in ids) if ev]
+        return jsonify({
+            "status": "success",
+            "job_status": job["status"],
+            "data": [project(_decode(ev), fields) for ev in rows],
+            "next_cursor": next_cursor,
+        }), 200
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)}), 500
@@ -3,7 +3,13 @@ from flask import jsonify, current_app
 from werkzeug.utils import secure_filename
 from models import JD
 from utils.jd_parser import extract_text_from_jd
-from utils.storage import load_data, save_data
+from utils.evaluator import profile_fields
+from utils.blob_store import text_hash
+from utils.reevaluation import document_changed
+from utils.pagination import paginate, project
+from utils.storage import (
+    get_record, find_by, next_id, append_to, delete_record, load_text, with_text, transaction, ConflictError,
+)
 
 
 # --------------------------
@@ -35,9 +41,8 @@ async def upload_jd(admin_id: int, file):
         parsed_text = extract_text_from_jd(raw_bytes, filename)
 
         # save in JSON
-        db = load_data()
         jd = JD(
-            id=len(db["jds"]) + 1,
+            id=next_id("jds"),
             admin_id=admin_id,
             filename=newname,
             file_path=path,
@@ -45,8 +50,8 @@ async def upload_jd(admin_id: int, file):
             parsed_text=parsed_text,
             title=filename,
         )
-        db["jds"].append(jd.to_dict())
-        save_data(db)
+        # precompute tokens + embedding once, so evaluations don't have to
+        append_to("jds", {**jd.to_dict(), **profile_fields(parsed_text)})
 
         return jsonify({"status": "success", "data": jd.to_dict()}), 201
 
@@ -59,12 +64,12 @@ async def upload_jd(admin_id: int, file):
 # --------------------------
 async def get_jd(jd_id: int, admin_id: int):
     try:
-        db = load_data()
-        jd = next((j for j in db["jds"] if j["id"] == jd_id and j["admin_id"] == admin_id), None)
-        if not jd:
+        jd = get_record("jds", jd_id)
+        if not jd or jd["admin_id"] != admin_id:
             return jsonify({"status": "error", "message": "jd not found"}), 404
 
-        jd["parsed_preview"] = jd.get("parsed_text", "")[:300] + "..."
+        jd = with_text(jd)
+        jd["parsed_preview"] = jd["parsed_text"][:300] + "..."
         return jsonify({"status": "success", "data": jd}), 200
 
     except Exception as e:
@@ -74,11 +79,10 @@ async def get_jd(jd_id: int, admin_id: int):
 # --------------------------
 # get all jds for admin
 # --------------------------
-async def get_all_jds(admin_id: int):
+async def get_all_jds(admin_id: int, limit=None, after=None, fields=None):
     try:
-        db = load_data()
-        jds = [j for j in db["jds"] if j["admin_id"] == admin_id]
-        return jsonify({"status": "success", "data": jds}), 200
+        page = paginate("jds", limit, after, fields, "admin_id", [admin_id])
+        return jsonify({"status": "success", **page}), 200
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)}), 500
 
@@ -88,17 +92,15 @@ async def get_all_jds(admin_id: int):
 # --------------------------
 async def delete_jd(jd_id: int, admin_id: int):
     try:
-        db = load_data()
-        jd = next((j for j in db["jds"] if j["id"] == jd_id and j["admin_id"] == admin_id), None)
-        if not jd:
+        jd = get_record("jds", jd_id)
+        if not jd or jd["admin_id"] != admin_id:
             return jsonify({"status": "error", "message": "jd not found"}), 404
 
         # delete file too
         if os.path.exists(jd["file_path"]):
             os.remove(jd["file_path"])
 
-        db["jds"] = [j for j in db["jds"] if not (j["id"] == jd_id and j["admin_id"] == admin_id)]
-        save_data(db)
+        delete_record("jds", jd_id)
 
         return jsonify({"status": "success", "message": f"jd {jd_id} deleted"}), 200
 
@@ -111,9 +113,8 @@ async def delete_jd(jd_id: int, admin_id: int):
 # --------------------------
 async def update_jd(jd_id: int, admin_id: int, file):
     try:
-        db = load_data()
-        jd = next((j for j in db["jds"] if j["id"] == jd_id and j["admin_id"] == admin_id), None)
-        if not jd:
+        jd = get_record("jds", jd_id)
+        if not jd or jd["admin_id"] != admin_id:
             return jsonify({"status": "error", "message": "jd not found"}), 404
 
         filename = secure_filename(file.filename)
@@ -128,18 +129,28 @@ async def update_jd(jd_id: int, admin_id: int, file):
         with open(jd["file_path"], "wb") as f:
             f.write(raw_bytes)
 
-        jd["parsed_text"] = extract_text_from_jd(raw_bytes, filename)
-        jd["title"] = filename
-        jd["uploaded_at"] = datetime.datetime.utcnow().isoformat()
-
-        for i, j in enumerate(db["jds"]):
-            if j["id"] == jd_id:
-                db["jds"][i] = jd
-                break
-
-        save_data(db)
+        parsed_text = extract_text_from_jd(raw_bytes, filename)
+        changes = {
+            "parsed_text": parsed_text,
+            "title": filename,
+            "uploaded_at": datetime.datetime.utcnow().isoformat(),
+            **profile_fields(parsed_text),
+        }
+        with transaction() as tx:
+            jd = tx.get_record("jds", jd_id)
+            if not jd or jd["admin_id"] != admin_id:
+                return jsonify({"status": "error", "message": "jd not found"}), 404
+            text_changed = jd.get("parsed_text_ref") != text_hash(parsed_text)
+            tx.update_record("jds", jd_id, changes)
+        jd = {**jd, **changes}
+        if text_changed:
+            # only this jd's evaluations go stale; rescored in the background
+            document_changed("jds", jd_id)
         return jsonify({"status": "success", "data": jd}), 200
 
+    except ConflictError:
+        # something read above was changed by another request before the commit
+        return jsonify({"status": "error", "message": "records changed meanwhile, retry"}), 409
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)}), 500
 
@@ -149,10 +160,9 @@ async def update_jd(jd_id: int, admin_id: int, file):
 # --------------------------
 async def search_jds(admin_id: int, keyword: str):
     try:
-        db = load_data()
         jds = [
-            j for j in db["jds"]
-            if j["admin_id"] == admin_id and keyword.lower() in (j.get("parsed_text") or "").lower()
+            project(j, None) for j in find_by("jds", "admin_id", admin_id)
+            if keyword.lower() in load_text(j).lower()
         ]
         return jsonify({"status": "success", "data": jds}), 200
     except Exception as e:
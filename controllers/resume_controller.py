@@ -2,8 +2,16 @@ import os, uuid, datetime
 from flask import jsonify, current_app
 from werkzeug.utils import secure_filename
 from models import Resume, Evaluation
-from utils.storage import load_data, save_data
+from utils.storage import (
+    get_record, find_by, next_id, append_to, delete_record, load_text, with_text, transaction, ConflictError,
+)
 from utils.resume_parser import extract_text_from_resume
+from utils.evaluator import profile_fields
+from utils.ann_index import index_resume, unindex_resume
+from utils.blob_store import text_hash
+from utils.reevaluation import document_changed
+from utils.pagination import paginate
+from utils.streaming import stream_records
 
 
 # --------------------------
@@ -34,9 +42,8 @@ async def upload_resume(user_id: int, file):
 
         parsed_text = extract_text_from_resume(raw_bytes, filename)
 
-        db = load_data()
         resume = Resume(
-            id=len(db["resumes"]) + 1,
+            id=next_id("resumes"),
             user_id=user_id,
             original_filename=filename,
             filename=newname,
@@ -45,8 +52,10 @@ async def upload_resume(user_id: int, file):
             parsed_text=parsed_text
         )
 
-        db["resumes"].append(resume.to_dict())
-        save_data(db)
+        # precompute tokens + embedding once, so evaluations don't have to
+        record = {**resume.to_dict(), **profile_fields(parsed_text)}
+        append_to("resumes", record)
+        index_resume(record)
 
         return jsonify({"status": "success", "data": resume.to_dict()}), 201
 
@@ -59,11 +68,10 @@ async def upload_resume(user_id: int, file):
 # --------------------------
 async def get_resume(resume_id: int, user_id: int):
     try:
-        db = load_data()
-        resume = next((r for r in db["resumes"] if r["id"] == resume_id and r["user_id"] == user_id), None)
-        if not resume:
+        resume = get_record("resumes", resume_id)
+        if not resume or resume["user_id"] != user_id:
             return jsonify({"status": "error", "message": "resume not found"}), 404
-        return jsonify({"status": "success", "data": resume}), 200
+        return jsonify({"status": "success", "data": with_text(resume)}), 200
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)}), 500
 
@@ -71,11 +79,12 @@ async def get_resume(resume_id: int, user_id: int):
 # --------------------------
 # get all resumes
 # --------------------------
-async def get_all_resumes(user_id: int):
+async def get_all_resumes(user_id: int, limit=None, after=None, fields=None, stream=None):
     try:
-        db = load_data()
-        resumes = [r for r in db["resumes"] if r["user_id"] == user_id]
-        return jsonify({"status": "success", "data": resumes}), 200
+        if stream:
+            return stream_records("resumes", stream, "user_id", [user_id], fields)
+        page = paginate("resumes", limit, after, fields, "user_id", [user_id])
+        return jsonify({"status": "success", **page}), 200
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)}), 500
 
@@ -85,16 +94,15 @@ async def get_all_resumes(user_id: int):
 # --------------------------
 async def delete_resume(resume_id: int, user_id: int):
     try:
-        db = load_data()
-        resume = next((r for r in db["resumes"] if r["id"] == resume_id and r["user_id"] == user_id), None)
-        if not resume:
+        resume = get_record("resumes", resume_id)
+        if not resume or resume["user_id"] != user_id:
             return jsonify({"status": "error", "message": "resume not found"}), 404
 
         if os.path.exists(resume["file_path"]):
             os.remove(resume["file_path"])
 
-        db["resumes"] = [r for r in db["resumes"] if not (r["id"] == resume_id and r["user_id"] == user_id)]
-        save_data(db)
+        delete_record("resumes", resume_id)
+        unindex_resume(resume_id)
 
         return jsonify({"status": "success", "message": f"resume {resume_id} deleted"}), 200
     except Exception as e:
@@ -106,9 +114,8 @@ async def delete_resume(resume_id: int, user_id: int):
 # --------------------------
 async def update_resume(resume_id: int, user_id: int, file):
     try:
-        db = load_data()
-        resume = next((r for r in db["resumes"] if r["id"] == resume_id and r["user_id"] == user_id), None)
-        if not resume:
+        resume = get_record("resumes", resume_id)
+        if not resume or resume["user_id"] != user_id:
             return jsonify({"status": "error", "message": "resume not found"}), 404
 
         filename = secure_filename(file.filename)
@@ -133,20 +140,31 @@ async def update_resume(resume_id: int, user_id: int, file):
         if os.path.exists(resume["file_path"]):
             os.remove(resume["file_path"])
 
-        resume["filename"] = newname
-        resume["file_path"] = path
-        resume["file_type"] = ext
-        resume["parsed_text"] = parsed_text
-        resume["uploaded_at"] = datetime.datetime.utcnow().isoformat()
-
-        for i, r in enumerate(db["resumes"]):
-            if r["id"] == resume_id:
-                db["resumes"][i] = resume
-                break
-
-        save_data(db)
+        changes = {
+            "filename": newname,
+            "file_path": path,
+            "file_type": ext,
+            "parsed_text": parsed_text,
+            "uploaded_at": datetime.datetime.utcnow().isoformat(),
+            **profile_fields(parsed_text),
+        }
+        with transaction() as tx:
+            # re-read inside the transaction: the upload above may have taken a while
+            resume = tx.get_record("resumes", resume_id)
+            if not resume or resume["user_id"] != user_id:
+                return jsonify({"status": "error", "message": "resume not found"}), 404
+            text_changed = resume.get("parsed_text_ref") != text_hash(parsed_text)
+            tx.update_record("resumes", resume_id, changes)
+        resume = {**resume, **changes}
+        index_resume(resume)
+        if text_changed:
+            # only this resume's evaluations go stale; rescored in the background
+            document_changed("resumes", resume_id)
         return jsonify({"status": "success", "data": resume}), 200
 
+    except ConflictError:
+        # something read above was changed by another request before the commit
+        return jsonify({"status": "error", "message": "records changed meanwhile, retry"}), 409
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)}), 500
 
@@ -156,10 +174,9 @@ async def update_resume(resume_id: int, user_id: int, file):
 # --------------------------
 async def search_resumes(user_id: int, keyword: str):
     try:
-        db = load_data()
         resumes = [
-            {"id": r["id"], "filename": r["filename"], "match_found": keyword.lower() in (r.get("parsed_text") or "").lower()}
-            for r in db["resumes"] if r["user_id"] == user_id
+            {"id": r["id"], "filename": r["filename"], "match_found": keyword.lower() in load_text(r).lower()}
+            for r in find_by("resumes", "user_id", user_id)
         ]
         return jsonify({"status": "success", "data": resumes}), 200
     except Exception as e:
@@ -171,22 +188,25 @@ async def search_resumes(user_id: int, keyword: str):
 # --------------------------
 async def link_resume_to_evaluation(resume_id: int, jd_id: int):
     try:
-        db = load_data()
-        evaluation = next((e for e in db["evaluations"] if e["resume_id"] == resume_id and e["jd_id"] == jd_id), None)
-        if evaluation:
-            return jsonify({"status": "error", "message": "evaluation already exists"}), 409
-
-        new_eval = Evaluation(
-            id=len(db["evaluations"]) + 1,
-            resume_id=resume_id,
-            jd_id=jd_id,
-            score=0,
-            verdict="pending",
-            missing_skills="[]",
-        )
-        db["evaluations"].append(new_eval.to_dict())
-        save_data(db)
+        with transaction() as tx:
+            if tx.find_evaluation(resume_id, jd_id):
+                return jsonify({"status": "error", "message": "evaluation already exists"}), 409
+
+            new_eval = Evaluation(
+                id=tx.next_id("evaluations"),
+                resume_id=resume_id,
+                jd_id=jd_id,
+                score=0,
+                verdict="pending",
+                missing_skills="[]",
+            )
+            tx.append_to("evaluations", new_eval.to_dict())
 
         return jsonify({"status": "success", "data": new_eval.to_dict()}), 201
+    except ValueError:
+        return jsonify({"status": "error", "message": "evaluation already exists"}), 409
+    except ConflictError:
+        # something read above was changed by another request before the commit
+        return jsonify({"status": "error", "message": "records changed meanwhile, retry"}), 409
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)}), 500
@@ -4,8 +4,13 @@ from flask import jsonify, current_app
 from werkzeug.utils import secure_filename
 
 from models import User, Resume
-from utils.storage import load_data, save_data
+from utils.storage import (
+    get_record, find_by, find_by_any, next_id, append_to, delete_record, transaction, ConflictError,
+)
 from utils.resume_parser import extract_text_from_resume
+from utils.evaluator import profile_fields
+from utils.ann_index import index_resume, unindex_resume
+from utils.pagination import paginate
 
 
 # --------------------------
@@ -17,23 +22,24 @@ def register_user(data):
         email = data.get("email", f"user{uuid.uuid4().hex[:5]}@example.com")
         password = data.get("password", "1234")
 
-        db = load_data()
+        with transaction() as tx:
+            # check duplicate email
+            if tx.find_by("users", "email", email):
+                return jsonify({"status": "error", "message": "email already exists"}), 409
 
-        # check duplicate email
-        if any(u["email"] == email for u in db["users"]):
-            return jsonify({"status": "error", "message": "email already exists"}), 409
-
-        new_user = User(
-            id=len(db["users"]) + 1,
-            name=name,
-            email=email,
-            password=password,
-        )
+            new_user = User(
+                id=tx.next_id("users"),
+                name=name,
+                email=email,
+                password=password,
+            )
 
-        db["users"].append(new_user.to_dict())
-        save_data(db)
+            tx.append_to("users", new_user.to_dict())
 
         return jsonify({"status": "success", "data": new_user.to_dict()}), 201
+    except (ValueError, ConflictError):
+        # another request registered the same email meanwhile
+        return jsonify({"status": "error", "message": "email already exists"}), 409
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)}), 500
 
@@ -43,9 +49,8 @@ def register_user(data):
 # --------------------------
 def login_user(email, password):
     try:
-        db = load_data()
         user = next(
-            (u for u in db["users"] if u["email"] == email and u["password"] == password),
+            (u for u in find_by("users", "email", email) if u["password"] == password),
             None,
         )
         if not user:
@@ -65,9 +70,8 @@ def logout_user():
 # --------------------------
 def get_user_dashboard(user_id: int):
     try:
-        db = load_data()
-        resumes = [r for r in db["resumes"] if r["user_id"] == user_id]
-        evaluations = [ev for ev in db["evaluations"] if ev.get("user_id") == user_id]
+        resumes = find_by("resumes", "user_id", user_id)
+        evaluations = find_by_any("evaluations", "resume_id", [r["id"] for r in resumes])
 
         return (
             jsonify(
@@ -116,9 +120,8 @@ def upload_resume(user_id: int, file):
 
         parsed_text = extract_text_from_resume(raw_bytes, filename)
 
-        db = load_data()
         resume = Resume(
-            id=len(db["resumes"]) + 1,
+            id=next_id("resumes"),
             user_id=user_id,
             original_filename=filename,
             filename=newname,
@@ -127,8 +130,9 @@ def upload_resume(user_id: int, file):
             parsed_text=parsed_text,
         )
 
-        db["resumes"].append(resume.to_dict())
-        save_data(db)
+        record = {**resume.to_dict(), **profile_fields(parsed_text)}
+        append_to("resumes", record)
+        index_resume(record)
 
         return jsonify({"status": "success", "data": resume.to_dict()}), 201
     except Exception as e:
@@ -138,30 +142,23 @@ def upload_resume(user_id: int, file):
 # --------------------------
 # get resumes
 # --------------------------
-def get_all_resumes(user_id: int):
+def get_all_resumes(user_id: int, limit=None, after=None, fields=None):
     try:
-        db = load_data()
-        resumes = [r for r in db["resumes"] if r["user_id"] == user_id]
-        return jsonify({"status": "success", "data": resumes}), 200
+        page = paginate("resumes", limit, after, fields, "user_id", [user_id])
+        return jsonify({"status": "success", **page}), 200
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)}), 500
 
 
 def delete_resume(resume_id: int, user_id: int):
     try:
-        db = load_data()
-        before = len(db["resumes"])
-        db["resumes"] = [
-            r
-            for r in db["resumes"]
-            if not (r["id"] == resume_id and r["user_id"] == user_id)
-        ]
-        after = len(db["resumes"])
-        save_data(db)
-
-        if before == after:
+        resume = get_record("resumes", resume_id)
+        if not resume or resume["user_id"] != user_id:
             return jsonify({"status": "error", "message": "resume not found"}), 404
 
+        delete_record("resumes", resume_id)
+        unindex_resume(resume_id)
+
         return jsonify({"status": "success", "message": f"resume {resume_id} deleted"}), 200
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)}), 500
@@ -172,22 +169,23 @@ def delete_resume(resume_id: int, user_id: int):
 # --------------------------
 def update_user_profile(user_id: int, data: dict):
     try:
-        db = load_data()
-        user = next((u for u in db["users"] if u["id"] == user_id), None)
-        if not user:
-            return jsonify({"status": "error", "message": "user not found"}), 404
-
-        user["name"] = data.get("name", user["name"])
-        user["email"] = data.get("email", user["email"])
-        user["password"] = data.get("password", user["password"])
-
-        for i, u in enumerate(db["users"]):
-            if u["id"] == user_id:
-                db["users"][i] = user
-                break
-
-        save_data(db)
+        with transaction() as tx:
+            user = tx.get_record("users", user_id)
+            if not user:
+                return jsonify({"status": "error", "message": "user not found"}), 404
+
+            changes = {
+                "name": data.get("name", user["name"]),
+                "email": data.get("email", user["email"]),
+                "password": data.get("password", user["password"]),
+            }
+            user = {**user, **changes}
+            tx.update_record("users", user_id, changes)
         return jsonify({"status": "success", "data": user}), 200
+    except ValueError:
+        return jsonify({"status": "error", "message": "email already exists"}), 409
+    except ConflictError:
+        return jsonify({"status": "error", "message": "user changed meanwhile, retry"}), 409
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)}), 500
 
@@ -195,10 +193,10 @@ def update_user_profile(user_id: int, data: dict):
 # --------------------------
 # evaluations
 # --------------------------
-def get_evaluations(user_id: int):
+def get_evaluations(user_id: int, limit=None, after=None, fields=None):
     try:
-        db = load_data()
-        evaluations = [ev for ev in db["evaluations"] if ev.get("user_id") == user_id]
-        return jsonify({"status": "success", "data": evaluations}), 200
+        resume_ids = [r["id"] for r in find_by("resumes", "user_id", user_id)]
+        page = paginate("evaluations", limit, after, fields, "resume_id", resume_ids)
+        return jsonify({"status": "success", **page}), 200
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)}), 500
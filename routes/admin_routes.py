@@ -1,5 +1,7 @@
 from flask import Blueprint, request, jsonify
 import controllers.admin_controller as admin_controller
+import controllers.jd_controller as jd_controller
+from utils.pagination import page_args
 
 # blueprint for admin routes
 admin_bp = Blueprint("admin", __name__, url_prefix="/admin")
@@ -42,15 +44,15 @@ def get_dashboard(admin_id):
 # 📄 JD management
 # --------------------------
 @admin_bp.route("/jds/<int:admin_id>", methods=["GET"])
-def get_all_jds(admin_id):
+async def get_all_jds(admin_id):
     """Get all job descriptions uploaded by an admin"""
-    return admin_controller.get_all_jds(admin_id)
+    return await jd_controller.get_all_jds(admin_id, **page_args(request.args))
 
 
 @admin_bp.route("/jd/<int:jd_id>/<int:admin_id>", methods=["DELETE"])
-def delete_jd(jd_id, admin_id):
+async def delete_jd(jd_id, admin_id):
     """Delete a job description if owned by this admin"""
-    return admin_controller.delete_jd(jd_id, admin_id)
+    return await jd_controller.delete_jd(jd_id, admin_id)
 
 
 @admin_bp.route("/upload/<int:admin_id>", methods=["POST"])
@@ -78,4 +80,4 @@ def update_profile(admin_id):
 @admin_bp.route("/users", methods=["GET"])
 def get_all_users():
     """Get list of all users (super-admin utility)"""
-    return admin_controller.get_all_users()
+    return admin_controller.get_all_users(**page_args(request.args))
@@ -9,7 +9,15 @@ from controllers.evaluator_controller import (
     delete_evaluation,
     compare_multiple_resumes_to_jd,
     compare_multiple_jds_to_resume,
+    get_evaluations_by_admin_jds,
+    get_similarity_matrix,
+    get_top_resumes_for_jd,
+    submit_evaluation_job,
+    get_evaluation_job,
+    get_evaluation_job_results,
 )
+from utils.pagination import page_args, int_list
+from utils.streaming import stream_format
 
 evaluator_bp = Blueprint("evaluator", __name__, url_prefix="/evaluations")
 
@@ -17,80 +25,129 @@ evaluator_bp = Blueprint("evaluator", __name__, url_prefix="/evaluations")
 # evaluate resume against jd
 # --------------------------
 @evaluator_bp.route("/<int:resume_id>/<int:jd_id>", methods=["POST"])
-def route_evaluate_resume_against_jd(resume_id, jd_id):
-    return evaluate_resume_against_jd(resume_id, jd_id)
+async def route_evaluate_resume_against_jd(resume_id, jd_id):
+    return await evaluate_resume_against_jd(resume_id, jd_id)
 
 
 # --------------------------
 # get evaluation by id
 # --------------------------
 @evaluator_bp.route("/<int:evaluation_id>", methods=["GET"])
-def route_get_evaluation(evaluation_id):
-    return get_evaluation(evaluation_id)
+async def route_get_evaluation(evaluation_id):
+    return await get_evaluation(evaluation_id)
 
 
 # --------------------------
 # get all evaluations
 # --------------------------
 @evaluator_bp.route("/", methods=["GET"])
-def route_get_all_evaluations():
-    return get_all_evaluations()
+async def route_get_all_evaluations():
+    return await get_all_evaluations(**page_args(request.args), stream=stream_format(request.args))
 
 
 # --------------------------
 # get evaluations by user
 # --------------------------
 @evaluator_bp.route("/user/<int:user_id>", methods=["GET"])
-def route_get_evaluations_by_user(user_id):
-    return get_evaluations_by_user(user_id)
+async def route_get_evaluations_by_user(user_id):
+    return await get_evaluations_by_user(user_id, **page_args(request.args), stream=stream_format(request.args))
 
 
 # --------------------------
 # get evaluations by admin
 # --------------------------
 @evaluator_bp.route("/admin/<int:admin_id>", methods=["GET"])
-def route_get_evaluations_by_admin(admin_id):
-    return get_evaluations_by_admin(admin_id)
+async def route_get_evaluations_by_admin(admin_id):
+    return await get_evaluations_by_admin(admin_id, **page_args(request.args), stream=stream_format(request.args))
 
 
 # --------------------------
 # update evaluation
 # --------------------------
 @evaluator_bp.route("/<int:evaluation_id>", methods=["PUT"])
-def route_update_evaluation(evaluation_id):
+async def route_update_evaluation(evaluation_id):
     data = request.get_json(silent=True)
     if not data:
         return {"status": "error", "message": "invalid or missing json body"}, 400
-    return update_evaluation(evaluation_id, data)
+    return await update_evaluation(evaluation_id, data)
 
 
 # --------------------------
 # delete evaluation
 # --------------------------
 @evaluator_bp.route("/<int:evaluation_id>", methods=["DELETE"])
-def route_delete_evaluation(evaluation_id):
-    return delete_evaluation(evaluation_id)
+async def route_delete_evaluation(evaluation_id):
+    return await delete_evaluation(evaluation_id)
 
 
 # --------------------------
 # compare multiple resumes to jd
 # --------------------------
 @evaluator_bp.route("/compare/user/<int:user_id>/jd/<int:jd_id>", methods=["POST"])
-def route_compare_multiple_resumes_to_jd(user_id, jd_id):
-    return compare_multiple_resumes_to_jd(user_id, jd_id)
+async def route_compare_multiple_resumes_to_jd(user_id, jd_id):
+    return await compare_multiple_resumes_to_jd(user_id, jd_id)
 
 
 # --------------------------
 # compare multiple jds to resume
 # --------------------------
 @evaluator_bp.route("/compare/resume/<int:resume_id>/admin/<int:admin_id>", methods=["POST"])
-def route_compare_multiple_jds_to_resume(resume_id, admin_id):
-    return compare_multiple_jds_to_resume(resume_id, admin_id)
+async def route_compare_multiple_jds_to_resume(resume_id, admin_id):
+    return await compare_multiple_jds_to_resume(resume_id, admin_id)
 
 
 
 @evaluator_bp.route("/admin_jds/<int:admin_id>", methods=["GET"])
-def route_get_evaluations_by_admin_jds(admin_id):
-    return get_evaluations_by_admin_jds(admin_id)
+async def route_get_evaluations_by_admin_jds(admin_id):
+    return await get_evaluations_by_admin_jds(
+        admin_id, **page_args(request.args), stream=stream_format(request.args)
+    )
 
 
+# --------------------------
+# jd x resume score matrix for an admin
+# --------------------------
+@evaluator_bp.route("/matrix/admin/<int:admin_id>", methods=["GET"])
+async def route_get_similarity_matrix(admin_id):
+    return await get_similarity_matrix(
+        admin_id,
+        resume_ids=int_list(request.args, "resume_ids"),
+        user_id=request.args.get("user_id", type=int),
+        jd_ids=int_list(request.args, "jd_ids"),
+        min_score=request.args.get("min_score", type=int),
+    )
+
+
+# --------------------------
+# top-k candidate resumes for a jd (ANN index)
+# --------------------------
+@evaluator_bp.route("/topk/jd/<int:jd_id>", methods=["GET"])
+async def route_get_top_resumes_for_jd(jd_id):
+    return await get_top_resumes_for_jd(
+        jd_id,
+        k=request.args.get("k", 50, type=int),
+        nprobe=request.args.get("nprobe", type=int),
+    )
+
+
+# --------------------------
+# background bulk evaluation jobs
+# --------------------------
+@evaluator_bp.route("/jobs", methods=["POST"])
+async def route_submit_evaluation_job():
+    data = request.get_json(silent=True)
+    if data is None:
+        data = {}
+    if not isinstance(data, dict):
+        return {"status": "error", "message": "invalid json body"}, 400
+    return await submit_evaluation_job(data)
+
+
+@evaluator_bp.route("/jobs/<job_id>", methods=["GET"])
+async def route_get_evaluation_job(job_id):
+    return await get_evaluation_job(job_id)
+
+
+@evaluator_bp.route("/jobs/<job_id>/results", methods=["GET"])
+async def route_get_evaluation_job_results(job_id):
+    return await get_evaluation_job_results(job_id, **page_args(request.args))
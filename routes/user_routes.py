@@ -1,5 +1,6 @@
 from flask import Blueprint, request, jsonify
 from controllers import user_controller
+from utils.pagination import page_args
 
 # Blueprint for user routes
 user_bp = Blueprint("user", __name__, url_prefix="/user")
@@ -44,7 +45,7 @@ def get_dashboard(user_id):
 @user_bp.route("/resumes/<int:user_id>", methods=["GET"])
 def get_resumes(user_id):
     """List all resumes for a user"""
-    return user_controller.get_all_resumes(user_id)
+    return user_controller.get_all_resumes(user_id, **page_args(request.args))
 
 
 @user_bp.route("/resume/<int:resume_id>/<int:user_id>", methods=["DELETE"])
@@ -78,4 +79,4 @@ def update_profile(user_id):
 @user_bp.route("/evaluations/<int:user_id>", methods=["GET"])
 def get_evaluations(user_id):
     """Get all evaluations for a user's resumes"""
-    return user_controller.get_evaluations(user_id)
+    return user_controller.get_evaluations(user_id, **page_args(request.args))
@@ -0,0 +1,84 @@
+"""
+Recall@k and query latency of the IVF resume index vs brute force.
+
+    python scripts/bench_ann.py [--sizes 1000,10000,100000] [--k 50] [--queries 200]
+
+Vectors are synthetic (clustered, 384-d, like sentence embeddings), so no
+model or database is needed. Brute force is one (n, dim) @ (dim,) matmul
+plus argpartition - the same work the matrix endpoint does per JD.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from utils.ann_index import IVFIndex  # noqa: E402
+from utils.similarity import normalize_rows  # noqa: E402
+
+
+def synthetic(n, centers, rng, noise=1.0):
+    """n unit vectors scattered around the rows of `centers` (topics)"""
+    labels = rng.integers(0, len(centers), n)
+    dim = centers.shape[1]
+    return normalize_rows(centers[labels] + rng.standard_normal((n, dim)) * (noise / np.sqrt(dim)))
+
+
+def brute_force(vectors, query, k):
+    sims = vectors @ query
+    top = np.argpartition(-sims, k - 1)[:k]
+    return top[np.argsort(-sims[top])]
+
+
+def timed(fn, queries):
+    out, lat = [], []
+    for q in queries:
+        t = time.perf_counter()
+        out.append(fn(q))
+        lat.append(time.perf_counter() - t)
+    return out, np.array(lat) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--sizes", default="1000,10000,50000,100000")
+    parser.add_argument("--k", type=int, default=50)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--nprobe", default="4,8,16")
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--noise", type=float, default=1.5, help="spread around each topic (higher = harder)")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"{'n':>8} {'nlist':>6} {'nprobe':>6} {'recall@k':>9} {'ann p50':>9} {'ann p95':>9} "
+          f"{'brute p50':>10} {'speedup':>8} {'build s':>8}")
+    for n in map(int, args.sizes.split(",")):
+        centers = normalize_rows(rng.standard_normal((max(8, n // 200), args.dim)))
+        vectors = synthetic(n, centers, rng, args.noise)
+        queries = synthetic(args.queries, centers, rng, args.noise)
+
+        # incremental adds, as on upload (+ the retrains ResumeIndex runs in the background)
+        t = time.perf_counter()
+        index = IVFIndex(dim=args.dim)
+        for i, vec in enumerate(vectors):
+            index.add(i, vec)
+            if index.training_due():
+                index.train()
+        build = time.perf_counter() - t
+
+        exact, brute_ms = timed(lambda q: set(brute_force(vectors, q, args.k).tolist()), queries)
+        for nprobe in map(int, args.nprobe.split(",")):
+            found, ann_ms = timed(lambda q: [i for i, _ in index.search(q, args.k, nprobe)], queries)
+            recall = np.mean([len(e.intersection(f)) / args.k for e, f in zip(exact, found)])
+            print(f"{n:>8} {len(index.centroids) if index.centroids is not None else 0:>6} {nprobe:>6} {recall:>9.3f} "
+                  f"{np.percentile(ann_ms, 50):>8.2f}ms {np.percentile(ann_ms, 95):>8.2f}ms "
+                  f"{np.percentile(brute_ms, 50):>9.2f}ms {np.median(brute_ms) / np.median(ann_ms):>7.1f}x "
+                  f"{build:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
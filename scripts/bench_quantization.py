@@ -0,0 +1,86 @@
+"""
+Accuracy vs speed / memory of quantized embedding storage (utils/quantization.py).
+
+    python scripts/bench_quantization.py [--n 100000] [--queries 64] [--from-db]
+
+For float32 / float16 / int8 rows: resident bytes, query latency of
+scoring every row, and how far results drift from float32 - recall@k of
+the top-k, cosine error and how many 0-100 scores (int(sim * 100), the
+evaluation scale) change. --from-db uses the stored resumes / JDs instead
+of a synthetic clustered corpus.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from bench_ann import synthetic  # noqa: E402
+from utils.quantization import DTYPES, QuantizedRows  # noqa: E402
+from utils.similarity import normalize_rows  # noqa: E402
+
+
+def stored_corpus():
+    from utils import storage
+    from utils.evaluator import load_profiles
+
+    resumes = list(storage.iter_records("resumes"))
+    jds = list(storage.iter_records("jds"))
+    if not resumes or not jds:
+        sys.exit("no resumes / jds stored")
+    return (normalize_rows(np.stack([p.embedding for p in load_profiles(resumes)])),
+            normalize_rows(np.stack([p.embedding for p in load_profiles(jds)])))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--n", type=int, default=100000)
+    parser.add_argument("--queries", type=int, default=64)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--from-db", action="store_true")
+    args = parser.parse_args()
+
+    if args.from_db:
+        vectors, queries = stored_corpus()
+    else:
+        rng = np.random.default_rng(0)
+        centers = normalize_rows(rng.standard_normal((max(8, args.n // 200), args.dim)))
+        vectors = synthetic(args.n, centers, rng, 1.5)
+        queries = synthetic(args.queries, centers, rng, 1.5)
+    n, k = len(vectors), min(args.k, len(vectors))
+
+    exact = queries @ vectors.T
+    exact_top = np.argsort(-exact, axis=1)[:, :k]
+    print(f"corpus: {n} x {vectors.shape[1]}, {len(queries)} queries, k={k}")
+    print(f"{'storage':>8} {'MB':>8} {'x smaller':>9} {'1 query':>9} {'batch':>9} "
+          f"{'recall@k':>9} {'mean err':>9} {'max err':>9} {'scores changed':>15}")
+
+    for kind in DTYPES:
+        store = QuantizedRows(vectors.shape[1], kind, capacity=n)
+        store.set(np.arange(n), vectors)
+
+        store.dot(queries[:1])
+        t = time.perf_counter()
+        for q in queries[:16]:
+            store.dot(q)
+        one = (time.perf_counter() - t) / min(16, len(queries)) * 1000
+        t = time.perf_counter()
+        sims = store.dot(queries).T
+        batch = (time.perf_counter() - t) * 1000
+
+        top = np.argsort(-sims, axis=1)[:, :k]
+        recall = np.mean([len(set(a) & set(b)) / k for a, b in zip(top.tolist(), exact_top.tolist())])
+        err = np.abs(sims - exact)
+        changed = np.mean((sims * 100).astype(np.int32) != (exact * 100).astype(np.int32))
+        print(f"{kind:>8} {store.nbytes / 2**20:>8.1f} {vectors.nbytes / store.nbytes:>8.2f}x "
+              f"{one:>7.2f}ms {batch:>7.1f}ms {recall:>9.4f} {err.mean():>9.5f} {err.max():>9.5f} "
+              f"{changed:>14.2%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,30 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import sqlite_backend  # noqa: E402
+from utils.sqlite_backend import SQLiteBackend  # noqa: E402
+from utils.storage import JSONBackend  # noqa: E402
+
+
+@pytest.fixture
+def json_store(tmp_path):
+    """A JSON backend in a fresh data dir"""
+    return JSONBackend(data_dir=str(tmp_path / "db"))
+
+
+@pytest.fixture
+def sqlite_store(tmp_path, monkeypatch):
+    """A SQLite backend in a fresh file (no JSON database to import)"""
+    monkeypatch.setattr(sqlite_backend, "DB_FILE", str(tmp_path / "db.json"))
+    monkeypatch.setattr(sqlite_backend, "DATA_DIR", str(tmp_path / "db"))
+    return SQLiteBackend(str(tmp_path / "db.sqlite3"))
+
+
+@pytest.fixture(params=["json", "sqlite"])
+def store(request):
+    """Each test using it runs once per backend"""
+    return request.getfixturevalue(f"{request.param}_store")
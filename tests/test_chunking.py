@@ -0,0 +1,68 @@
+import random
+
+import numpy as np
+
+from utils.chunking import CHUNK_MAX_WORDS, CHUNK_MIN_WORDS, pool, split_chunks
+
+
+def _text(n=3000, seed=0):
+    rng = random.Random(seed)
+    vocab = [f"word{i}" for i in range(5000)]
+    return [rng.choice(vocab) for _ in range(n)]
+
+
+def _assert_local(before, after, at):
+    """Only chunks around word `at` differ: earlier ones and the tail are kept"""
+    sizes = np.array([len(c.split()) for c in before])
+    ends = np.cumsum(sizes)
+    kept = int(np.sum(ends <= at))
+    assert after[:kept] == before[:kept]
+    # chunks starting well past the edit are cut at the same words again
+    tail = int(np.sum(ends - sizes > at + 3 * CHUNK_MAX_WORDS))
+    assert after[len(after) - tail:] == before[len(before) - tail:]
+    # a cut forced by CHUNK_MAX_WORDS can carry the shift a chunk or two further
+    assert len(set(after) - set(before)) <= 3
+
+
+def test_chunks_cover_text_within_limits():
+    words = _text()
+    chunks = split_chunks(" ".join(words))
+    assert " ".join(chunks).split() == words
+    sizes = [len(c.split()) for c in chunks]
+    assert max(sizes) <= CHUNK_MAX_WORDS
+    assert min(sizes[:-1]) >= CHUNK_MIN_WORDS
+
+
+def test_short_text_is_one_chunk():
+    assert split_chunks("python developer") == ["python developer"]
+    assert split_chunks("   ") == []
+
+
+def test_boundaries_stable_under_replacement():
+    words = _text()
+    before = split_chunks(" ".join(words))
+    words[1500] = "edited"
+    _assert_local(before, split_chunks(" ".join(words)), 1500)
+
+
+def test_boundaries_stable_under_insertion_and_deletion():
+    words = _text()
+    before = split_chunks(" ".join(words))
+    for at in range(100, 2800, 300):
+        inserted = words[:at] + ["new", "sentence", "here"] + words[at:]
+        _assert_local(before, split_chunks(" ".join(inserted)), at)
+        deleted = words[:at] + words[at + 5:]
+        _assert_local(before, split_chunks(" ".join(deleted)), at)
+
+
+def test_edit_keeps_earlier_chunks():
+    words = _text()
+    before = split_chunks(" ".join(words))
+    words[-1] = "edited"
+    after = split_chunks(" ".join(words))
+    assert after[:-1] == before[:-1]
+
+
+def test_pool_weighted_mean():
+    vectors = np.array([[1.0, 0.0], [0.0, 1.0]])
+    assert np.allclose(pool(vectors, [3, 1]), [0.75, 0.25])
@@ -0,0 +1,63 @@
+import os
+import subprocess
+import sys
+
+import numpy as np
+
+from utils.feature_hashing import HashingEmbedder, feature_hash, fit_idf, word_hash
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TEXTS = ["senior python developer flask sql", "machine learning engineer c++ pytorch", ""]
+
+SCRIPT = """
+import sys
+from utils.feature_hashing import HashingEmbedder, word_hash
+texts = {texts!r}
+print(word_hash("python"))
+sys.stdout.write(HashingEmbedder(256).transform(texts).tobytes().hex())
+"""
+
+
+def _run(seed: str):
+    env = {**os.environ, "PYTHONHASHSEED": seed}
+    out = subprocess.run(
+        [sys.executable, "-c", SCRIPT.format(texts=TEXTS)],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True,
+    ).stdout
+    word, vectors = out.split("\n", 1)
+    return int(word), np.frombuffer(bytes.fromhex(vectors), dtype=np.float32).reshape(len(TEXTS), 256)
+
+
+def test_same_vectors_in_every_process():
+    expected = HashingEmbedder(256).transform(TEXTS)
+    for seed in ("0", "1", "12345"):
+        word, vectors = _run(seed)
+        assert word == word_hash("python")
+        assert np.array_equal(vectors, expected)
+
+
+def test_hashes_pinned():
+    # cached vectors from earlier runs (and other machines) must stay valid
+    assert word_hash("python") == 12810737210631960232
+    assert feature_hash("machine learning") == 10312595399771815635
+
+
+def test_feature_hash_matches_transform():
+    embedder = HashingEmbedder(64, ngrams=2)
+    vector = embedder.transform(["machine learning"])[0]
+    buckets = {feature_hash(f) % 64 for f in ("machine", "learning", "machine learning")}
+    assert set(np.flatnonzero(vector)) <= buckets
+
+
+def test_memo_reset_keeps_output(monkeypatch):
+    embedder = HashingEmbedder(128)
+    expected = embedder.transform(TEXTS)
+    monkeypatch.setattr("utils.feature_hashing.MAX_MEMO", 2)
+    assert np.array_equal(embedder.transform(TEXTS), expected)
+
+
+def test_idf_changes_name_and_weights():
+    idf = fit_idf(TEXTS[:2])
+    plain, weighted = HashingEmbedder(128), HashingEmbedder(128, idf=idf)
+    assert plain.name != weighted.name
+    assert np.allclose(np.linalg.norm(weighted.transform(TEXTS[:2]), axis=1), 1.0)
@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+from utils.quantization import QuantizedRows, dequantize, quantize
+
+
+@pytest.fixture
+def vectors():
+    rng = np.random.default_rng(0)
+    rows = rng.standard_normal((200, 384)).astype(np.float32)
+    return rows / np.linalg.norm(rows, axis=1, keepdims=True)
+
+
+def test_int8_round_trip_error_bound(vectors):
+    codes, scales = quantize(vectors, "int8")
+    assert codes.dtype == np.int8
+    error = np.abs(dequantize(codes, scales) - vectors)
+    # rounding to the nearest code: at most half a step (max|x| / 254) per element
+    bound = np.abs(vectors).max(axis=1, keepdims=True) / 254
+    assert np.all(error <= bound * (1 + 1e-5))
+
+
+def test_float16_round_trip_error_bound(vectors):
+    codes, scales = quantize(vectors, "float16")
+    error = np.abs(dequantize(codes, scales) - vectors)
+    # 11 significant bits; unit rows keep every element in float16's normal range or near 0
+    assert np.all(error <= np.abs(vectors) * 2.0 ** -11 + 2.0 ** -24)
+
+
+def test_zero_row(vectors):
+    codes, scales = quantize(np.zeros((1, 8)), "int8")
+    assert not codes.any() and np.all(np.isfinite(scales))
+
+
+@pytest.mark.parametrize("kind", ["int8", "float16", "float32"])
+def test_dot_close_to_float(vectors, kind):
+    rows = QuantizedRows(vectors.shape[1], kind, capacity=len(vectors))
+    rows.set(np.arange(len(vectors)), vectors)
+    queries = vectors[:5]
+    exact = vectors @ queries.T
+    approx = rows.dot(queries)
+    # cosine scores of unit vectors move by well under 0.01
+    assert np.abs(approx - exact).max() < 0.01
+    assert np.array_equal(approx.argmax(axis=0), np.arange(5))
+    assert np.allclose(rows.take(np.arange(3)), vectors[:3], atol=0.01)
+
+
+def test_int8_memory(vectors):
+    rows = QuantizedRows(vectors.shape[1], "int8", capacity=len(vectors))
+    assert rows.nbytes == vectors.nbytes // 4 + 4 * len(vectors)
@@ -0,0 +1,46 @@
+from utils.skills import SkillMatcher, extract_skills
+
+TAXONOMY = {
+    "java": [],
+    "javascript": ["js"],
+    "machine learning": ["ml"],
+    "learning management systems": ["lms"],
+    "sql": [],
+    "sql server": ["mssql"],
+    "c++": ["cpp"],
+}
+
+
+def test_multi_word_skill():
+    matcher = SkillMatcher(TAXONOMY)
+    assert matcher.extract("Built machine learning pipelines") == {"machine learning"}
+    # words must be adjacent and in order
+    assert matcher.extract("machine vision, learning fast") == set()
+
+
+def test_overlapping_skills():
+    matcher = SkillMatcher(TAXONOMY)
+    # "sql server" contains "sql"; both are reported
+    assert matcher.extract("Tuned SQL Server queries") == {"sql", "sql server"}
+    # skills sharing a word are both found ("learning" ends one and starts the other)
+    assert matcher.find("machine learning management systems") == {
+        "machine learning": 1, "learning management systems": 1,
+    }
+    # a longer match that falls through still reports the skill ending inside it
+    assert matcher.extract("machine learning management") == {"machine learning"}
+
+
+def test_word_boundaries():
+    matcher = SkillMatcher(TAXONOMY)
+    assert matcher.extract("JavaScript developer") == {"javascript"}
+    assert matcher.extract("Java, JS and C++.") == {"java", "javascript", "c++"}
+    assert matcher.extract("html5 xml mssqlx") == set()
+
+
+def test_mentions_counted_and_aliases_canonical():
+    matcher = SkillMatcher(TAXONOMY)
+    assert matcher.find("ML and machine learning; cpp") == {"machine learning": 2, "c++": 1}
+
+
+def test_default_taxonomy():
+    assert {"machine learning", "postgresql"} <= extract_skills("Machine learning on Postgres")
@@ -0,0 +1,37 @@
+from utils import sqlite_backend, storage
+from utils.sqlite_backend import SQLiteBackend
+from utils.storage import JSONBackend
+
+
+def _point_at(tmp_path, monkeypatch):
+    """Make tmp_path the instance dir both backends import from"""
+    data_dir, db_file = str(tmp_path / "db"), str(tmp_path / "db.json")
+    monkeypatch.setattr(storage, "DATA_DIR", data_dir)
+    monkeypatch.setattr(storage, "DB_FILE", db_file)
+    monkeypatch.setattr(storage, "JOURNAL_FILE", str(tmp_path / "db.journal"))
+    monkeypatch.setattr(sqlite_backend, "DATA_DIR", data_dir)
+    monkeypatch.setattr(sqlite_backend, "DB_FILE", db_file)
+
+
+def test_first_start_imports_json_store(tmp_path, monkeypatch):
+    _point_at(tmp_path, monkeypatch)
+    source = JSONBackend()
+    source.insert("users", {"id": 1, "email": "a@example.com", "name": "A"})
+    source.insert("users", {"id": 2, "email": "b@example.com"})
+    source.insert("resumes", {"id": 1, "user_id": 1, "filename": "a.pdf"})
+    source.insert("evaluations", {"id": 1, "resume_id": 1, "jd_id": 3, "score": 0.5})
+    source.delete("users", 2)
+
+    store = SQLiteBackend(str(tmp_path / "db.sqlite3"))
+    assert store.load_all() == source.load_all()
+    assert store.find("resumes", "user_id", [1])[0]["filename"] == "a.pdf"
+    assert store.find_pair(1, 3)["score"] == 0.5
+    assert store.next_id("users") > 1
+
+
+def test_existing_sqlite_file_not_reimported(tmp_path, monkeypatch):
+    _point_at(tmp_path, monkeypatch)
+    JSONBackend().insert("users", {"id": 1, "email": "a@example.com"})
+    path = str(tmp_path / "db.sqlite3")
+    SQLiteBackend(path).delete("users", 1)
+    assert SQLiteBackend(path).count("users") == 0
@@ -0,0 +1,64 @@
+import os
+import shutil
+
+from utils.storage import JSONBackend
+
+
+def _shard(store, entity="users"):
+    return store._tables[entity][0]
+
+
+def _reopen(store):
+    return JSONBackend(data_dir=store.data_dir)
+
+
+def _users(store):
+    return {r["id"]: r for r in store.load_all()["users"]}
+
+
+def _fill(store, emails):
+    for email in emails:
+        store.insert("users", {"id": store.next_id("users"), "email": email})
+
+
+def test_journal_replayed_on_start(json_store):
+    _fill(json_store, ["a@example.com", "b@example.com"])
+    json_store.update("users", 1, {"name": "A"})
+    json_store.delete("users", 2)
+    users = _users(_reopen(json_store))
+    assert list(users) == [1] and users[1]["name"] == "A"
+
+
+def test_crash_after_journal_rotated(json_store):
+    # compaction moved the journal aside, then the process died before the snapshot
+    _fill(json_store, ["a@example.com", "b@example.com"])
+    shard = _shard(json_store)
+    os.replace(shard.journal_file, shard.compacting_file)
+    _fill(json_store, ["c@example.com"])
+
+    store = _reopen(json_store)
+    assert sorted(_users(store)) == [1, 2, 3]
+    store.compact()
+    assert not os.path.exists(shard.compacting_file)
+    assert sorted(_users(_reopen(json_store))) == [1, 2, 3]
+
+
+def test_crash_after_snapshot_written(json_store):
+    # the snapshot already holds the rotated journal, which was never removed
+    _fill(json_store, ["a@example.com", "b@example.com"])
+    json_store.update("users", 1, {"name": "A"})
+    shard = _shard(json_store)
+    shutil.copy(shard.journal_file, shard.journal_file + ".saved")
+    json_store.compact()
+    os.replace(shard.journal_file + ".saved", shard.compacting_file)
+    json_store.delete("users", 2)
+
+    users = _users(_reopen(json_store))
+    assert list(users) == [1] and users[1]["name"] == "A"
+
+
+def test_torn_journal_line_ignored(json_store):
+    _fill(json_store, ["a@example.com"])
+    with open(_shard(json_store).journal_file, "a") as f:
+        f.write('{"op": "insert", "entity": "users", "record": {"id": 2')
+    assert sorted(_users(_reopen(json_store))) == [1]
@@ -0,0 +1,53 @@
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.sqlite_backend import SQLiteBackend
+from utils.storage import JSONBackend
+
+IDS_PER_WORKER = 50
+
+
+def _allocate(kind, path, n):
+    store = JSONBackend(data_dir=path) if kind == "json" else SQLiteBackend(path)
+    return [store.next_id("users") for _ in range(n)]
+
+
+def _allocate_into(kind, path, n, queue):
+    queue.put(_allocate(kind, path, n))
+
+
+def _path(store):
+    return store.data_dir if isinstance(store, JSONBackend) else store.path
+
+
+def _kind(store):
+    return "json" if isinstance(store, JSONBackend) else "sqlite"
+
+
+def test_next_id_unique_across_threads(store):
+    with ThreadPoolExecutor(8) as pool:
+        batches = list(pool.map(lambda _: [store.next_id("users") for _ in range(IDS_PER_WORKER)], range(8)))
+    ids = [i for batch in batches for i in batch]
+    assert len(set(ids)) == len(ids) == 8 * IDS_PER_WORKER
+
+
+def test_next_id_unique_across_processes(store):
+    ctx = multiprocessing.get_context("fork")
+    queue = ctx.Queue()
+    workers = [
+        ctx.Process(target=_allocate_into, args=(_kind(store), _path(store), IDS_PER_WORKER, queue))
+        for _ in range(4)
+    ]
+    for worker in workers:
+        worker.start()
+    ids = [i for _ in workers for i in queue.get(timeout=60)]
+    for worker in workers:
+        worker.join(timeout=60)
+        assert worker.exitcode == 0
+    ids += _allocate(_kind(store), _path(store), IDS_PER_WORKER)
+    assert len(set(ids)) == len(ids) == 5 * IDS_PER_WORKER
+
+
+def test_next_id_skips_existing_records(store):
+    store.insert("users", {"id": 7, "email": "a@example.com"})
+    assert store.next_id("users") == 8
@@ -0,0 +1,75 @@
+import pytest
+
+from utils.storage import ConflictError, Transaction
+
+
+def _user(store, email, **fields):
+    record = {"id": store.next_id("users"), "email": email, **fields}
+    store.insert("users", record)
+    return record
+
+
+def test_conflicting_write_aborts_commit(store):
+    user = _user(store, "a@example.com", name="A")
+    tx = Transaction(store)
+    current = tx.get_record("users", user["id"])
+    tx.update_record("users", user["id"], {"name": current["name"] + "!"})
+
+    store.update("users", user["id"], {"name": "B"})  # another worker
+    with pytest.raises(ConflictError):
+        tx.commit()
+    assert store.get("users", user["id"])["name"] == "B"
+
+
+def test_conflict_on_find_result(store):
+    _user(store, "a@example.com")
+    tx = Transaction(store)
+    assert tx.find_by("users", "email", "b@example.com") == []
+    tx.append_to("users", {"id": tx.next_id("users"), "email": "c@example.com"})
+
+    _user(store, "b@example.com")
+    with pytest.raises(ConflictError):
+        tx.commit()
+    assert store.find("users", "email", ["c@example.com"]) == []
+
+
+def test_unrelated_write_commits(store):
+    a = _user(store, "a@example.com", name="A")
+    b = _user(store, "b@example.com", name="B")
+    tx = Transaction(store)
+    tx.get_record("users", a["id"])
+    tx.update_record("users", a["id"], {"name": "A2"})
+
+    store.update("users", b["id"], {"name": "B2"})
+    tx.commit()
+    assert store.get("users", a["id"])["name"] == "A2"
+
+
+def test_duplicate_email_insert_rejected(store):
+    _user(store, "a@example.com")
+    with pytest.raises(ValueError):
+        _user(store, "a@example.com")
+    assert store.count("users") == 1
+
+
+def test_duplicate_email_update_rejected(store):
+    _user(store, "a@example.com")
+    b = _user(store, "b@example.com")
+    with pytest.raises(ValueError):
+        store.update("users", b["id"], {"email": "a@example.com"})
+    assert store.get("users", b["id"])["email"] == "b@example.com"
+
+
+def test_missing_email_not_unique(store):
+    _user(store, None)
+    _user(store, None)
+    assert store.count("users") == 2
+
+
+def test_duplicate_email_in_one_transaction_writes_nothing(store):
+    tx = Transaction(store)
+    tx.append_to("users", {"id": tx.next_id("users"), "email": "a@example.com"})
+    tx.append_to("users", {"id": tx.next_id("users"), "email": "a@example.com"})
+    with pytest.raises(ValueError):
+        tx.commit()
+    assert store.count("users") == 0
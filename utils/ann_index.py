@@ -0,0 +1,363 @@
+import atexit
+import os
+import threading
+import uuid
+
+import numpy as np
+
+from utils import storage
+from utils.embedding import EMBEDDING_DIM
+from utils.evaluator import load_profiles
+from utils.quantization import QuantizedRows, quantize
+from utils.similarity import _version, normalize_rows
+
+# --------------------------
+# Index location / tuning
+# --------------------------
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+ANN_DIR = os.path.join(BASE_DIR, "instance", "ann")
+
+# below this many vectors search is brute force (no clustering)
+MIN_TRAIN = int(os.environ.get("ANN_MIN_TRAIN", 2048))
+# clusters probed per query
+NPROBE = int(os.environ.get("ANN_NPROBE", 8))
+# incremental changes between two snapshots on disk
+SAVE_EVERY = int(os.environ.get("ANN_SAVE_EVERY", 256))
+
+
+# --------------------------
+# k-means (spherical, numpy only)
+# --------------------------
+def kmeans(vectors: np.ndarray, k: int, iterations: int = 10, seed: int = 0) -> np.ndarray:
+    """Unit-norm centroids of `vectors` (rows assumed L2-normalized) by cosine k-means"""
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(len(vectors), k, replace=False)].copy()
+    for _ in range(iterations):
+        assign = np.argmax(vectors @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assign, vectors)
+        empty = np.bincount(assign, minlength=k) == 0
+        # re-seed empty clusters with random points
+        sums[empty] = vectors[rng.choice(len(vectors), int(empty.sum()))]
+        centroids = normalize_rows(sums)
+    return centroids
+
+
+# --------------------------
+# IVF index
+# --------------------------
+class IVFIndex:
+    """
+    Inverted-file index over L2-normalized vectors keyed by record id.
+    k-means coarse quantizer; a query scans only the `nprobe` closest clusters.
+    Vectors live in one (capacity, dim) QuantizedRows matrix (int8 by
+    default, scored without dequantizing it); each cluster keeps the rows
+    assigned to it. add() / remove() are incremental; once the index has
+    grown 4x since the last training it is training_due(), and the owner
+    retrains it (train(), or training_sample() + install() to run the
+    k-means outside its lock).
+    """
+
+    def __init__(self, dim: int = EMBEDDING_DIM, nprobe: int = None, min_train: int = None,
+                 quantization: str = None):
+        self.dim = dim
+        self.nprobe = nprobe or NPROBE
+        self.min_train = MIN_TRAIN if min_train is None else min_train
+        self.vectors = QuantizedRows(dim, quantization)
+        self.row_ids = np.zeros(0, dtype=np.int64)  # row -> record id (-1 = free)
+        self.rows = {}       # record id -> row
+        self.versions = {}   # record id -> what the vector was built from
+        self.free = []
+        self.centroids = None
+        self.assign = np.zeros(0, dtype=np.int32)   # row -> cluster
+        self.lists = []      # cluster -> set of rows
+        self._arrays = {}    # cluster -> np.array of rows (cached)
+        self.trained_size = 0
+
+    def __len__(self):
+        return len(self.rows)
+
+    # ---- rows ----
+    def _alloc(self):
+        if self.free:
+            return self.free.pop()
+        row = len(self.rows)
+        if row >= len(self.vectors):
+            size = max(1024, 2 * len(self.vectors))
+            self.vectors.grow(size)
+            row_ids = np.full(size, -1, dtype=np.int64)
+            row_ids[:len(self.row_ids)] = self.row_ids
+            assign = np.zeros(size, dtype=np.int32)
+            assign[:len(self.assign)] = self.assign
+            self.row_ids, self.assign = row_ids, assign
+        return row
+
+    def _link(self, row):
+        if self.centroids is not None:
+            cluster = int(np.argmax(self.vectors.dot(self.centroids, [row])[0]))
+            self.assign[row] = cluster
+            self.lists[cluster].add(row)
+            self._arrays.pop(cluster, None)
+
+    def _unlink(self, row):
+        if self.centroids is not None:
+            cluster = int(self.assign[row])
+            self.lists[cluster].discard(row)
+            self._arrays.pop(cluster, None)
+
+    def add(self, rid, vector, version=None):
+        """Insert or replace the vector of record `rid`"""
+        vec = normalize_rows(np.asarray(vector, dtype=np.float32).reshape(1, self.dim))[0]
+        row = self.rows.get(rid)
+        if row is None:
+            row = self._alloc()
+            self.rows[rid] = row
+        else:
+            self._unlink(row)
+        self.vectors.set(row, vec)
+        self.row_ids[row] = rid
+        self.versions[rid] = version
+        self._link(row)
+
+    def remove(self, rid):
+        row = self.rows.pop(rid, None)
+        self.versions.pop(rid, None)
+        if row is None:
+            return
+        self._unlink(row)
+        self.vectors.clear(row)
+        self.row_ids[row] = -1
+        self.free.append(row)
+
+    # ---- quantizer ----
+    def training_due(self) -> bool:
+        """True once there is enough to train on and the index grew 4x since the last training"""
+        return len(self.rows) >= max(self.min_train, 4 * self.trained_size)
+
+    def training_sample(self):
+        """(normalized sample vectors (a copy), cluster count) to train on, or None if too few rows"""
+        live = np.fromiter(self.rows.values(), dtype=np.int64, count=len(self.rows))
+        if len(live) < max(self.min_train, 1):
+            return None
+        nlist = max(1, int(np.sqrt(len(live))))
+        rng = np.random.default_rng(0)
+        sample = live if len(live) <= 256 * nlist else rng.choice(live, 256 * nlist, replace=False)
+        return normalize_rows(self.vectors.take(sample)), nlist
+
+    def train(self, iterations: int = 10):
+        """(Re)build the coarse quantizer: ~sqrt(n) clusters, trained on a sample"""
+        sample = self.training_sample()
+        if sample is None:
+            self.centroids, self.lists, self._arrays, self.trained_size = None, [], {}, 0
+            return
+        self.install(kmeans(sample[0], sample[1], iterations))
+
+    def install(self, centroids: np.ndarray):
+        """Switch to new centroids (e.g. trained elsewhere): reassign every live row"""
+        live = np.fromiter(self.rows.values(), dtype=np.int64, count=len(self.rows))
+        nlist = len(centroids)
+        self.centroids = centroids
+        assign = np.argmax(self.vectors.dot(self.centroids, live), axis=1).astype(np.int32)
+        self.assign[live] = assign
+        self.lists = [set() for _ in range(nlist)]
+        for row, cluster in zip(live.tolist(), assign.tolist()):
+            self.lists[cluster].add(row)
+        self._arrays = {}
+        self.trained_size = len(live)
+
+    # ---- search ----
+    def _candidates(self, query, nprobe):
+        if self.centroids is None:
+            used = len(self.rows) + len(self.free)
+            return np.flatnonzero(self.row_ids[:used] >= 0) if self.free else np.arange(used)
+        probe = np.argsort(-(self.centroids @ query))[:nprobe]
+        arrays = []
+        for cluster in probe.tolist():
+            rows = self._arrays.get(cluster)
+            if rows is None:
+                rows = self._arrays[cluster] = np.fromiter(self.lists[cluster], dtype=np.int64)
+            arrays.append(rows)
+        return np.concatenate(arrays) if arrays else np.zeros(0, dtype=np.int64)
+
+    def search(self, vector, k: int = 10, nprobe: int = None):
+        """[(record id, cosine similarity)] of the (approximately) k nearest vectors"""
+        query = normalize_rows(np.asarray(vector, dtype=np.float32).reshape(1, self.dim))[0]
+        rows = self._candidates(query, nprobe or self.nprobe)
+        if not len(rows):
+            return []
+        sims = self.vectors.dot(query, rows)[:, 0]
+        k = min(k, len(rows))
+        top = np.argpartition(-sims, k - 1)[:k]
+        top = top[np.argsort(-sims[top])]
+        return [(int(self.row_ids[rows[i]]), float(sims[i])) for i in top]
+
+    # ---- persistence ----
+    def save(self, path: str):
+        """Atomic snapshot (npz) of the live rows (quantized, as in memory) and the quantizer"""
+        ids = np.fromiter(self.rows.keys(), dtype=np.int64, count=len(self.rows))
+        rows = np.fromiter(self.rows.values(), dtype=np.int64, count=len(self.rows))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.{uuid.uuid4().hex[:8]}.tmp.npz"
+        np.savez(
+            tmp,
+            ids=ids,
+            codes=self.vectors.codes[rows],
+            scales=self.vectors.scales[rows],
+            versions=np.array(["|".join(map(str, self.versions[i])) if self.versions.get(i) else "" for i in ids.tolist()]),
+            centroids=self.centroids if self.centroids is not None else np.zeros((0, self.dim), dtype=np.float32),
+            trained_size=np.array(self.trained_size),
+        )
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str, **kwargs):
+        index = cls(**kwargs)
+        with np.load(path) as data:
+            ids, versions = data["ids"], data["versions"]
+            if "codes" in data:
+                codes, scales = data["codes"], data["scales"]
+            else:  # float32 snapshot from before quantization
+                codes, scales = quantize(data["vectors"], index.vectors.kind)
+            if codes.dtype != index.vectors.codes.dtype:  # EMBEDDING_QUANTIZATION changed
+                codes, scales = quantize(codes.astype(np.float32) * scales[:, None], index.vectors.kind)
+            rows = []
+            for rid, version in zip(ids.tolist(), versions.tolist()):
+                row = index._alloc()
+                index.rows[rid] = row
+                index.row_ids[row] = rid
+                index.versions[rid] = tuple(v if v != "None" else None for v in version.split("|")) if version else None
+                rows.append(row)
+            index.vectors.codes[rows] = codes
+            index.vectors.scales[rows] = scales
+            if len(data["centroids"]):
+                index.centroids = data["centroids"]
+                index.trained_size = int(data["trained_size"])
+                live = np.fromiter(index.rows.values(), dtype=np.int64, count=len(index.rows))
+                index.assign[live] = np.argmax(index.vectors.dot(index.centroids, live), axis=1)
+                index.lists = [set() for _ in range(len(index.centroids))]
+                for row in live.tolist():
+                    index.lists[int(index.assign[row])].add(row)
+        return index
+
+
+# --------------------------
+# resume index (kept in sync with storage)
+# --------------------------
+class ResumeIndex:
+    """
+    IVF index over resume embeddings, persisted to instance/ann/resumes.npz.
+    Uploads / deletes update it incrementally (index_resume / unindex_resume).
+    Before a query it catches up with the resumes written since the last
+    sync (e.g. by another worker process), see storage.changes_since.
+    """
+
+    def __init__(self, path: str = None):
+        self.path = path or os.path.join(ANN_DIR, "resumes.npz")
+        self._lock = threading.RLock()
+        self._cursor = None
+        self._training = None
+        self._dirty = 0
+        try:
+            self.index = IVFIndex.load(self.path)
+        except (FileNotFoundError, OSError, KeyError, ValueError):
+            self.index = IVFIndex()
+
+    def _changed(self, n=1):
+        self._dirty += n
+        if self._dirty >= SAVE_EVERY:
+            self.save()
+
+    def save(self):
+        with self._lock:
+            if self._dirty:
+                self.index.save(self.path)
+                self._dirty = 0
+
+    def add_records(self, records):
+        records = [r for r in records if self.index.versions.get(r["id"], "missing") != _version(r)]
+        if not records:
+            return
+        vectors = [p.embedding for p in load_profiles(records)]
+        with self._lock:
+            for record, vec in zip(records, vectors):
+                self.index.add(record["id"], vec, _version(record))
+            self._changed(len(records))
+            if self.index.training_due():
+                self._retrain_later()
+
+    def _retrain_later(self):
+        """Retrain the quantizer in a background thread (caller holds the lock)"""
+        if self._training is None or not self._training.is_alive():
+            self._training = threading.Thread(target=self._retrain, name="ann-train", daemon=True)
+            self._training.start()
+
+    def _retrain(self):
+        # k-means on a copied sample outside the lock; queries and uploads go on meanwhile
+        with self._lock:
+            sample = self.index.training_sample()
+        if sample is None:
+            return
+        centroids = kmeans(*sample)
+        with self._lock:
+            self.index.install(centroids)
+            self._changed(SAVE_EVERY)  # snapshot the new quantizer
+
+    def remove(self, rid):
+        with self._lock:
+            if rid in self.index.rows:
+                self.index.remove(rid)
+                self._changed()
+
+    def sync(self):
+        """
+        Reconcile with storage: only the resumes written since the last sync
+        are looked at; all of them on the first sync (or if storage lost track)
+        """
+        cursor, changed = storage.changes_since("resumes", self._cursor)
+        if changed is None:
+            records = list(storage.iter_records("resumes"))
+            live = {r["id"] for r in records}
+            with self._lock:
+                gone = [rid for rid in self.index.rows if rid not in live]
+        else:
+            if not changed:
+                return
+            found = {rid: storage.get_record("resumes", rid) for rid in changed}
+            records = [r for r in found.values() if r]
+            gone = [rid for rid, r in found.items() if r is None]
+        with self._lock:
+            gone = [rid for rid in gone if rid in self.index.rows]
+            for rid in gone:
+                self.index.remove(rid)
+            self._changed(len(gone))
+        self.add_records(records)
+        self._cursor = cursor
+
+    def search(self, vector, k: int = 50, nprobe: int = None):
+        self.sync()
+        with self._lock:
+            return self.index.search(vector, k, nprobe)
+
+
+_resume_index = None
+_resume_index_lock = threading.Lock()
+
+
+def get_resume_index() -> ResumeIndex:
+    global _resume_index
+    if _resume_index is None:
+        with _resume_index_lock:
+            if _resume_index is None:
+                _resume_index = ResumeIndex()
+                atexit.register(_resume_index.save)
+    return _resume_index
+
+
+def index_resume(record: dict):
+    """Add / refresh one resume in the ANN index (call after upload / update)"""
+    get_resume_index().add_records([record])
+
+
+def unindex_resume(resume_id: int):
+    """Drop a deleted resume from the ANN index"""
+    get_resume_index().remove(resume_id)
@@ -0,0 +1,79 @@
+import functools
+import hashlib
+import os
+import uuid
+
+# --------------------------
+# Blob directory
+# --------------------------
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+BLOB_DIR = os.path.join(BASE_DIR, "instance", "blobs")
+
+
+# --------------------------
+# helpers
+# --------------------------
+def text_hash(text: str) -> str:
+    """Content address of a text (sha256 hex of its utf-8 bytes)"""
+    return hashlib.sha256((text or "").encode("utf-8")).hexdigest()
+
+
+def _path(ref: str) -> str:
+    """Sharded location: blobs/ab/cd/abcd...."""
+    return os.path.join(BLOB_DIR, ref[:2], ref[2:4], ref)
+
+
+# --------------------------
+# put / get
+# --------------------------
+def put_text(text: str) -> str:
+    """
+    Store text under its content hash and return the hash.
+    Identical texts share one blob; existing blobs are never rewritten.
+    """
+    ref = text_hash(text)
+    path = _path(ref)
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{uuid.uuid4().hex[:8]}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(text or "")
+        os.replace(tmp, path)
+    return ref
+
+
+@functools.lru_cache(maxsize=256)
+def _read(ref: str) -> str:
+    # raises FileNotFoundError, which lru_cache doesn't remember
+    with open(_path(ref), "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def get_text(ref: str) -> str:
+    """
+    Load a blob by hash ("" if missing). Blobs are immutable, so found ones
+    are cached; a miss isn't (the blob may be written a moment later).
+    """
+    try:
+        return _read(ref)
+    except FileNotFoundError:
+        return ""
+
+
+def has_blob(ref: str) -> bool:
+    return os.path.exists(_path(ref))
+
+
+# --------------------------
+# garbage collection
+# --------------------------
+def gc(live_refs) -> int:
+    """Delete blobs not in `live_refs`; returns the number removed"""
+    live = set(live_refs)
+    removed = 0
+    for root, _, files in os.walk(BLOB_DIR):
+        for name in files:
+            if name not in live and not name.endswith(".tmp"):
+                os.remove(os.path.join(root, name))
+                removed += 1
+    return removed
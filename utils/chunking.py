@@ -0,0 +1,55 @@
+import os
+import zlib
+
+import numpy as np
+
+# --------------------------
+# Chunk sizes (words)
+# --------------------------
+# all-MiniLM-L6-v2 reads at most 256 word pieces (~180 words): stay below
+CHUNK_MAX_WORDS = int(os.environ.get("EMBEDDING_CHUNK_MAX_WORDS", 160))
+CHUNK_MIN_WORDS = int(os.environ.get("EMBEDDING_CHUNK_MIN_WORDS", 48))
+# past the minimum, a word ends a chunk with probability 1 / CHUNK_BOUNDARY
+CHUNK_BOUNDARY = int(os.environ.get("EMBEDDING_CHUNK_BOUNDARY", 48))
+
+# bump whenever split_chunks / pool change: with the sizes above it names
+# how a document's embedding was built, so keys of older ones are not reused
+POOLING_VERSION = "1"
+CHUNKING_VERSION = f"pool{POOLING_VERSION}-{CHUNK_MAX_WORDS}-{CHUNK_MIN_WORDS}-{CHUNK_BOUNDARY}"
+
+
+# --------------------------
+# content-defined chunking
+# --------------------------
+def split_chunks(text: str):
+    """
+    Split cleaned text into chunks of CHUNK_MIN_WORDS..CHUNK_MAX_WORDS words.
+    Boundaries are content-defined (a chunk ends after a word whose crc32 is
+    0 mod CHUNK_BOUNDARY), not every N words, so an edit only changes the
+    chunk(s) around it - the others, and their cached embeddings, stay the same.
+    """
+    words = text.split()
+    if len(words) <= CHUNK_MAX_WORDS:
+        return [text] if words else []
+    chunks, start = [], 0
+    for i, word in enumerate(words):
+        size = i + 1 - start
+        if size >= CHUNK_MAX_WORDS or (
+            size >= CHUNK_MIN_WORDS and zlib.crc32(word.encode("utf-8")) % CHUNK_BOUNDARY == 0
+        ):
+            chunks.append(" ".join(words[start:i + 1]))
+            start = i + 1
+    if start < len(words):
+        tail = " ".join(words[start:])
+        # fold a short tail into the last chunk if that still fits the model
+        if len(words) - start < CHUNK_MIN_WORDS and len(chunks[-1].split()) + len(words) - start <= CHUNK_MAX_WORDS:
+            chunks[-1] = f"{chunks[-1]} {tail}"
+        else:
+            chunks.append(tail)
+    return chunks
+
+
+def pool(vectors: np.ndarray, weights) -> np.ndarray:
+    """Document vector: mean of chunk vectors weighted by chunk length"""
+    weights = np.asarray(weights, dtype=np.float32)
+    return (np.asarray(vectors, dtype=np.float32) * weights[:, None]).sum(axis=0) / weights.sum()
@@ -1,6 +1,45 @@
 import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+
 import numpy as np
 
+from utils.embedding_cache import EmbeddingCache
+from utils.feature_hashing import HashingEmbedder
+from utils.chunking import CHUNKING_VERSION, split_chunks, pool
+from utils.embedding_server import EmbeddingClient
+
+MODEL_NAME = "all-MiniLM-L6-v2"
+EMBEDDING_DIM = 384
+# texts per model.encode() forward pass in embed_many
+BATCH_SIZE = int(os.environ.get("EMBEDDING_BATCH_SIZE", 64))
+
+_settings = {
+    # shared model server (utils/embedding_server.py); unset = load the model in-process
+    "EMBEDDING_SERVER_SOCKET": os.environ.get("EMBEDDING_SERVER_SOCKET"),
+    "EMBEDDING_SERVER_TIMEOUT": float(os.environ.get("EMBEDDING_SERVER_TIMEOUT", 30)),
+    # micro-batching of concurrent encodes: wait up to this long for company (0 = off) ...
+    "EMBEDDING_BATCH_WINDOW_MS": float(os.environ.get("EMBEDDING_BATCH_WINDOW_MS", 5)),
+    # ... or until this many texts are queued
+    "EMBEDDING_MAX_BATCH": int(os.environ.get("EMBEDDING_MAX_BATCH", BATCH_SIZE)),
+}
+
+
+def configure(config):
+    """
+    Embedding settings from a config mapping (app.config):
+    EMBEDDING_SERVER_SOCKET = path of a running embedding server's socket,
+    EMBEDDING_SERVER_TIMEOUT = seconds to wait for it to be ready,
+    EMBEDDING_BATCH_WINDOW_MS / EMBEDDING_MAX_BATCH = micro-batching limits.
+    """
+    global _batcher
+    keys = ("EMBEDDING_SERVER_SOCKET", "EMBEDDING_SERVER_TIMEOUT",
+            "EMBEDDING_BATCH_WINDOW_MS", "EMBEDDING_MAX_BATCH")
+    _settings.update({k: config[k] for k in keys if k in config})
+    _batcher = None
+
 # --------------------------
 # clean text (reusable)
 # --------------------------
@@ -14,37 +53,338 @@ def clean_text(text: str) -> str:
 # embedding backend (lazy load)
 # --------------------------
 _model = None
+_model_name = MODEL_NAME
+_model_lock = threading.Lock()
+_hasher = None
+_ready = threading.Event()
+
+def _connect_server(path: str):
+    """
+    Client for the shared model server, False if its model failed to load,
+    None if unreachable. A server still loading its model is waited for
+    (another EMBEDDING_SERVER_TIMEOUT at a time): it will be ready shortly.
+    """
+    global _model_name
+    client = EmbeddingClient(path)
+    while True:
+        status = client.wait_ready(_settings["EMBEDDING_SERVER_TIMEOUT"])
+        if status.get("ready"):
+            _model_name = status["model"]
+            return client
+        if not status.get("loading"):
+            break
+        print(f"[embedding] server at {path} is still loading {status.get('model')}, waiting")
+    if "loading" in status:  # the server answered: loading the model failed there
+        print(f"[embedding] server at {path} could not load the model: {status.get('error')}")
+        return False
+    print(f"[embedding] {status.get('error')} at {path}, loading the model in-process")
+    return None
+
 
 def _load_model():
     global _model
     if _model is None:
-        try:
-            from sentence_transformers import SentenceTransformer
-            _model = SentenceTransformer("all-MiniLM-L6-v2")
-        except ImportError:
-            _model = False  # no transformer available
+        with _model_lock:
+            if _model is None:
+                model = None
+                if _settings["EMBEDDING_SERVER_SOCKET"]:
+                    model = _connect_server(_settings["EMBEDDING_SERVER_SOCKET"])
+                if model is None:
+                    try:
+                        from sentence_transformers import SentenceTransformer
+                        model = SentenceTransformer(MODEL_NAME)
+                    except ImportError:
+                        model = False  # no transformer available
+                _model = model
     return _model
 
 
-def get_embedding(text: str):
+def _load_hasher() -> HashingEmbedder:
+    """Fallback backend: deterministic feature hashing (same vectors in every process)"""
+    global _hasher
+    if _hasher is None:
+        _hasher = HashingEmbedder.from_env(EMBEDDING_DIM)
+    return _hasher
+
+
+# --------------------------
+# embedding cache (memory LRU + instance/embeddings on disk)
+# --------------------------
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_cache() -> EmbeddingCache:
+    """Cache for the active embedding backend (created on first use)"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                name = _model_name if _load_model() else _load_hasher().name
+                _cache = EmbeddingCache(name, EMBEDDING_DIM)
+    return _cache
+
+
+# --------------------------
+# micro-batching scheduler
+# --------------------------
+class MicroBatcher:
     """
-    Generate embedding for a given text.
-    - HuggingFace (384 dims) if available
-    - Fallback to hash-based embedding (fixed length: 384)
+    Coalesces concurrent encode calls into one batched forward pass.
+    Callers submit() texts and get a Future; a single worker thread takes
+    the first waiting request, keeps collecting for up to `window_ms` (or
+    until `max_batch` texts are queued), encodes the distinct texts in one
+    `encode_fn` call and hands each caller its own rows. The window starts
+    when the first request arrives, so it caps the latency a request adds.
+    encode() waits at most `timeout` seconds, and encodes inline if the
+    worker thread is gone.
     """
-    text = clean_text(text)
-    if not text:
-        return np.zeros(384).tolist()
 
+    def __init__(self, encode_fn, window_ms: float, max_batch: int, timeout: float = 120):
+        self.encode_fn = encode_fn
+        self.window = window_ms / 1000.0
+        self.max_batch = max_batch
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._pid = None
+        self._thread = None
+        self.batches = self.texts = 0
+
+    def _alive(self) -> bool:
+        return self._pid == os.getpid() and self._thread is not None and self._thread.is_alive()
+
+    def _start(self):
+        # (re)started lazily, again in a forked child (threads don't survive
+        # fork) and if the worker died; a live queue keeps its waiting items
+        with self._lock:
+            if not self._alive():
+                if self._pid != os.getpid():
+                    self._queue = queue.Queue()
+                self._thread = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+                self._thread.start()
+                self._pid = os.getpid()
+
+    def submit(self, texts) -> Future:
+        if not self._alive():
+            self._start()
+        future = Future()
+        self._queue.put((list(texts), future))
+        return future
+
+    def encode(self, texts) -> np.ndarray:
+        texts = list(texts)
+        future = self.submit(texts)
+        deadline = time.monotonic() + self.timeout
+        while True:
+            try:
+                return future.result(timeout=max(0.0, min(1.0, deadline - time.monotonic())))
+            except FutureTimeout:
+                if not self._alive():
+                    print("[embedding] batcher thread died, encoding inline")
+                    return self.encode_fn(texts)
+                if time.monotonic() >= deadline:
+                    raise TimeoutError(f"embedding batch not done within {self.timeout:g}s")
+
+    def _collect(self):
+        items = [self._queue.get()]
+        queued = len(items[0][0])
+        deadline = time.monotonic() + self.window
+        while queued < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            items.append(item)
+            queued += len(item[0])
+        return items
+
+    def _run(self):
+        while True:
+            items = []
+            try:
+                items = self._collect()
+                rows = {}
+                for texts, _ in items:
+                    for text in texts:
+                        rows.setdefault(text, len(rows))
+                vectors = self.encode_fn(list(rows))
+                self.batches += 1
+                self.texts += len(rows)
+                for texts, future in items:
+                    future.set_result(vectors[[rows[t] for t in texts]])
+            except Exception as e:
+                # whatever failed (a bad text, the model, slicing): fail this
+                # batch's callers, keep the worker alive for the next one
+                for _, future in items:
+                    if not future.done():
+                        future.set_exception(e)
+
+
+_batcher = None
+
+
+def _get_batcher():
+    global _batcher
+    if _batcher is None and _settings["EMBEDDING_BATCH_WINDOW_MS"] > 0:
+        with _model_lock:
+            if _batcher is None:
+                _batcher = MicroBatcher(
+                    lambda texts: np.asarray(_load_model().encode(texts, batch_size=BATCH_SIZE), dtype=np.float32),
+                    _settings["EMBEDDING_BATCH_WINDOW_MS"],
+                    _settings["EMBEDDING_MAX_BATCH"],
+                )
+    return _batcher
+
+
+def _encode_many(texts, batch_size: int = None) -> np.ndarray:
+    """Run the model (or the fallback) on already-cleaned texts"""
     model = _load_model()
-    if model:
-        return model.encode(text).tolist()
+    batcher = _get_batcher() if model else None
+    if batcher is not None:
+        vectors = batcher.encode(texts)
+    elif model:
+        vectors = np.asarray(model.encode(texts, batch_size=batch_size or BATCH_SIZE), dtype=np.float32)
+    else:
+        # feature hashing is cheap per call: no point in waiting for a batch
+        vectors = _load_hasher().transform(texts)
+    _ready.set()
+    return vectors
+
+
+def _encode(text: str) -> np.ndarray:
+    return _encode_many([text])[0]
 
-    # fallback dummy embedding (fixed length 384)
-    vec = np.zeros(384)
-    for i, word in enumerate(text.split()[:384]):
-        vec[i] = (hash(word) % 1000) / 1000.0
-    return vec.tolist()
+
+def warm_up():
+    """
+    Load the backend and run one encode so the first real request doesn't
+    pay for it (sets the readiness flag, see is_ready)
+    """
+    get_cache()
+    _encode("warm up")
+
+
+def is_ready() -> bool:
+    """True once the backend has encoded something (model loaded and warm)"""
+    return _ready.is_set()
+
+
+def _document_key(cache: EmbeddingCache, text: str, chunks) -> bytes:
+    """
+    Cache key of a cleaned document: its own text if it is one chunk, else
+    marked as pooled under the chunking parameters it was pooled with
+    """
+    return cache.key(text if len(chunks) <= 1 else f"pooled-chunks/{CHUNKING_VERSION}\0{text}")
+
+
+def _embed_chunks(chunks, batch_size: int = None) -> np.ndarray:
+    """
+    Embeddings of cleaned chunks, (n, 384) float32. Cached chunks are looked
+    up by content hash; the rest (deduplicated) go through the model in a
+    single batched encode call.
+    """
+    out = np.zeros((len(chunks), EMBEDDING_DIM), dtype=np.float32)
+    cache = get_cache()
+    missing = {}
+    for i, chunk in enumerate(chunks):
+        key = cache.key(chunk)
+        vec = cache.get(key)
+        if vec is None:
+            missing.setdefault(chunk, (key, []))[1].append(i)
+        else:
+            out[i] = vec
+
+    if missing:
+        todo = list(missing)
+        vectors = _encode_many(todo, batch_size)
+        cache.put_many([(missing[t][0], v) for t, v in zip(todo, vectors)])
+        for chunk, vec in zip(todo, vectors):
+            out[missing[chunk][1]] = vec
+    return out
+
+
+def embed(text: str) -> np.ndarray:
+    """
+    float32 embedding of `text`, encoded at most once per distinct cleaned
+    text (see get_cache). The returned array is shared - don't modify it.
+    """
+    return embed_many([text])[0]
+
+
+def embed_many(texts, batch_size: int = None) -> np.ndarray:
+    """
+    Embeddings of many texts as one (n, 384) float32 matrix.
+    Texts longer than the model's input are split into content-defined
+    chunks (utils/chunking.py), embedded chunk by chunk and pooled, so the
+    whole document counts. Chunks are cached by content: when a document
+    is revised only its changed chunks are encoded again. Uncached chunks
+    of all texts go through the model in one batched encode call.
+    """
+    cleaned = [clean_text(t) for t in texts]
+    out = np.zeros((len(cleaned), EMBEDDING_DIM), dtype=np.float32)
+    cache = get_cache()
+    missing = {}  # document -> (key, chunks, rows)
+    for i, text in enumerate(cleaned):
+        if not text:
+            continue
+        if text in missing:
+            missing[text][2].append(i)
+            continue
+        chunks = split_chunks(text)
+        key = _document_key(cache, text, chunks)
+        vec = cache.get(key)
+        if vec is None:
+            missing[text] = (key, chunks, [i])
+        else:
+            out[i] = vec
+
+    if missing:
+        docs = list(missing.values())
+        vectors = _embed_chunks([c for _, chunks, _ in docs for c in chunks], batch_size)
+        pooled, offset = [], 0
+        for key, chunks, rows in docs:
+            part = vectors[offset:offset + len(chunks)]
+            offset += len(chunks)
+            if len(chunks) == 1:
+                vec = part[0]  # already cached under the document's own key
+            else:
+                vec = pool(part, [len(c.split()) for c in chunks])
+                pooled.append((key, vec))
+            out[rows] = vec
+        if pooled:
+            cache.put_many(pooled)
+    return out
+
+
+def embedding_key(text: str) -> bytes:
+    """Cache key of `text` for the active embedding backend"""
+    text = clean_text(text)
+    return _document_key(get_cache(), text, split_chunks(text))
+
+
+def embedding_model() -> str:
+    """
+    What a stored embedding_key is only valid for: the active backend and
+    the chunking / pooling version (a document's key depends on both)
+    """
+    return f"{get_cache().model_name}/{CHUNKING_VERSION}"
+
+
+def cached_embedding(key: bytes):
+    """Embedding stored under `key` (see embedding_key), or None"""
+    return get_cache().get(key)
+
+
+def get_embedding(text: str):
+    """
+    Generate embedding for a given text.
+    - HuggingFace (384 dims) if available
+    - Fallback to feature-hashing embedding (fixed length: 384, see utils/feature_hashing.py)
+    Served from the embedding cache when the text was seen before.
+    """
+    return embed(text).tolist()
 
 
 # --------------------------
@@ -65,8 +405,11 @@ def compare_texts(text1: str, text2: str):
     Compare two texts → returns score (0–100) and verdict.
     Verdict is auto-classified: high / medium / low match.
     """
-    emb1 = get_embedding(text1)
-    emb2 = get_embedding(text2)
+    return compare_embeddings(embed(text1), embed(text2))
+
+
+def compare_embeddings(emb1, emb2):
+    """compare_texts on precomputed embeddings"""
     similarity = cosine_similarity(emb1, emb2)
     score = int(similarity * 100)
 
@@ -0,0 +1,243 @@
+import collections
+import hashlib
+import json
+import os
+import re
+import threading
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - non-POSIX: single-process use only
+    fcntl = None
+
+# --------------------------
+# Cache location / budget
+# --------------------------
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+CACHE_DIR = os.path.join(BASE_DIR, "instance", "embeddings")
+
+# in-memory tier budget (bytes of vector data)
+MEMORY_BYTES = int(os.environ.get("EMBEDDING_CACHE_BYTES", 64 * 1024 * 1024))
+
+KEY_SIZE = 32  # sha256 digest
+
+
+# --------------------------
+# helpers
+# --------------------------
+def cache_key(model_name: str, text: str) -> bytes:
+    """Stable key of (model, cleaned text): sha256 digest"""
+    return hashlib.sha256(f"{model_name}\0{text}".encode("utf-8")).digest()
+
+
+def _slug(name: str) -> str:
+    return re.sub(r"[^A-Za-z0-9_.-]+", "_", name)
+
+
+# --------------------------
+# Memory tier: LRU bounded by bytes
+# --------------------------
+class _LRU:
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self._items = collections.OrderedDict()
+
+    def get(self, key):
+        vec = self._items.get(key)
+        if vec is not None:
+            self._items.move_to_end(key)
+        return vec
+
+    def put(self, key, vec):
+        old = self._items.pop(key, None)
+        if old is not None:
+            self.bytes -= old.nbytes
+        if vec.nbytes > self.max_bytes:
+            return
+        self._items[key] = vec
+        self.bytes += vec.nbytes
+        while self.bytes > self.max_bytes:
+            _, evicted = self._items.popitem(last=False)
+            self.bytes -= evicted.nbytes
+
+
+# --------------------------
+# Disk tier: append-only float32 matrix + key file
+# --------------------------
+class _DiskStore:
+    """
+    <dir>/vectors.f32  rows of `dim` float32 (read through np.memmap)
+    <dir>/keys.bin     one 32-byte key per row, same order
+    Rows are only ever appended (vectors first, then key) under an exclusive
+    flock, so a key on disk always has its vector. Other processes' appends
+    are picked up when the files grow.
+    """
+
+    def __init__(self, directory: str, dim: int):
+        self.dir = directory
+        self.dim = dim
+        self.row_bytes = dim * 4
+        self.vectors_file = os.path.join(directory, "vectors.f32")
+        self.keys_file = os.path.join(directory, "keys.bin")
+        self.lock_file = os.path.join(directory, "store.lock")
+        os.makedirs(directory, exist_ok=True)
+        self._check_meta()
+        self._rows = {}
+        self._keys_read = 0  # bytes of keys.bin already indexed
+        self._matrix = None
+
+    def _check_meta(self):
+        meta_file = os.path.join(self.dir, "meta.json")
+        if os.path.exists(meta_file):
+            with open(meta_file, "r") as f:
+                meta = json.load(f)
+            if meta.get("dim") != self.dim:
+                raise ValueError(f"embedding cache {self.dir} holds dim {meta.get('dim')}, expected {self.dim}")
+        else:
+            with open(meta_file, "w") as f:
+                json.dump({"dim": self.dim, "dtype": "float32"}, f)
+
+    def _refresh(self):
+        """Index keys appended since the last look (by us or other processes)"""
+        try:
+            size = os.path.getsize(self.keys_file)
+        except FileNotFoundError:
+            return
+        size -= size % KEY_SIZE
+        if size <= self._keys_read:
+            return
+        with open(self.keys_file, "rb") as f:
+            f.seek(self._keys_read)
+            data = f.read(size - self._keys_read)
+        row = self._keys_read // KEY_SIZE
+        for i in range(0, len(data), KEY_SIZE):
+            self._rows[data[i:i + KEY_SIZE]] = row
+            row += 1
+        self._keys_read = size
+        self._matrix = None  # file grew: remap
+
+    def _map(self):
+        if self._matrix is None:
+            rows = os.path.getsize(self.vectors_file) // self.row_bytes
+            self._matrix = np.memmap(self.vectors_file, dtype=np.float32, mode="r", shape=(rows, self.dim))
+        return self._matrix
+
+    def get(self, key):
+        row = self._rows.get(key)
+        if row is None:
+            self._refresh()
+            row = self._rows.get(key)
+            if row is None:
+                return None
+        matrix = self._map()
+        if row >= matrix.shape[0]:
+            self._matrix = None
+            matrix = self._map()
+        return np.array(matrix[row])
+
+    def put_many(self, items):
+        """Append (key, vector) pairs not stored yet"""
+        self._refresh()
+        new = [(k, v) for k, v in items if k not in self._rows]
+        if not new:
+            return
+        fd = os.open(self.lock_file, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if fcntl:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+            self._refresh()  # another process may have added some meanwhile
+            new = list({k: v for k, v in new if k not in self._rows}.items())
+            if not new:
+                return
+            # a crash between the two appends can leave a partial tail row: trim it
+            rows = min(self._keys_read // KEY_SIZE, self._vector_rows())
+            with open(self.vectors_file, "ab") as f:
+                f.truncate(rows * self.row_bytes)
+                f.write(np.asarray([v for _, v in new], dtype=np.float32).tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+            with open(self.keys_file, "ab") as f:
+                f.truncate(rows * KEY_SIZE)
+                f.write(b"".join(k for k, _ in new))
+                f.flush()
+                os.fsync(f.fileno())
+        finally:
+            os.close(fd)
+        self._refresh()
+
+    def _vector_rows(self):
+        try:
+            return os.path.getsize(self.vectors_file) // self.row_bytes
+        except FileNotFoundError:
+            return 0
+
+    def __len__(self):
+        self._refresh()
+        return len(self._rows)
+
+
+# --------------------------
+# Two-tier cache
+# --------------------------
+class EmbeddingCache:
+    """
+    Embeddings keyed by cache_key(model, cleaned text):
+    in-memory LRU (bounded by MEMORY_BYTES) in front of the on-disk store
+    under CACHE_DIR/<model>/, so text seen once is never encoded again,
+    across restarts and worker processes.
+    `persistent=False` keeps only the memory tier.
+    """
+
+    def __init__(self, model_name: str, dim: int, directory: str = None,
+                 max_bytes: int = None, persistent: bool = True):
+        self.model_name = model_name
+        self.dim = dim
+        self._lock = threading.Lock()
+        self._memory = _LRU(MEMORY_BYTES if max_bytes is None else max_bytes)
+        self._disk = None
+        if persistent:
+            self._disk = _DiskStore(directory or os.path.join(CACHE_DIR, _slug(model_name)), dim)
+        self.hits = self.misses = 0
+
+    def key(self, text: str) -> bytes:
+        return cache_key(self.model_name, text)
+
+    def get(self, key: bytes):
+        """Cached float32 vector for `key`, or None"""
+        with self._lock:
+            vec = self._memory.get(key)
+            if vec is None and self._disk is not None:
+                vec = self._disk.get(key)
+                if vec is not None:
+                    self._memory.put(key, vec)
+            if vec is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return vec
+
+    def put(self, key: bytes, vec):
+        self.put_many([(key, vec)])
+
+    def put_many(self, items):
+        items = [(k, np.asarray(v, dtype=np.float32).reshape(self.dim)) for k, v in items]
+        with self._lock:
+            for k, v in items:
+                v.setflags(write=False)  # shared between callers
+                self._memory.put(k, v)
+            if self._disk is not None:
+                self._disk.put_many(items)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "model": self.model_name,
+                "hits": self.hits,
+                "misses": self.misses,
+                "memory_entries": len(self._memory._items),
+                "memory_bytes": self._memory.bytes,
+                "disk_entries": len(self._disk) if self._disk is not None else 0,
+            }
@@ -0,0 +1,227 @@
+"""
+Shared embedding model server.
+
+One process loads the sentence-transformers model and serves encode
+requests over a Unix socket, so N web workers share one copy of the model
+(and one cold start) instead of loading their own:
+
+    python -m utils.embedding_server --socket instance/embedding.sock
+
+Workers use it when EMBEDDING_SERVER_SOCKET points at the socket (see
+utils.embedding). Wire format, both directions: 4-byte big-endian header
+length, JSON header, then an optional binary payload (float32 rows).
+"""
+
+import argparse
+import json
+import os
+import socket
+import socketserver
+import struct
+import threading
+import time
+
+import numpy as np
+
+_HEADER = struct.Struct(">I")
+
+
+# --------------------------
+# framing
+# --------------------------
+def _recv_exact(sock, n: int) -> bytes:
+    buf = bytearray()
+    while len(buf) < n:
+        chunk = sock.recv(n - len(buf))
+        if not chunk:
+            raise ConnectionError("embedding server connection closed")
+        buf.extend(chunk)
+    return bytes(buf)
+
+
+def send_message(sock, header: dict, payload: bytes = b""):
+    data = json.dumps({**header, "payload": len(payload)}).encode("utf-8")
+    sock.sendall(_HEADER.pack(len(data)) + data + payload)
+
+
+def recv_message(sock):
+    """(header dict, payload bytes)"""
+    (size,) = _HEADER.unpack(_recv_exact(sock, _HEADER.size))
+    header = json.loads(_recv_exact(sock, size))
+    payload = _recv_exact(sock, header.get("payload", 0)) if header.get("payload") else b""
+    return header, payload
+
+
+# --------------------------
+# server
+# --------------------------
+class _State:
+    """
+    The model, loaded in the background; `ready` is set once it has warmed up.
+    Requests from all connected workers go through one MicroBatcher, so
+    concurrent small requests share a forward pass.
+    """
+
+    def __init__(self, model_name: str, window_ms: float, max_batch: int):
+        self.model_name = model_name
+        self.window_ms = window_ms
+        self.max_batch = max_batch
+        self.model = None
+        self.batcher = None
+        self.error = None
+        self.ready = threading.Event()
+
+    def load(self):
+        try:
+            from sentence_transformers import SentenceTransformer
+            from utils.embedding import MicroBatcher  # (utils.embedding imports this module)
+            model = SentenceTransformer(self.model_name)
+            model.encode(["warm up"])  # first call allocates / compiles kernels
+            self.batcher = MicroBatcher(
+                lambda texts: np.asarray(model.encode(texts, batch_size=self.max_batch), dtype=np.float32),
+                self.window_ms,
+                self.max_batch,
+            )
+            self.model = model
+        except Exception as e:  # ImportError included: report it, don't die
+            self.error = str(e).lower()
+            print(f"[embedding_server] model unavailable: {self.error}")
+        self.ready.set()
+
+    def encode(self, texts):
+        return self.batcher.encode(texts)
+
+
+class _Handler(socketserver.BaseRequestHandler):
+    def handle(self):
+        state = self.server.state
+        while True:
+            try:
+                header, _ = recv_message(self.request)
+            except (ConnectionError, OSError):
+                return
+            op = header.get("op")
+            if op == "status":
+                send_message(self.request, {
+                    "ready": state.ready.is_set() and state.model is not None,
+                    "loading": not state.ready.is_set(),
+                    "model": state.model_name,
+                    "error": state.error,
+                    "batches": state.batcher.batches if state.batcher else 0,
+                    "texts": state.batcher.texts if state.batcher else 0,
+                })
+            elif op == "encode":
+                state.ready.wait()
+                if state.model is None:
+                    send_message(self.request, {"error": state.error or "model not loaded"})
+                    continue
+                try:
+                    vectors = state.encode(header["texts"])
+                except Exception as e:
+                    send_message(self.request, {"error": str(e).lower()})
+                    continue
+                send_message(self.request, {"shape": list(vectors.shape)}, vectors.tobytes())
+            else:
+                send_message(self.request, {"error": f"unknown op: {op}"})
+
+
+class EmbeddingServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path: str, model_name: str, window_ms: float = 5, max_batch: int = 64):
+        if os.path.exists(path):
+            os.remove(path)  # stale socket from a previous run
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        super().__init__(path, _Handler)
+        self.path = path
+        self.state = _State(model_name, window_ms, max_batch)
+        # warm up eagerly, but accept connections (and status checks) meanwhile
+        threading.Thread(target=self.state.load, daemon=True).start()
+
+    def server_close(self):
+        super().server_close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def serve(path: str, model_name: str, window_ms: float = 5, max_batch: int = 64):
+    with EmbeddingServer(path, model_name, window_ms, max_batch) as server:
+        print(f"[embedding_server] serving {model_name} on {path}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+
+
+# --------------------------
+# client
+# --------------------------
+class EmbeddingClient:
+    """
+    Worker-side stand-in for a SentenceTransformer: encode() forwards to the
+    server. One connection per thread, reopened after errors.
+    """
+
+    def __init__(self, path: str, timeout: float = 60.0):
+        self.path = path
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _conn(self):
+        sock = getattr(self._local, "sock", None)
+        if sock is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            sock.connect(self.path)
+            self._local.sock = sock
+        return sock
+
+    def _call(self, header: dict):
+        try:
+            sock = self._conn()
+            send_message(sock, header)
+            return recv_message(sock)
+        except (OSError, ConnectionError):
+            sock = getattr(self._local, "sock", None)
+            if sock is not None:
+                sock.close()
+            self._local.sock = None
+            raise
+
+    def status(self) -> dict:
+        return self._call({"op": "status"})[0]
+
+    def wait_ready(self, timeout: float) -> dict:
+        """Poll until the server's model is loaded (or failed) or `timeout` passes"""
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                status = self.status()
+                if not status.get("loading"):
+                    return status
+            except OSError:
+                status = {"ready": False, "error": "embedding server not reachable"}
+            if time.monotonic() >= deadline:
+                return status
+            time.sleep(0.2)
+
+    def encode(self, texts, batch_size: int = 32):
+        single = isinstance(texts, str)
+        header, payload = self._call({"op": "encode", "texts": [texts] if single else list(texts),
+                                      "batch_size": batch_size})
+        if "error" in header:
+            raise RuntimeError(f"embedding server: {header['error']}")
+        vectors = np.frombuffer(payload, dtype=np.float32).reshape(header["shape"])
+        return vectors[0] if single else vectors
+
+
+if __name__ == "__main__":
+    from utils.embedding import MODEL_NAME, _settings
+
+    parser = argparse.ArgumentParser(description="shared embedding model server")
+    parser.add_argument("--socket", default=os.environ.get("EMBEDDING_SERVER_SOCKET") or "instance/embedding.sock")
+    parser.add_argument("--model", default=MODEL_NAME)
+    parser.add_argument("--batch-window-ms", type=float, default=_settings["EMBEDDING_BATCH_WINDOW_MS"])
+    parser.add_argument("--max-batch", type=int, default=_settings["EMBEDDING_MAX_BATCH"])
+    args = parser.parse_args()
+    serve(args.socket, args.model, args.batch_window_ms, args.max_batch)
@@ -1,7 +1,17 @@
+import os
 import re
 import json
 import datetime
-from utils.embedding import compare_texts  # 🔥 semantic similarity (fallback if model missing)
+import threading
+import collections
+import numpy as np
+from utils import blob_store
+from utils.embedding import (  # 🔥 semantic similarity (fallback if model missing)
+    embed, embed_many, embedding_key, embedding_model, cached_embedding, get_cache,
+)
+from utils.result_cache import get_result_cache
+from utils.skills import extract_skills, get_matcher
+from utils.storage import load_text
 
 # --------------------------
 # helper: tokenize text
@@ -10,6 +20,172 @@ def tokenize(text: str):
     return re.findall(r"[a-zA-Z]+", (text or "").lower())
 
 
+# --------------------------
+# document profiles (precomputed at upload)
+# --------------------------
+# profiles built in this process, by (content hash, embedding model)
+PROFILE_CACHE_SIZE = int(os.environ.get("PROFILE_CACHE_SIZE", 2048))
+
+
+class DocumentProfile:
+    """
+    Everything scoring needs from one version of a document: distinct
+    tokens, token counts, the skills it mentions (utils/skills.py), the
+    embedding (+ its norm and cache key) and the content hash of the text
+    it was built from. Built once per document version (build_profile /
+    load_profile) and reused from an in-process cache.
+    """
+
+    __slots__ = ("tokens", "counts", "skills", "embedding", "norm", "content_hash", "embedding_key")
+
+    def __init__(self, counts: dict, embedding, content_hash: str = None, skills=frozenset(),
+                 embedding_key: str = None):
+        self.counts = counts
+        self.tokens = frozenset(counts)
+        self.skills = frozenset(skills)
+        self.embedding = embedding
+        self.norm = float(np.linalg.norm(np.asarray(embedding, dtype=np.float64)))
+        self.content_hash = content_hash
+        self.embedding_key = embedding_key
+
+    def similarity(self, other: "DocumentProfile") -> float:
+        """Cosine similarity of the embeddings (0 if either is empty)"""
+        if not self.norm or not other.norm:
+            return 0.0
+        return float(np.dot(self.embedding.astype(np.float64), other.embedding) / (self.norm * other.norm))
+
+    def missing_from(self, other: "DocumentProfile") -> list:
+        """Skills this document mentions that `other` does not, sorted"""
+        return sorted(self.skills - other.skills)
+
+    def __repr__(self):
+        return f"DocumentProfile({len(self.tokens)} tokens, {len(self.skills)} skills, {(self.content_hash or '')[:8]})"
+
+
+# older name
+Profile = DocumentProfile
+
+_profiles = collections.OrderedDict()
+_profiles_lock = threading.Lock()
+
+
+def _cached_profile(content_hash: str):
+    if not content_hash:
+        return None
+    key = (content_hash, get_cache().model_name)
+    with _profiles_lock:
+        profile = _profiles.get(key)
+        if profile is not None:
+            _profiles.move_to_end(key)
+        return profile
+
+
+def _remember(profile: DocumentProfile) -> DocumentProfile:
+    if profile.content_hash and PROFILE_CACHE_SIZE > 0:
+        with _profiles_lock:
+            _profiles[(profile.content_hash, get_cache().model_name)] = profile
+            while len(_profiles) > PROFILE_CACHE_SIZE:
+                _profiles.popitem(last=False)
+    return profile
+
+
+def _from_text(text: str, embedding) -> DocumentProfile:
+    counts = dict(collections.Counter(tokenize(text)))
+    return _remember(DocumentProfile(counts, embedding, blob_store.text_hash(text), extract_skills(text),
+                                     embedding_key(text).hex()))
+
+
+def build_profile(text: str) -> DocumentProfile:
+    """Profile of a text (tokenized and embedded once per distinct text)"""
+    return _cached_profile(blob_store.text_hash(text)) or _from_text(text, embed(text))
+
+
+def profile_fields(text: str) -> dict:
+    """
+    Precompute a document's profile and return the fields to store on its
+    resume / jd record: the text's blob ref, the token counts (as a blob),
+    the skills it mentions (+ the taxonomy version they were extracted with)
+    and the key of its embedding in the embedding cache (encoded now,
+    persisted by the cache). The ref keeps a record merged with these
+    fields consistent before it is read back from storage.
+    """
+    profile = build_profile(text)
+    return {
+        "parsed_text_ref": blob_store.put_text(text),
+        "tokens_ref": blob_store.put_text(" ".join(f"{w}:{c}" for w, c in sorted(profile.counts.items()))),
+        "skills": sorted(profile.skills),
+        "skills_version": get_matcher().version,
+        "embedding_key": embedding_key(text).hex(),
+        "embedding_model": embedding_model(),
+    }
+
+
+def _parse_counts(blob: str) -> dict:
+    """tokens_ref blob -> counts ("word:count" items; older blobs list bare words)"""
+    counts = {}
+    for item in blob.split():
+        word, _, n = item.partition(":")
+        counts[word] = int(n) if n else 1
+    return counts
+
+
+def _stored_profile(record: dict):
+    """Profile from the cache or a record's precomputed fields, or None if absent / stale"""
+    profile = _cached_profile(record.get("parsed_text_ref"))
+    if profile is not None:
+        current = record.get("embedding_model") == embedding_model()
+        if not current or profile.embedding_key == record["embedding_key"]:
+            return profile  # (a key of an older model / chunking can't be compared)
+        return None  # text ref and embedding key disagree: rebuild from the text
+    if record.get("tokens_ref") and record.get("embedding_model") == embedding_model():
+        vec = cached_embedding(bytes.fromhex(record["embedding_key"]))
+        if vec is not None:
+            counts = _parse_counts(blob_store.get_text(record["tokens_ref"]))
+            if record.get("skills_version") == get_matcher().version:
+                skills = record.get("skills") or ()
+            else:  # stored before skills / with another taxonomy: one pass over the text
+                skills = extract_skills(load_text(record))
+            return _remember(DocumentProfile(counts, vec, record.get("parsed_text_ref"), skills,
+                                             record["embedding_key"]))
+    return None
+
+
+def load_profile(record: dict) -> DocumentProfile:
+    """
+    Profile of a stored resume / jd from its precomputed fields;
+    rebuilt from the text for older records or after a model / chunking change.
+    """
+    return _stored_profile(record) or build_profile(load_text(record))
+
+
+def load_profiles(records) -> list:
+    """load_profile for many records; documents to (re)build are embedded in one batch"""
+    profiles = [_stored_profile(r) for r in records]
+    todo = [i for i, p in enumerate(profiles) if p is None]
+    if todo:
+        texts = [load_text(records[i]) for i in todo]
+        for i, text, vec in zip(todo, texts, embed_many(texts)):
+            profiles[i] = _from_text(text, vec)
+    return profiles
+
+
+# --------------------------
+# result memoization
+# --------------------------
+# bump whenever scoring changes (weights, verdict thresholds, missing-skill
+# rules): results cached under older versions are never read again
+SCORER_VERSION = "1"
+
+
+def scorer_version() -> str:
+    """SCORER_VERSION + what else decides a result: the embedding model / chunking and skill taxonomy"""
+    return f"{SCORER_VERSION}/{embedding_model()}/{get_matcher().version}"
+
+
+def _results():
+    return get_result_cache(scorer_version())
+
+
 # --------------------------
 # core evaluator: compare resume vs jd
 # --------------------------
@@ -17,28 +193,105 @@ def evaluate_texts(resume_text: str, jd_text: str):
     """
     Compare resume text and JD text.
     Hybrid: semantic embeddings (if available) + token overlap fallback.
-    Returns (score, verdict, missing_skills).
+    Returns (score, verdict, missing_skills), from the result cache when
+    this pair of texts was scored before.
     """
-    r_tokens, j_tokens = tokenize(resume_text), tokenize(jd_text)
+    key = (blob_store.text_hash(resume_text), blob_store.text_hash(jd_text))
+    result = _results().get(*key)
+    if result is None:
+        result = _score(build_profile(resume_text), build_profile(jd_text))
+        _results().put(*key, result)
+    return result
+
 
+def evaluate_records(resume: dict, jd: dict):
+    """evaluate_texts for a stored resume / jd; a cached result skips loading their profiles"""
+    key = (resume.get("parsed_text_ref"), jd.get("parsed_text_ref"))
+    if not all(key):  # older record with inline text
+        return evaluate_profiles(load_profile(resume), load_profile(jd))
+    result = _results().get(*key)
+    if result is None:
+        result = _score(load_profile(resume), load_profile(jd))
+        _results().put(*key, result)
+    return result
+
+
+def evaluate_profiles(resume: DocumentProfile, jd: DocumentProfile):
+    """evaluate_texts on precomputed profiles (see load_profile)"""
+    key = (resume.content_hash, jd.content_hash)
+    if not all(key):
+        return _score(resume, jd)
+    result = _results().get(*key)
+    if result is None:
+        result = _score(resume, jd)
+        _results().put(*key, result)
+    return result
+
+
+def _score(resume: DocumentProfile, jd: DocumentProfile):
     # If JD text empty → auto low
-    if not j_tokens:
+    if not jd.tokens:
         return 0, "low", []
 
     # ✅ semantic score (if embedding backend available)
     try:
-        score, verdict = compare_texts(resume_text, jd_text)
+        score = int(resume.similarity(jd) * 100)
     except Exception:
         # fallback → plain token overlap
-        overlap = len(set(r_tokens) & set(j_tokens))
-        soft_score = overlap / max(1, len(set(j_tokens)))
-        score = int(soft_score * 100)
-        verdict = "high" if score >= 75 else "medium" if score >= 50 else "low"
+        score = int(len(resume.tokens & jd.tokens) / max(1, len(jd.tokens)) * 100)
+
+    # ✅ missing skills (skills the JD mentions, the resume doesn't)
+    return score, _verdict(score), jd.missing_from(resume)
+
+
+def _verdict(score: int) -> str:
+    return "high" if score >= 75 else "medium" if score >= 50 else "low"
+
 
-    # ✅ missing skills (tokens in JD not in resume)
-    missing = [w for w in set(j_tokens) if w not in r_tokens]
+def evaluate_batch(resumes, jds):
+    """
+    evaluate_profiles over many pairs at once. One side is a single Profile,
+    compared against every Profile in the other list; returns a list of
+    (score, verdict, missing_skills) in the list's order.
+    Pairs found in the result cache are not rescored; similarities of the
+    rest come from one matrix-vector product.
+    """
+    many_resumes = not isinstance(resumes, DocumentProfile)
+    many, one = (resumes, jds) if many_resumes else (jds, resumes)
+    if not many:
+        return []
+    cache = _results()
+    keys = [(p.content_hash, one.content_hash) if many_resumes else (one.content_hash, p.content_hash) for p in many]
+    results = [cache.get(*key) if all(key) else None for key in keys]
+    todo = [i for i, result in enumerate(results) if result is None]
+    if todo:
+        scored = _score_batch([many[i] for i in todo], one, many_resumes)
+        for i, result in zip(todo, scored):
+            results[i] = result
+        cache.put_many([(keys[i], results[i]) for i in todo if all(keys[i])])
+    return results
+
+
+def _score_batch(many, one, many_resumes: bool):
+    pairs = [(p, one) if many_resumes else (one, p) for p in many]
+
+    try:
+        matrix = np.stack([p.embedding for p in many]).astype(np.float64)
+        norms = np.array([p.norm for p in many]) * one.norm
+        dots = matrix @ np.asarray(one.embedding, dtype=np.float64)
+        sims = np.divide(dots, norms, out=np.zeros_like(dots), where=norms != 0)
+        scores = [int(s * 100) for s in sims]
+    except Exception:
+        # fallback → plain token overlap
+        scores = [int(len(r.tokens & j.tokens) / max(1, len(j.tokens)) * 100) for r, j in pairs]
 
-    return score, verdict, missing
+    results = []
+    for (r, j), score in zip(pairs, scores):
+        if not j.tokens:
+            results.append((0, "low", []))
+        else:
+            results.append((score, _verdict(score), j.missing_from(r)))
+    return results
 
 
 # --------------------------
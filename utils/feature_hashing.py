@@ -0,0 +1,184 @@
+import hashlib
+import json
+import math
+import os
+import re
+import threading
+
+import numpy as np
+
+# --------------------------
+# Settings
+# --------------------------
+# optional {word or n-gram: idf} JSON table (see fit_idf / save_idf): TF-IDF weighting
+IDF_FILE = os.environ.get("HASH_EMBEDDING_IDF")
+
+TOKEN_RE = re.compile(r"[a-z0-9+#]+")
+# word hashes memoized per process (cleared when it grows past this many words)
+MAX_MEMO = 1_000_000
+
+
+# --------------------------
+# stable 64-bit feature hashes
+# --------------------------
+_GOLDEN = np.uint64(0x9E3779B97F4A7C15)
+
+
+def _mix(x: np.ndarray) -> np.ndarray:
+    """splitmix64 finalizer (uint64 arrays, wrapping arithmetic)"""
+    x = x ^ (x >> np.uint64(30))
+    x = x * np.uint64(0xBF58476D1CE4E5B9)
+    x = x ^ (x >> np.uint64(27))
+    x = x * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+
+def _combine(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Hash of the n-gram (..., a) extended by the word hashed as b"""
+    return _mix((a * _GOLDEN) ^ b)
+
+
+def word_hash(word: str) -> int:
+    """blake2b of a word, as an unsigned 64-bit int (same in every process)"""
+    return int.from_bytes(hashlib.blake2b(word.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def feature_hash(feature: str) -> int:
+    """Hash of a space-separated n-gram, equal to what transform() computes for it"""
+    words = feature.split(" ")
+    h = np.array([word_hash(words[0])], dtype=np.uint64)
+    for word in words[1:]:
+        h = _combine(h, np.array([word_hash(word)], dtype=np.uint64))
+    return int(h[0])
+
+
+def _ngrams(words, n: int):
+    return [" ".join(words[i:i + n]) for i in range(len(words) - n + 1)]
+
+
+def fit_idf(texts, ngrams: int = 2, min_df: int = 1) -> dict:
+    """Smoothed idf, log((1 + N) / (1 + df)) + 1, of every word / n-gram in `texts`"""
+    df = {}
+    n = 0
+    for text in texts:
+        n += 1
+        words = TOKEN_RE.findall((text or "").lower())
+        feats = set(words)
+        for k in range(2, ngrams + 1):
+            feats.update(_ngrams(words, k))
+        for feat in feats:
+            df[feat] = df.get(feat, 0) + 1
+    return {f: math.log((1 + n) / (1 + c)) + 1 for f, c in df.items() if c >= min_df}
+
+
+def save_idf(idf: dict, path: str):
+    with open(path, "w") as f:
+        json.dump(idf, f, sort_keys=True)
+
+
+# --------------------------
+# Vectorizer
+# --------------------------
+class HashingEmbedder:
+    """
+    Feature-hashing text embedding ("hashing trick"): each word and word
+    n-gram gets a stable 64-bit hash (blake2b per word, n-grams combined
+    from their words' hashes with array arithmetic, so n-gram strings are
+    never built) that picks one of `dim` buckets and a +/-1 sign (collisions
+    cancel out on average instead of piling up). Features are weighted by
+    sublinear tf (1 + log tf) and, with an idf table, by idf; rows are
+    L2-normalized.
+    Nothing depends on the process (unlike hash()), so a text maps to the
+    same vector in every worker and after restarts - vectors can be cached.
+    """
+
+    def __init__(self, dim: int, ngrams: int = 2, idf: dict = None):
+        self.dim = dim
+        self.ngrams = ngrams
+        self._lock = threading.Lock()
+        self._reset()
+        # identifies the vector space: cache keys depend on it
+        name = f"hashing-blake2b-{dim}-ng{ngrams}"
+        self._idf_keys = self._idf_values = None
+        if idf:
+            digest = hashlib.blake2b(json.dumps(idf, sort_keys=True).encode("utf-8"), digest_size=4).hexdigest()
+            name += f"-idf{digest}"
+            keys = np.array([feature_hash(f) for f in idf], dtype=np.uint64)
+            order = np.argsort(keys)
+            self._idf_keys = keys[order]
+            self._idf_values = np.array(list(idf.values()), dtype=np.float64)[order]
+            # features never seen when fitting count as the rarest
+            self._idf_default = float(self._idf_values.max())
+        self.name = name
+
+    @classmethod
+    def from_env(cls, dim: int):
+        idf = None
+        if IDF_FILE and os.path.exists(IDF_FILE):
+            with open(IDF_FILE, "r") as f:
+                idf = json.load(f)
+        return cls(dim, idf=idf)
+
+    def _reset(self):
+        self._ids = {}  # word -> row of self._hashes
+        self._hashes = np.zeros(0, dtype=np.uint64)
+
+    def _word_hashes(self, words) -> np.ndarray:
+        """uint64 hash of every word (blake2b once per distinct word per process)"""
+        new = set(words).difference(self._ids)
+        if len(self._ids) + len(new) > MAX_MEMO:
+            self._reset()
+            new = set(words)
+        if new:
+            start = len(self._ids)
+            for i, word in enumerate(new):
+                self._ids[word] = start + i
+            added = np.fromiter((word_hash(w) for w in new), dtype=np.uint64, count=len(new))
+            self._hashes = np.concatenate([self._hashes, added])
+        rows = np.fromiter(map(self._ids.__getitem__, words), dtype=np.int64, count=len(words))
+        return self._hashes[rows]
+
+    def _weights(self, hashes: np.ndarray) -> np.ndarray:
+        if self._idf_keys is None:
+            return np.ones(len(hashes))
+        pos = np.minimum(np.searchsorted(self._idf_keys, hashes), len(self._idf_keys) - 1)
+        return np.where(self._idf_keys[pos] == hashes, self._idf_values[pos], self._idf_default)
+
+    def transform(self, texts) -> np.ndarray:
+        """(len(texts), dim) float32 embeddings of already-cleaned texts"""
+        words, lengths = [], []
+        for text in texts:
+            w = TOKEN_RE.findall(text)
+            words.extend(w)
+            lengths.append(len(w))
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        if not words:
+            return out
+
+        with self._lock:
+            unigrams = self._word_hashes(words)
+        doc_of = np.repeat(np.arange(len(texts), dtype=np.int64), lengths)
+
+        # n-grams: extend the (n-1)-gram hashes by the next word, within a document
+        hashes, docs = [unigrams], [doc_of]
+        gram, gram_doc = unigrams, doc_of
+        for _ in range(2, self.ngrams + 1):
+            same_doc = gram_doc[:-1] == doc_of[len(doc_of) - len(gram_doc) + 1:]
+            gram = _combine(gram[:-1], unigrams[len(unigrams) - len(gram) + 1:])
+            gram_doc = gram_doc[:-1]
+            hashes.append(gram[same_doc])
+            docs.append(gram_doc[same_doc])
+        hashes, docs = np.concatenate(hashes), np.concatenate(docs)
+
+        # term frequency per (doc, feature): one unique() over a 64-bit (doc, feature) key
+        _, first, tf = np.unique(_combine(docs.astype(np.uint64), hashes), return_index=True, return_counts=True)
+        hashes, docs = hashes[first], docs[first]
+
+        bucket = (hashes % np.uint64(self.dim)).astype(np.int64)
+        sign = np.where(hashes >> np.uint64(63), 1.0, -1.0)
+        values = sign * (1.0 + np.log(tf)) * self._weights(hashes)
+        flat = np.bincount(docs * self.dim + bucket, weights=values, minlength=len(texts) * self.dim)
+        out[:] = flat.reshape(len(texts), self.dim)
+
+        norms = np.linalg.norm(out, axis=1, keepdims=True)
+        return np.divide(out, norms, out=out, where=norms != 0)
@@ -0,0 +1,478 @@
+"""
+Background bulk-evaluation jobs.
+
+A job scores a set of resumes against a set of JDs (e.g. every resume
+against every JD of an admin) outside the HTTP request:
+
+- submit() writes the job to instance/jobs/pending/<id>.json and returns
+  at once; the file moves to instance/jobs/finished/ when the job is done
+  or failed, so dispatchers only ever scan pending work
+- the dispatcher, `python -m utils.jobs` run next to the web server (or a
+  thread in the web process with JOBS_IN_WEB=1), claims queued jobs and
+  fans the pairs out to a ProcessPoolExecutor of JOB_WORKERS processes
+- every running dispatcher holds a shared flock on
+  instance/jobs/dispatcher.lock; submit() refuses work (NoDispatcherError)
+  when nobody does, instead of queueing a job nothing will pick up
+- results are written to storage as evaluations JOB_BATCH_SIZE at a time,
+  and their ids appended to instance/jobs/<id>.results (moved next to the
+  job in finished/ at the end; finished jobs go after JOB_RETENTION_DAYS)
+- the dispatcher holds a flock on instance/jobs/<id>.lock while a job
+  runs; if its process dies (worker recycled), the lock is released and
+  the next dispatcher resumes the job - pairs evaluated already are skipped
+"""
+
+import concurrent.futures
+import datetime
+import json
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - non-POSIX: one dispatcher per job dir
+    fcntl = None
+
+from utils import storage
+
+# --------------------------
+# Settings
+# --------------------------
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+JOBS_DIR = os.path.join(BASE_DIR, "instance", "jobs")
+# job state files: queued / running ones, and done / failed ones
+PENDING_DIR = os.path.join(JOBS_DIR, "pending")
+FINISHED_DIR = os.path.join(JOBS_DIR, "finished")
+# shared-locked by every running dispatcher (see dispatcher_running)
+DISPATCHER_LOCK = os.path.join(JOBS_DIR, "dispatcher.lock")
+
+# seconds between scans of the job directory for work left by other processes
+POLL_SECONDS = float(os.environ.get("JOB_POLL_SECONDS", 5))
+# seconds between sweeps of finished/ for jobs past JOB_RETENTION_DAYS
+PRUNE_SECONDS = 3600
+
+_settings = {
+    "JOB_WORKERS": int(os.environ.get("JOB_WORKERS", 2)),
+    # resumes per task sent to a worker process
+    "JOB_CHUNK_SIZE": int(os.environ.get("JOB_CHUNK_SIZE", 256)),
+    # evaluations committed per storage transaction
+    "JOB_BATCH_SIZE": int(os.environ.get("JOB_BATCH_SIZE", 500)),
+    # finished jobs (state + result ids) kept this long (0 = forever)
+    "JOB_RETENTION_DAYS": int(os.environ.get("JOB_RETENTION_DAYS", 7)),
+}
+# config the worker processes start from (they are spawned, not forked)
+_worker_config = {}
+WORKER_KEYS = (
+    "STORAGE_BACKEND", "SQLITE_DB_FILE", "STORAGE_SHARDS",
+    "EMBEDDING_SERVER_SOCKET", "EMBEDDING_SERVER_TIMEOUT",
+    "EMBEDDING_BATCH_WINDOW_MS", "EMBEDDING_MAX_BATCH",
+)
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+FINISHED = (DONE, FAILED)
+
+
+class NoDispatcherError(RuntimeError):
+    """No dispatcher is running, so a submitted job would never run"""
+
+
+def configure(config):
+    """Job settings (JOB_WORKERS, JOB_CHUNK_SIZE, JOB_BATCH_SIZE, JOB_RETENTION_DAYS) from a config mapping (app.config)"""
+    _settings.update({k: int(config[k]) for k in _settings if k in config})
+    _worker_config.clear()
+    _worker_config.update({k: config[k] for k in WORKER_KEYS if k in config})
+
+
+def _now() -> str:
+    return datetime.datetime.utcnow().isoformat()
+
+
+# --------------------------
+# job files
+# --------------------------
+def _path(job_id: str, ext: str, directory: str = None) -> str:
+    return os.path.join(directory or JOBS_DIR, f"{job_id}.{ext}")
+
+
+def _valid_id(job_id: str) -> bool:
+    return isinstance(job_id, str) and len(job_id) == 32 and all(c in "0123456789abcdef" for c in job_id)
+
+
+def _save(job: dict):
+    """
+    Write the job's state. A finished job is written to FINISHED_DIR
+    first, then leaves PENDING_DIR; its result ids follow it there and its
+    lock file goes.
+    """
+    if job["status"] in FINISHED:
+        os.makedirs(FINISHED_DIR, exist_ok=True)
+        storage._atomic_write_json(_path(job["id"], "json", FINISHED_DIR), job, indent=2)
+        _remove(_path(job["id"], "json", PENDING_DIR))
+        try:
+            os.replace(_path(job["id"], "results"), _path(job["id"], "results", FINISHED_DIR))
+        except FileNotFoundError:
+            pass
+        _remove(_path(job["id"], "lock"))
+    else:
+        os.makedirs(PENDING_DIR, exist_ok=True)
+        storage._atomic_write_json(_path(job["id"], "json", PENDING_DIR), job, indent=2)
+
+
+def _remove(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def get_job(job_id: str):
+    """Job state dict, or None if there is no such job"""
+    if not _valid_id(job_id):
+        return None
+    # pending first: a finishing job is in FINISHED_DIR before it leaves PENDING_DIR
+    for directory in (PENDING_DIR, FINISHED_DIR):
+        try:
+            with open(_path(job_id, "json", directory), "r") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            pass
+    return None
+
+
+def list_jobs(statuses=None) -> list:
+    """All jobs (optionally only those in `statuses`), oldest first; only pending ones are read for pending statuses"""
+    directories = [PENDING_DIR]
+    if statuses is None or any(s in FINISHED for s in statuses):
+        directories.append(FINISHED_DIR)
+    jobs = {}
+    for directory in directories:
+        if not os.path.isdir(directory):
+            continue
+        for name in os.listdir(directory):
+            if name.endswith(".json") and name[:-5] not in jobs:
+                job = get_job(name[:-5])
+                if job and (statuses is None or job["status"] in statuses):
+                    jobs[job["id"]] = job
+    return sorted(jobs.values(), key=lambda j: j["submitted_at"])
+
+
+def _migrate_layout():
+    """Move job files of the flat instance/jobs/<id>.json layout into pending/ and finished/"""
+    if not os.path.isdir(JOBS_DIR):
+        return
+    for name in os.listdir(JOBS_DIR):
+        if name.endswith(".json") and _valid_id(name[:-5]):
+            try:
+                with open(os.path.join(JOBS_DIR, name), "r") as f:
+                    job = json.load(f)
+            except (FileNotFoundError, json.JSONDecodeError):
+                continue
+            _save(job)
+            _remove(os.path.join(JOBS_DIR, name))  # (unless moved by another dispatcher meanwhile)
+
+
+def job_results(job_id: str, after: int = None, limit: int = None):
+    """(evaluation ids, next cursor) created by a job, after the `after` id"""
+    ids = []
+    # running job's file first: it is moved (atomically) to FINISHED_DIR at the end
+    for directory in (JOBS_DIR, FINISHED_DIR):
+        try:
+            with open(_path(job_id, "results", directory), "r") as f:
+                ids = [int(line) for line in f if line.strip()]
+            break
+        except FileNotFoundError:
+            pass
+    if after is not None:
+        ids = [i for i in ids if i > after]
+    if limit is None or len(ids) <= limit:
+        return ids, None
+    return ids[:limit], ids[limit - 1]
+
+
+def submit(scope: dict) -> dict:
+    """
+    Queue a bulk evaluation. `scope` picks the pairs: JDs of `admin_id`
+    (else all JDs), narrowed to `jd_ids`; resumes of `user_id` (else all
+    resumes), narrowed to `resume_ids`. Raises NoDispatcherError if no
+    dispatcher is running to pick the job up.
+    """
+    if not dispatcher_running():
+        raise NoDispatcherError("no job dispatcher is running (start `python -m utils.jobs`)")
+    job = {
+        "id": uuid.uuid4().hex,
+        "status": QUEUED,
+        "scope": {k: scope.get(k) for k in ("admin_id", "jd_ids", "user_id", "resume_ids")},
+        "total": None,
+        "done": 0,
+        "created": 0,
+        "error": None,
+        "submitted_at": _now(),
+        "started_at": None,
+        "finished_at": None,
+    }
+    _save(job)
+    _wake.set()
+    return job
+
+
+# --------------------------
+# worker process side
+# --------------------------
+def _init_worker(config: dict):
+    from utils import embedding
+    storage.configure(config)
+    embedding.configure(config)
+
+
+def _score_chunk(jd_id: int, resume_ids: list):
+    """(pairs seen, [(resume_id, jd_id, score, verdict, missing)]) for pairs not yet evaluated"""
+    from utils.evaluator import evaluate_batch, load_profile, load_profiles
+
+    jd = storage.get_record("jds", jd_id)
+    if not jd:
+        return len(resume_ids), []
+    resumes = [r for r in (storage.get_record("resumes", i) for i in resume_ids)
+               if r and not storage.find_evaluation(r["id"], jd_id)]
+    scored = evaluate_batch(load_profiles(resumes), load_profile(jd)) if resumes else []
+    return len(resume_ids), [(r["id"], jd_id, *result) for r, result in zip(resumes, scored)]
+
+
+# --------------------------
+# dispatcher side
+# --------------------------
+def _resolve(scope: dict):
+    """(jd ids, resume ids) of a job scope"""
+    if scope.get("admin_id") is not None:
+        jds = [j["id"] for j in storage.find_by("jds", "admin_id", scope["admin_id"])]
+    else:
+        jds = [j["id"] for j in storage.iter_records("jds")]
+    if scope.get("jd_ids") is not None:
+        wanted = set(scope["jd_ids"])
+        jds = [i for i in jds if i in wanted]
+    if scope.get("user_id") is not None:
+        resumes = [r["id"] for r in storage.find_by("resumes", "user_id", scope["user_id"])]
+    else:
+        resumes = [r["id"] for r in storage.iter_records("resumes")]
+    if scope.get("resume_ids") is not None:
+        wanted = set(scope["resume_ids"])
+        resumes = [i for i in resumes if i in wanted]
+    return jds, resumes
+
+
+def _write(job: dict, rows: list):
+    """Store one batch of scored pairs as evaluations and record their ids"""
+    for attempt in range(5):
+        try:
+            ids = _insert(rows)
+            break
+        except storage.ConflictError:
+            # a request stored one of these pairs meanwhile: check them again
+            if attempt == 4:
+                raise
+    if ids:
+        with open(_path(job["id"], "results"), "a") as f:
+            f.write("".join(f"{i}\n" for i in ids))
+    job["created"] += len(ids)
+
+
+def _insert(rows: list) -> list:
+    from models import Evaluation
+
+    ids = []
+    with storage.transaction() as tx:
+        for resume_id, jd_id, score, verdict, missing in rows:
+            if tx.find_evaluation(resume_id, jd_id):
+                continue  # evaluated meanwhile (by a request or an earlier run)
+            evaluation = Evaluation(
+                id=tx.next_id("evaluations"),
+                resume_id=resume_id,
+                jd_id=jd_id,
+                score=score,
+                verdict=verdict,
+                missing_skills=json.dumps(missing),
+                created_at=_now(),
+            )
+            tx.append_to("evaluations", evaluation.to_dict())
+            ids.append(evaluation.id)
+    return ids
+
+
+def _run(job: dict):
+    jds, resumes = _resolve(job["scope"])
+    job.update(status=RUNNING, total=len(jds) * len(resumes), done=0,
+               started_at=job["started_at"] or _now(), error=None)
+    _save(job)
+
+    chunk = max(1, _settings["JOB_CHUNK_SIZE"])
+    tasks = ((jd_id, resumes[i:i + chunk]) for jd_id in jds for i in range(0, len(resumes), chunk))
+    workers = max(1, _settings["JOB_WORKERS"])
+    pending, buffer = set(), []
+    with concurrent.futures.ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker,
+        initargs=(dict(_worker_config),),
+    ) as pool:
+        for task in tasks:
+            pending.add(pool.submit(_score_chunk, *task))
+            # a few tasks in flight per worker, not the whole cross product
+            if len(pending) >= 2 * workers:
+                finished, pending = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+                buffer = _collect(job, finished, buffer)
+        buffer = _collect(job, pending, buffer, flush=True)
+
+    job.update(status=DONE, finished_at=_now())
+    _save(job)
+
+
+def _collect(job: dict, futures, buffer: list, flush: bool = False) -> list:
+    for future in (concurrent.futures.as_completed(futures) if flush else futures):
+        seen, rows = future.result()
+        job["done"] += seen
+        buffer.extend(rows)
+    while len(buffer) >= _settings["JOB_BATCH_SIZE"] or (flush and buffer):
+        _write(job, buffer[:_settings["JOB_BATCH_SIZE"]])
+        buffer = buffer[_settings["JOB_BATCH_SIZE"]:]
+    _save(job)
+    return buffer
+
+
+def _claim(job_id: str):
+    """Open + flock the job's lock file (released if this process dies); None if held elsewhere"""
+    fd = os.open(_path(job_id, "lock"), os.O_RDWR | os.O_CREAT, 0o644)
+    if fcntl is None:
+        return fd
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return fd
+    except OSError:
+        os.close(fd)
+        return None
+
+
+def run_pending() -> int:
+    """Run every queued / orphaned job this process can claim (scans PENDING_DIR only); returns how many ran"""
+    ran = 0
+    for job in list_jobs((QUEUED, RUNNING)):
+        fd = _claim(job["id"])
+        if fd is None:
+            continue  # running in another process
+        try:
+            job_id, job = job["id"], get_job(job["id"])  # re-read under the lock
+            if not job or job["status"] not in (QUEUED, RUNNING):
+                _remove(_path(job_id, "lock"))  # finished meanwhile: drop the lock file we recreated
+                continue
+            print(f"[jobs] {'resuming' if job['status'] == RUNNING else 'starting'} job {job['id']}")
+            try:
+                _run(job)
+                print(f"[jobs] job {job['id']} done: {job['created']} evaluations")
+            except Exception as e:
+                job.update(status=FAILED, error=str(e), finished_at=_now())
+                _save(job)
+                print(f"[jobs] job {job['id']} failed: {e}")
+            ran += 1
+        finally:
+            os.close(fd)
+    return ran
+
+
+def prune_finished() -> int:
+    """Delete finished jobs (state + result ids) older than JOB_RETENTION_DAYS; returns how many"""
+    days = _settings["JOB_RETENTION_DAYS"]
+    if days <= 0 or not os.path.isdir(FINISHED_DIR):
+        return 0
+    cutoff = time.time() - days * 86400
+    pruned = 0
+    for name in os.listdir(FINISHED_DIR):
+        path = os.path.join(FINISHED_DIR, name)
+        if name.endswith(".json") and os.path.getmtime(path) < cutoff:
+            _remove(_path(name[:-5], "results", FINISHED_DIR))
+            _remove(path)
+            pruned += 1
+    return pruned
+
+
+# --------------------------
+# dispatcher presence
+# --------------------------
+_presence_fd = None
+
+
+def _announce():
+    """Hold a shared flock on DISPATCHER_LOCK for the life of this process"""
+    global _presence_fd
+    if _presence_fd is None and fcntl is not None:
+        os.makedirs(JOBS_DIR, exist_ok=True)
+        fd = os.open(DISPATCHER_LOCK, os.O_RDWR | os.O_CREAT, 0o644)
+        fcntl.flock(fd, fcntl.LOCK_SH)
+        _presence_fd = fd
+
+
+def dispatcher_running() -> bool:
+    """True if some process runs a dispatcher (always True where flock is unavailable)"""
+    if fcntl is None:
+        return True
+    os.makedirs(JOBS_DIR, exist_ok=True)
+    fd = os.open(DISPATCHER_LOCK, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return False  # nobody holds it shared
+    except OSError:
+        return True
+    finally:
+        os.close(fd)
+
+
+_wake = threading.Event()
+_dispatcher = None
+_dispatcher_lock = threading.Lock()
+
+
+def _dispatch_forever():
+    pruned_at = 0
+    while True:
+        _wake.clear()
+        try:
+            run_pending()
+            if time.monotonic() - pruned_at >= PRUNE_SECONDS:
+                pruned_at = time.monotonic()
+                if prune_finished():
+                    print("[jobs] pruned finished jobs past their retention")
+        except Exception as e:
+            print(f"[jobs] dispatcher error: {e}")
+        _wake.wait(POLL_SECONDS)
+
+
+def start():
+    """Start this process's dispatcher thread (once; never inside a job's worker process)"""
+    global _dispatcher
+    if multiprocessing.parent_process() is not None:
+        return  # a spawned worker re-importing the app
+    with _dispatcher_lock:
+        if _dispatcher is None or not _dispatcher.is_alive():
+            os.makedirs(PENDING_DIR, exist_ok=True)
+            _migrate_layout()
+            _announce()
+            _dispatcher = threading.Thread(target=_dispatch_forever, name="evaluation-jobs", daemon=True)
+            _dispatcher.start()
+
+
+# --------------------------
+# standalone dispatcher: python -m utils.jobs (the default runner, see JOBS_IN_WEB)
+# --------------------------
+if __name__ == "__main__":
+    import config as app_config
+    from utils import embedding
+
+    cls = app_config.ProductionConfig if os.environ.get("FLASK_ENV", "").lower() == "production" \
+        else app_config.DevelopmentConfig
+    settings = {k: getattr(cls, k) for k in dir(cls) if k.isupper()}
+    storage.configure(settings)
+    embedding.configure(settings)
+    configure(settings)
+    _migrate_layout()
+    _announce()
+    print(f"[jobs] dispatcher watching {JOBS_DIR} with {_settings['JOB_WORKERS']} workers")
+    _dispatch_forever()
@@ -0,0 +1,61 @@
+from utils.storage import list_page, load_text
+
+# upper bound for ?limit= on list endpoints
+MAX_PAGE_SIZE = 500
+
+# storage bookkeeping on resume / jd records: left out unless asked for by ?fields=
+INTERNAL_FIELDS = ("parsed_text_ref", "tokens_ref", "embedding_key", "embedding_model", "skills_version")
+
+
+# --------------------------
+# request args
+# --------------------------
+def page_args(args) -> dict:
+    """
+    Read ?limit=&after=&fields= from request args.
+    No limit means the whole list (as before); invalid numbers are ignored.
+    """
+    limit = args.get("limit", type=int)
+    if limit is not None:
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+    fields = [f.strip() for f in args.get("fields", "").split(",") if f.strip()]
+    return {"limit": limit, "after": args.get("after", type=int), "fields": fields or None}
+
+
+def int_list(args, key: str):
+    """?key=1,2,3 -> [1, 2, 3] (None if absent; non-numbers are skipped)"""
+    raw = args.get(key)
+    if raw is None:
+        return None
+    return [int(v) for v in raw.split(",") if v.strip().lstrip("-").isdigit()]
+
+
+# --------------------------
+# projection
+# --------------------------
+def project(record: dict, fields) -> dict:
+    """
+    Keep only `fields` (plus "id", the cursor); without fields, everything
+    but INTERNAL_FIELDS. parsed_text is read from the blob store only when
+    explicitly asked for.
+    """
+    if not fields:
+        return {k: v for k, v in record.items() if k not in INTERNAL_FIELDS}
+    out = {k: record[k] for k in ("id", *fields) if k in record}
+    if "parsed_text" in fields and "parsed_text" not in out:
+        out["parsed_text"] = load_text(record)
+    return out
+
+
+# --------------------------
+# page builder
+# --------------------------
+def paginate(entity: str, limit=None, after=None, fields=None, field=None, values=None, decode=None) -> dict:
+    """
+    {"data": [...], "next_cursor": id} for one page of `entity`, via the
+    storage indexes. `decode` is applied to each record before projection.
+    """
+    rows, next_cursor = list_page(entity, after, limit, field, values)
+    if decode:
+        rows = [decode(r) for r in rows]
+    return {"data": [project(r, fields) for r in rows], "next_cursor": next_cursor}
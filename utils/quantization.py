@@ -0,0 +1,108 @@
+import os
+
+import numpy as np
+
+# --------------------------
+# Settings
+# --------------------------
+# storage of resident embedding matrices (ANN index, similarity engine):
+# "int8" (1 byte/dim + a float32 scale per vector), "float16" or "float32"
+QUANTIZATION = os.environ.get("EMBEDDING_QUANTIZATION", "int8").lower()
+
+DTYPES = {"int8": np.int8, "float16": np.float16, "float32": np.float32}
+
+# rows widened to float32 per step in dot(): the block stays in cache (measured best ~1k)
+CHUNK_ROWS = 1024
+
+
+# --------------------------
+# helpers
+# --------------------------
+def quantize(vectors: np.ndarray, kind: str = None):
+    """
+    (codes, scales) of float rows: int8 codes are round(x / scale) with a
+    symmetric per-row scale max|x| / 127; float kinds are a plain cast with
+    scale 1. x ~= codes * scale.
+    """
+    kind = kind or QUANTIZATION
+    vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+    if kind == "int8":
+        scales = np.abs(vectors).max(axis=1) / 127.0
+        scales[scales == 0] = 1.0
+        codes = np.rint(vectors / scales[:, None]).astype(np.int8)
+        return codes, scales.astype(np.float32)
+    return vectors.astype(DTYPES[kind]), np.ones(len(vectors), dtype=np.float32)
+
+
+def dequantize(codes: np.ndarray, scales: np.ndarray) -> np.ndarray:
+    out = codes.astype(np.float32)
+    if codes.dtype == np.int8:
+        out *= scales[:, None]
+    return out
+
+
+# --------------------------
+# Growable quantized row store
+# --------------------------
+class QuantizedRows:
+    """
+    (capacity, dim) matrix of vectors kept quantized (see quantize), with
+    similarity computed on the quantized rows: codes are widened to float32
+    a chunk at a time, multiplied with the float queries and rescaled, so a
+    dequantized copy of the whole matrix never exists.
+    int8 takes 1/4 of the float32 memory (+4 bytes of scale per row).
+    """
+
+    def __init__(self, dim: int, kind: str = None, capacity: int = 0):
+        self.dim = dim
+        self.kind = kind or QUANTIZATION
+        if self.kind not in DTYPES:
+            raise ValueError(f"unknown embedding quantization: {self.kind}")
+        self.codes = np.zeros((capacity, dim), dtype=DTYPES[self.kind])
+        self.scales = np.ones(capacity, dtype=np.float32)
+
+    def __len__(self):
+        return len(self.codes)
+
+    @property
+    def nbytes(self) -> int:
+        return self.codes.nbytes + (self.scales.nbytes if self.kind == "int8" else 0)
+
+    def grow(self, capacity: int):
+        if capacity <= len(self.codes):
+            return
+        codes = np.zeros((capacity, self.dim), dtype=self.codes.dtype)
+        codes[:len(self.codes)] = self.codes
+        scales = np.ones(capacity, dtype=np.float32)
+        scales[:len(self.scales)] = self.scales
+        self.codes, self.scales = codes, scales
+
+    def set(self, rows, vectors):
+        codes, scales = quantize(vectors, self.kind)
+        if np.ndim(rows) == 0:  # a single row
+            codes, scales = codes[0], scales[0]
+        self.codes[rows] = codes
+        self.scales[rows] = scales
+
+    def clear(self, rows):
+        self.codes[rows] = 0
+        self.scales[rows] = 1.0
+
+    def take(self, rows) -> np.ndarray:
+        """Dequantized float32 copy of `rows`"""
+        return dequantize(self.codes[rows], self.scales[rows])
+
+    def dot(self, queries: np.ndarray, rows=None) -> np.ndarray:
+        """(len(rows), len(queries)) inner products of stored rows with float queries"""
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        n = len(self.codes) if rows is None else len(rows)
+        out = np.empty((n, len(queries)), dtype=np.float32)
+        for start in range(0, n, CHUNK_ROWS):
+            part = slice(start, start + CHUNK_ROWS)
+            index = part if rows is None else rows[part]
+            codes = self.codes[index]
+            block = codes if codes.dtype == np.float32 else codes.astype(np.float32)
+            np.matmul(block, queries.T, out=out[part])
+            if self.kind == "int8":
+                out[part] *= self.scales[index][:, None]
+        return out
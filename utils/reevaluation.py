@@ -0,0 +1,209 @@
+"""
+Incremental re-evaluation after a resume / JD changes.
+
+An evaluation depends on one resume and one JD, found through the
+evaluations' resume_id / jd_id indexes. When a document's text changes
+(document_changed), only its evaluations are marked stale and a
+recompute of them is scheduled in the background. Edits of the same
+document within REEVALUATION_DEBOUNCE_SECONDS of each other coalesce
+into one recompute. Staleness is stored on the evaluations, so a
+process that dies with work pending leaves it for sweep() at the next
+start.
+"""
+
+import json
+import multiprocessing
+import os
+import threading
+import time
+
+from utils import storage
+from utils.evaluator import evaluate_batch, load_profile, load_profiles
+
+# --------------------------
+# Settings
+# --------------------------
+_settings = {
+    # wait this long after the last edit of a document before rescoring (0 = at once)
+    "REEVALUATION_DEBOUNCE_SECONDS": float(os.environ.get("REEVALUATION_DEBOUNCE_SECONDS", 2)),
+}
+
+# document entity -> (its field on evaluations, the other side's entity / field)
+_SIDES = {
+    "resumes": ("resume_id", "jds", "jd_id"),
+    "jds": ("jd_id", "resumes", "resume_id"),
+}
+
+
+def configure(config):
+    """Settings (REEVALUATION_DEBOUNCE_SECONDS) from a config mapping (app.config)"""
+    if "REEVALUATION_DEBOUNCE_SECONDS" in config:
+        _settings["REEVALUATION_DEBOUNCE_SECONDS"] = float(config["REEVALUATION_DEBOUNCE_SECONDS"])
+
+
+# --------------------------
+# dependency tracking
+# --------------------------
+def mark_stale(entity: str, record_id: int) -> int:
+    """Flag the evaluations of one document as stale; returns how many depend on it"""
+    field = _SIDES[entity][0]
+    for attempt in range(5):
+        try:
+            with storage.transaction() as tx:
+                evaluations = tx.find_by("evaluations", field, record_id)
+                for ev in evaluations:
+                    if not ev.get("stale"):
+                        tx.update_record("evaluations", ev["id"], {"stale": True})
+            return len(evaluations)
+        except storage.ConflictError:
+            # evaluations added / rescored meanwhile: read them again
+            if attempt == 4:
+                raise
+
+
+def document_changed(entity: str, record_id: int):
+    """
+    Call after a resume / jd's text was replaced (and committed): marks its
+    evaluations stale and schedules their recompute. Returns the number
+    affected, or None if marking kept conflicting and was left to the
+    background worker - the caller's write stands either way.
+    """
+    try:
+        affected = mark_stale(entity, record_id)
+    except storage.ConflictError:
+        print(f"[reevaluation] {entity} {record_id}: evaluations busy, marking them stale in the background")
+        with _unmarked_lock:
+            _unmarked.add((entity, record_id))
+        affected = None
+    if affected != 0:
+        _scheduler.schedule((entity, record_id), _settings["REEVALUATION_DEBOUNCE_SECONDS"])
+    return affected
+
+
+def recompute(entity: str, record_id: int) -> int:
+    """Rescore the stale evaluations of one document; returns how many were updated"""
+    field, other_entity, other_field = _SIDES[entity]
+    doc = storage.get_record(entity, record_id)
+    if not doc:
+        return 0
+    stale = [ev for ev in storage.find_by("evaluations", field, record_id) if ev.get("stale")]
+    pairs = [(ev, storage.get_record(other_entity, ev[other_field])) for ev in stale]
+    pairs = [(ev, other) for ev, other in pairs if other]
+    if not pairs:
+        return 0
+
+    # one side fixed, the other scored in one batch
+    profile, others = load_profile(doc), load_profiles([other for _, other in pairs])
+    scored = evaluate_batch(profile, others) if entity == "resumes" else evaluate_batch(others, profile)
+
+    updated = 0
+    with storage.transaction() as tx:
+        current = tx.get_record(entity, record_id)
+        if not current or current.get("parsed_text_ref") != doc.get("parsed_text_ref"):
+            return 0  # edited again meanwhile: that edit's recompute takes over
+        for (ev, other), (score, verdict, missing) in zip(pairs, scored):
+            now_other = tx.get_record(other_entity, other["id"])
+            if not now_other or now_other.get("parsed_text_ref") != other.get("parsed_text_ref"):
+                continue  # the other document changed too: left to its own recompute
+            if not (tx.get_record("evaluations", ev["id"]) or {}).get("stale"):
+                continue
+            tx.update_record("evaluations", ev["id"], {
+                "score": score,
+                "verdict": verdict,
+                "missing_skills": json.dumps(missing),
+                "stale": False,
+            })
+            updated += 1
+    return updated
+
+
+# documents whose evaluations document_changed could not mark stale yet
+_unmarked = set()
+_unmarked_lock = threading.Lock()
+
+
+def refresh(entity: str, record_id: int) -> int:
+    """Background step for a changed document: mark its evaluations if still due, then recompute"""
+    with _unmarked_lock:
+        due = (entity, record_id) in _unmarked
+    if due:
+        mark_stale(entity, record_id)  # a ConflictError here reschedules the key
+        with _unmarked_lock:
+            _unmarked.discard((entity, record_id))
+    return recompute(entity, record_id)
+
+
+def sweep() -> int:
+    """Schedule every document that still has stale evaluations (e.g. after a restart)"""
+    resumes = {ev["resume_id"] for ev in storage.iter_records("evaluations") if ev.get("stale")}
+    for resume_id in resumes:
+        _scheduler.schedule(("resumes", resume_id), 0)
+    return len(resumes)
+
+
+# --------------------------
+# Debounced background scheduler
+# --------------------------
+class DebouncedScheduler:
+    """
+    One worker thread running fn(*key) (refresh) for scheduled keys once
+    their deadline passes; scheduling a pending key again pushes its
+    deadline back, so a burst of edits costs one recompute.
+    """
+
+    def __init__(self, fn):
+        self._fn = fn
+        self._due = {}
+        self._cond = threading.Condition()
+        self._thread = None
+        self._pid = None
+
+    def _start(self):
+        # (re)start the worker, also in a forked child where it doesn't exist
+        if self._thread is None or self._pid != os.getpid() or not self._thread.is_alive():
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name="reevaluation", daemon=True)
+            self._thread.start()
+
+    def schedule(self, key, delay: float):
+        with self._cond:
+            self._due[key] = time.monotonic() + delay
+            self._start()
+            self._cond.notify()
+
+    def pending(self) -> int:
+        with self._cond:
+            return len(self._due)
+
+    def _take_due(self):
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                ready = [k for k, t in self._due.items() if t <= now]
+                if ready:
+                    for k in ready:
+                        del self._due[k]
+                    return ready
+                self._cond.wait(min(self._due.values()) - now if self._due else None)
+
+    def _run(self):
+        while True:
+            for key in self._take_due():
+                try:
+                    n = self._fn(*key)
+                    print(f"[reevaluation] {key[0]} {key[1]}: {n} evaluations rescored")
+                except storage.ConflictError:
+                    # written meanwhile by someone else: score again from the new state
+                    self.schedule(key, _settings["REEVALUATION_DEBOUNCE_SECONDS"])
+                except Exception as e:
+                    print(f"[reevaluation] {key[0]} {key[1]} failed: {e}")
+
+
+_scheduler = DebouncedScheduler(refresh)
+
+
+def start():
+    """Pick up stale evaluations left by a previous run, in the background"""
+    if multiprocessing.parent_process() is not None:
+        return  # a spawned job worker re-importing the app
+    threading.Thread(target=sweep, name="reevaluation-sweep", daemon=True).start()
@@ -0,0 +1,165 @@
+import collections
+import json
+import os
+import sqlite3
+import threading
+import time
+
+# --------------------------
+# Cache location / budget
+# --------------------------
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+RESULT_CACHE_FILE = os.path.join(BASE_DIR, "instance", "evaluation_cache.sqlite3")
+
+# results kept in memory per process (entries)
+RESULT_CACHE_SIZE = int(os.environ.get("EVALUATION_CACHE_SIZE", 65536))
+# rows kept in the shared table (oldest stored go first; 0 = unbounded)
+RESULT_CACHE_MAX_ROWS = int(os.environ.get("EVALUATION_CACHE_MAX_ROWS", 1000000))
+
+
+# --------------------------
+# Evaluation result cache: (resume hash, jd hash, scorer version) -> result
+# --------------------------
+class ResultCache:
+    """
+    (score, verdict, missing_skills) of a resume text vs a JD text, keyed
+    by the two content hashes (blob_store.text_hash) under one scorer
+    version. An in-memory LRU in front of a shared SQLite table (WAL, one
+    connection per thread), so every worker process reuses every result.
+    Rows of other scorer versions are never read; they stay until prune()
+    runs (a maintenance step, see below), so processes still on an older
+    version during a rolling deploy keep their results. The table holds at
+    most `max_rows` rows: put_many evicts the longest-stored ones (of any
+    version) every 1% of that written (rows stored together go together).
+    """
+
+    def __init__(self, version: str, path: str = None, size: int = None, max_rows: int = None):
+        self.version = version
+        self.path = path or RESULT_CACHE_FILE
+        self.size = RESULT_CACHE_SIZE if size is None else size
+        self.max_rows = RESULT_CACHE_MAX_ROWS if max_rows is None else max_rows
+        self._written = 0
+        self._memory = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        conn = self._conn()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS results (version TEXT, resume_hash TEXT, jd_hash TEXT, "
+            "result TEXT NOT NULL, stored_at REAL NOT NULL DEFAULT 0, "
+            "PRIMARY KEY (version, resume_hash, jd_hash)) WITHOUT ROWID"
+        )
+        columns = [c[1] for c in conn.execute("PRAGMA table_info(results)")]
+        if "stored_at" not in columns:  # table from before the row cap
+            conn.execute("ALTER TABLE results ADD COLUMN stored_at REAL NOT NULL DEFAULT 0")
+        conn.execute("CREATE INDEX IF NOT EXISTS ix_results_stored_at ON results (stored_at)")
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def _remember(self, key, result):
+        if self.size <= 0:
+            return
+        with self._lock:
+            self._memory[key] = result
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.size:
+                self._memory.popitem(last=False)
+
+    def get(self, resume_hash: str, jd_hash: str):
+        """Cached (score, verdict, missing_skills), or None"""
+        key = (resume_hash, jd_hash)
+        with self._lock:
+            result = self._memory.get(key)
+            if result is not None:
+                self._memory.move_to_end(key)
+        if result is None:
+            row = self._conn().execute(
+                "SELECT result FROM results WHERE version = ? AND resume_hash = ? AND jd_hash = ?",
+                (self.version, resume_hash, jd_hash),
+            ).fetchone()
+            if row is None:
+                return None
+            score, verdict, missing = json.loads(row[0])
+            result = (score, verdict, tuple(missing))
+            self._remember(key, result)
+        return result[0], result[1], list(result[2])
+
+    def put(self, resume_hash: str, jd_hash: str, result):
+        self.put_many([((resume_hash, jd_hash), result)])
+
+    def put_many(self, items):
+        """Store [((resume_hash, jd_hash), (score, verdict, missing_skills))] in one commit"""
+        rows = []
+        now = time.time()
+        for key, (score, verdict, missing) in items:
+            self._remember(key, (score, verdict, tuple(missing)))
+            rows.append((self.version, *key, json.dumps([score, verdict, list(missing)]), now))
+        if rows:
+            conn = self._conn()
+            with conn:
+                conn.execute("BEGIN IMMEDIATE")
+                conn.executemany(
+                    "INSERT OR REPLACE INTO results (version, resume_hash, jd_hash, result, stored_at) "
+                    "VALUES (?, ?, ?, ?, ?)", rows
+                )
+            with self._lock:
+                self._written += len(rows)
+                due = self.max_rows > 0 and self._written >= max(1000, self.max_rows // 100)
+                if due:
+                    self._written = 0
+            if due:
+                self.evict()
+
+    def evict(self) -> int:
+        """Delete the longest-stored rows beyond max_rows; returns how many went"""
+        conn = self._conn()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            return conn.execute(
+                "DELETE FROM results WHERE stored_at < ("
+                "SELECT stored_at FROM results ORDER BY stored_at DESC LIMIT 1 OFFSET ?)",
+                (self.max_rows - 1,),
+            ).rowcount
+
+    def prune(self) -> int:
+        """Delete the rows of every other scorer version; returns how many went"""
+        conn = self._conn()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            return conn.execute("DELETE FROM results WHERE version != ?", (self.version,)).rowcount
+
+    def __len__(self):
+        return self._conn().execute("SELECT COUNT(*) FROM results WHERE version = ?", (self.version,)).fetchone()[0]
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_result_cache(version: str) -> ResultCache:
+    """Process-wide cache for the current scorer version (a new version starts a new cache)"""
+    global _cache
+    if _cache is None or _cache.version != version:
+        with _cache_lock:
+            if _cache is None or _cache.version != version:
+                _cache = ResultCache(version)
+    return _cache
+
+
+# --------------------------
+# maintenance: python -m utils.result_cache
+# --------------------------
+if __name__ == "__main__":
+    # run once no process on an older scorer version is left (e.g. after a deploy)
+    from utils.evaluator import scorer_version
+
+    version = scorer_version()
+    removed = get_result_cache(version).prune()
+    print(f"[result_cache] pruned {removed} results of scorer versions other than {version}")
@@ -0,0 +1,145 @@
+import threading
+import numpy as np
+
+from utils import storage
+from utils.embedding import EMBEDDING_DIM
+from utils.evaluator import load_profiles
+from utils.quantization import QuantizedRows
+
+
+# --------------------------
+# helpers
+# --------------------------
+def _version(record: dict):
+    """What a record's embedding depends on: model + text"""
+    return (record.get("embedding_model"), record.get("embedding_key") or record.get("parsed_text_ref"))
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """L2-normalize rows as float32 (zero rows stay zero)"""
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    return np.divide(matrix, norms, out=np.zeros_like(matrix), where=norms != 0)
+
+
+# --------------------------
+# per-entity normalized embedding matrix
+# --------------------------
+class EmbeddingMatrix:
+    """
+    L2-normalized embeddings of one entity's records, one row per record id
+    in a contiguous (capacity, dim) QuantizedRows matrix (int8 by default).
+    Rows are (re)computed only when a record is new or its text / model
+    changed. Rows of records deleted (by any process) are dropped on the
+    next sync, from storage.changes_since like the ANN index.
+    """
+
+    def __init__(self, entity: str, dim: int = EMBEDDING_DIM, quantization: str = None):
+        self.entity = entity
+        self.dim = dim
+        self._cursor = None
+        self._lock = threading.Lock()
+        self._data = QuantizedRows(dim, quantization)
+        self._rows = {}      # id -> row
+        self._versions = {}  # id -> _version(record)
+        self._free = []
+
+    def _row_for(self, rid):
+        row = self._rows.get(rid)
+        if row is None:
+            if self._free:
+                row = self._free.pop()
+            else:
+                row = len(self._rows)
+                if row >= len(self._data):
+                    self._data.grow(max(64, 2 * len(self._data)))
+            self._rows[rid] = row
+        return row
+
+    def _evict_deleted(self):
+        """Drop the rows of records deleted since the last sync (all held ids are checked if storage lost track)"""
+        cursor, changed = storage.changes_since(self.entity, self._cursor)
+        with self._lock:
+            held = list(self._rows) if changed is None else [rid for rid in changed if rid in self._rows]
+        for rid in held:
+            if storage.get_record(self.entity, rid) is None:
+                self.discard(rid)
+        self._cursor = cursor
+
+    def sync(self, records):
+        """Make sure every record has an up-to-date row (batch-embedding the stale ones)"""
+        self._evict_deleted()
+        with self._lock:
+            stale = [r for r in records if self._versions.get(r["id"]) != _version(r)]
+        if not stale:
+            return
+        vectors = normalize_rows(np.stack([p.embedding for p in load_profiles(stale)]))
+        with self._lock:
+            for record, vec in zip(stale, vectors):
+                self._data.set(self._row_for(record["id"]), vec)
+                self._versions[record["id"]] = _version(record)
+
+    def discard(self, rid):
+        with self._lock:
+            row = self._rows.pop(rid, None)
+            self._versions.pop(rid, None)
+            if row is not None:
+                self._data.clear(row)
+                self._free.append(row)
+
+    def matrix(self, records) -> np.ndarray:
+        """(len(records), dim) normalized embeddings (dequantized), in `records` order"""
+        self.sync(records)
+        with self._lock:
+            return self._data.take([self._rows[r["id"]] for r in records])
+
+    def dot(self, records, queries: np.ndarray) -> np.ndarray:
+        """(len(records), len(queries)) similarities, computed on the quantized rows"""
+        self.sync(records)
+        with self._lock:
+            return self._data.dot(queries, [self._rows[r["id"]] for r in records])
+
+    @property
+    def nbytes(self) -> int:
+        return self._data.nbytes
+
+
+# --------------------------
+# engine
+# --------------------------
+class SimilarityEngine:
+    """Resume / JD embedding matrices and matmul-based score grids"""
+
+    def __init__(self):
+        self.resumes = EmbeddingMatrix("resumes")
+        self.jds = EmbeddingMatrix("jds")
+
+    def similarity(self, jds, resumes) -> np.ndarray:
+        """
+        Cosine similarity grid, shape (len(jds), len(resumes)): the (few) JD
+        rows are dequantized and multiplied against the quantized resume rows
+        """
+        # (also when one side is empty: drops the rows of deleted records)
+        self.resumes.sync(resumes)
+        self.jds.sync(jds)
+        if not jds or not resumes:
+            return np.zeros((len(jds), len(resumes)), dtype=np.float32)
+        return self.resumes.dot(resumes, self.jds.matrix(jds)).T
+
+    def score_matrix(self, jds, resumes) -> np.ndarray:
+        """Scores (0-100, same scale as evaluations) for every jd x resume"""
+        return (self.similarity(jds, resumes) * 100).astype(np.int32)
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_engine() -> SimilarityEngine:
+    """Process-wide engine (matrices are kept between requests)"""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = SimilarityEngine()
+    return _engine
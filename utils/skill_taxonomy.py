@@ -0,0 +1,160 @@
+# --------------------------
+# Default skill dictionary: canonical name -> aliases
+# --------------------------
+# Matched on whole words (see utils/skills.py), case-insensitive. Names that
+# are also everyday words or letters ("c", "r", "go", "rest", "cv") are left
+# out or spelled unambiguously to avoid false matches.
+# Extend / override with a JSON file of the same shape via SKILLS_FILE.
+SKILLS = {
+    # languages
+    "python": ["python3"],
+    "java": [],
+    "javascript": ["js", "ecmascript"],
+    "typescript": [],
+    "c++": ["cpp"],
+    "c#": ["csharp"],
+    "golang": ["go lang"],
+    "rust": [],
+    "ruby": [],
+    "php": [],
+    "kotlin": [],
+    "swift": [],
+    "scala": [],
+    "matlab": [],
+    "perl": [],
+    "bash": ["shell scripting", "shell script"],
+    "sql": [],
+    "html": ["html5"],
+    "css": ["css3"],
+    "dart": [],
+    "elixir": [],
+    "haskell": [],
+    "julia": [],
+    "solidity": [],
+
+    # web / backend frameworks
+    "react": ["react.js", "reactjs"],
+    "angular": ["angularjs", "angular.js"],
+    "vue": ["vue.js", "vuejs"],
+    "svelte": [],
+    "next.js": ["nextjs"],
+    "node.js": ["nodejs"],
+    "express": ["express.js", "expressjs"],
+    "django": [],
+    "flask": [],
+    "fastapi": [],
+    "spring": ["spring boot", "springboot"],
+    "ruby on rails": ["rails"],
+    "laravel": [],
+    "asp.net": ["dotnet", ".net core"],
+    "graphql": [],
+    "rest api": ["rest apis", "restful", "restful api", "restful apis"],
+    "grpc": [],
+    "microservices": ["microservice"],
+    "redux": [],
+    "tailwind": ["tailwindcss", "tailwind css"],
+    "bootstrap": [],
+    "jquery": [],
+    "flutter": [],
+    "react native": [],
+
+    # data / ml
+    "machine learning": ["ml"],
+    "deep learning": [],
+    "natural language processing": ["nlp"],
+    "computer vision": [],
+    "data science": [],
+    "data analysis": ["data analytics"],
+    "data engineering": [],
+    "statistics": ["statistical analysis"],
+    "tensorflow": [],
+    "pytorch": ["torch"],
+    "keras": [],
+    "scikit-learn": ["sklearn", "scikit learn"],
+    "pandas": [],
+    "numpy": [],
+    "scipy": [],
+    "matplotlib": [],
+    "spark": ["apache spark", "pyspark"],
+    "hadoop": [],
+    "kafka": ["apache kafka"],
+    "airflow": ["apache airflow"],
+    "dbt": [],
+    "etl": [],
+    "tableau": [],
+    "power bi": ["powerbi"],
+    "microsoft excel": ["ms excel", "excel spreadsheets"],
+    "llm": ["large language models", "large language model", "llms"],
+    "transformers": [],
+    "hugging face": ["huggingface"],
+    "opencv": [],
+    "reinforcement learning": [],
+    "mlops": [],
+
+    # databases
+    "postgresql": ["postgres"],
+    "mysql": [],
+    "sqlite": [],
+    "mongodb": ["mongo"],
+    "redis": [],
+    "elasticsearch": ["elastic search"],
+    "cassandra": [],
+    "dynamodb": [],
+    "oracle": [],
+    "sql server": ["mssql"],
+    "snowflake": [],
+    "bigquery": [],
+    "neo4j": [],
+
+    # cloud / devops
+    "aws": ["amazon web services"],
+    "azure": ["microsoft azure"],
+    "gcp": ["google cloud", "google cloud platform"],
+    "docker": [],
+    "kubernetes": ["k8s"],
+    "terraform": [],
+    "ansible": [],
+    "jenkins": [],
+    "ci/cd": ["ci cd", "continuous integration", "continuous delivery", "continuous deployment"],
+    "github actions": [],
+    "gitlab ci": [],
+    "git": [],
+    "linux": [],
+    "nginx": [],
+    "serverless": [],
+    "aws lambda": [],
+    "prometheus": [],
+    "grafana": [],
+    "helm": [],
+
+    # practices / other technical
+    "agile": [],
+    "scrum": [],
+    "kanban": [],
+    "tdd": ["test driven development"],
+    "unit testing": ["unit tests"],
+    "selenium": [],
+    "pytest": [],
+    "jest": [],
+    "cypress": [],
+    "object oriented programming": ["oop"],
+    "data structures": [],
+    "algorithms": [],
+    "system design": [],
+    "distributed systems": [],
+    "cybersecurity": ["cyber security", "information security"],
+    "networking": [],
+    "blockchain": [],
+    "embedded systems": [],
+    "figma": [],
+    "ui/ux": ["ui ux", "ux design", "ui design"],
+    "jira": [],
+    "project management": [],
+    "product management": [],
+
+    # soft skills
+    "communication": ["communication skills"],
+    "leadership": [],
+    "teamwork": ["team player"],
+    "problem solving": ["problem-solving"],
+}
@@ -0,0 +1,120 @@
+import collections
+import hashlib
+import json
+import os
+import re
+import threading
+
+from utils.skill_taxonomy import SKILLS
+
+# --------------------------
+# Settings
+# --------------------------
+# optional JSON {canonical skill: [aliases]} merged over the default taxonomy
+SKILLS_FILE = os.environ.get("SKILLS_FILE")
+
+# words keep the symbols skills are spelled with: c++, c#, node.js, ci/cd, scikit-learn
+WORD_RE = re.compile(r"[a-z0-9+#][a-z0-9+#./-]*")
+
+
+def words(text: str):
+    """Lowercase words of `text` (trailing punctuation stripped)"""
+    out = []
+    for w in WORD_RE.findall((text or "").lower()):
+        w = w.rstrip("./-")
+        if w:
+            out.append(w)
+    return out
+
+
+# --------------------------
+# Aho-Corasick automaton over words
+# --------------------------
+class SkillMatcher:
+    """
+    Every skill name and alias compiled into one Aho-Corasick automaton
+    whose alphabet is words, so "machine learning" is a two-step path and
+    "java" never matches inside "javascript". find() reports all skill
+    mentions in one pass over the document's words, whatever the number
+    of skills.
+    """
+
+    def __init__(self, taxonomy: dict):
+        self._goto = [{}]  # node -> {word: node}
+        self._fail = [0]
+        self._out = [()]   # node -> canonical skills ending here
+        for canonical, aliases in taxonomy.items():
+            for phrase in [canonical, *aliases]:
+                path = words(phrase)
+                if path:
+                    self._insert(path, canonical)
+        self._link()
+        encoded = json.dumps(taxonomy, sort_keys=True).encode("utf-8")
+        # stored skill sets are tied to the taxonomy they were extracted with
+        self.version = hashlib.blake2b(encoded, digest_size=8).hexdigest()
+
+    def _insert(self, path, canonical):
+        node = 0
+        for word in path:
+            nxt = self._goto[node].get(word)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][word] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append(())
+            node = nxt
+        if canonical not in self._out[node]:
+            self._out[node] += (canonical,)
+
+    def _link(self):
+        """Failure links (breadth-first); outputs inherited along them"""
+        queue = collections.deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for word, child in self._goto[node].items():
+                fail = self._fail[node]
+                while fail and word not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[child] = self._goto[fail].get(word, 0)
+                self._out[child] += tuple(s for s in self._out[self._fail[child]] if s not in self._out[child])
+                queue.append(child)
+
+    def find(self, text: str) -> collections.Counter:
+        """Canonical skill -> number of mentions in `text`"""
+        goto, fail, out = self._goto, self._fail, self._out
+        found = collections.Counter()
+        node = 0
+        for word in words(text):
+            while node and word not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(word, 0)
+            if out[node]:
+                found.update(out[node])
+        return found
+
+    def extract(self, text: str) -> frozenset:
+        return frozenset(self.find(text))
+
+
+_matcher = None
+_matcher_lock = threading.Lock()
+
+
+def get_matcher() -> SkillMatcher:
+    """Process-wide matcher for the default taxonomy (+ SKILLS_FILE)"""
+    global _matcher
+    if _matcher is None:
+        with _matcher_lock:
+            if _matcher is None:
+                taxonomy = dict(SKILLS)
+                if SKILLS_FILE and os.path.exists(SKILLS_FILE):
+                    with open(SKILLS_FILE, "r") as f:
+                        taxonomy.update(json.load(f))
+                _matcher = SkillMatcher(taxonomy)
+    return _matcher
+
+
+def extract_skills(text: str) -> frozenset:
+    """Canonical skills mentioned in `text`"""
+    return get_matcher().extract(text)
@@ -0,0 +1,246 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+
+from utils.storage import (
+    DATA_DIR, DB_FILE, ENTITIES, INDEXES, INSTANCE_DIR, UNIQUE, JSONBackend, StorageBackend, _empty_schema,
+)
+
+logger = logging.getLogger(__name__)
+
+# default database file (kept apart from the legacy SQLAlchemy database.sqlite)
+SQLITE_DB_FILE = os.path.join(INSTANCE_DIR, "db.sqlite3")
+
+
+# --------------------------
+# SQLite backend (stdlib sqlite3, WAL mode)
+# --------------------------
+class SQLiteBackend(StorageBackend):
+    """
+    One table per entity: `id` primary key, one column per indexed field
+    (see storage.INDEXES) and the full record as JSON in `data`.
+    WAL journal mode lets readers run concurrently with a writer, across
+    threads and worker processes. Connections are per thread.
+    """
+
+    def __init__(self, path: str = None):
+        self.path = path or SQLITE_DB_FILE
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        fresh = not os.path.exists(self.path)
+        self._create_schema()
+        if fresh and (os.path.exists(DB_FILE) or os.path.exists(DATA_DIR)):
+            # first start on sqlite: import the existing JSON database
+            self.replace_all(JSONBackend().load_all())
+
+    # ---- connection / schema ----
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=30000")
+            self._local.conn = conn
+        return conn
+
+    def _create_schema(self):
+        conn = self._conn()
+        for entity in ENTITIES:
+            fields = INDEXES.get(entity, ())
+            columns = "".join(f", {f}" for f in fields)
+            conn.execute(f"CREATE TABLE IF NOT EXISTS {entity} (id INTEGER PRIMARY KEY{columns}, data TEXT NOT NULL)")
+            for field in fields:
+                conn.execute(f"CREATE INDEX IF NOT EXISTS ix_{entity}_{field} ON {entity} ({field})")
+        conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS ux_evaluations_pair ON evaluations (resume_id, jd_id)")
+        for entity, fields in UNIQUE.items():
+            for field in fields:
+                try:
+                    conn.execute(f"CREATE UNIQUE INDEX IF NOT EXISTS ux_{entity}_{field} ON {entity} ({field})")
+                except sqlite3.IntegrityError:
+                    logger.warning("duplicate %s.%s values stored: uniqueness is NOT enforced until they are resolved",
+                                   entity, field)
+        # last id issued per entity (ids of deleted records are never reused)
+        conn.execute("CREATE TABLE IF NOT EXISTS id_sequence (entity TEXT PRIMARY KEY, last INTEGER NOT NULL)")
+        # last change of every record (see changes): seq only grows, one row per record id
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS change_log (seq INTEGER PRIMARY KEY AUTOINCREMENT, "
+            "entity TEXT NOT NULL, record_id INTEGER, UNIQUE (entity, record_id))"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS ix_change_log_entity ON change_log (entity, seq)")
+        for entity in ENTITIES:
+            for event, row in (("INSERT", "NEW"), ("UPDATE", "NEW"), ("DELETE", "OLD")):
+                conn.execute(
+                    f"CREATE TRIGGER IF NOT EXISTS log_{entity}_{event.lower()} AFTER {event} ON {entity} "
+                    f"BEGIN INSERT OR REPLACE INTO change_log (entity, record_id) VALUES ('{entity}', {row}.id); END"
+                )
+
+    def _row(self, entity, record):
+        fields = INDEXES.get(entity, ())
+        return (record.get("id"), *[record.get(f) for f in fields], json.dumps(record))
+
+    def _insert_sql(self, entity, verb="INSERT"):
+        fields = INDEXES.get(entity, ())
+        columns = ", ".join(("id", *fields, "data"))
+        marks = ", ".join("?" * (len(fields) + 2))
+        return f"{verb} INTO {entity} ({columns}) VALUES ({marks})"
+
+    # ---- StorageBackend ----
+    def load_all(self):
+        conn = self._conn()
+        return {
+            entity: [json.loads(d) for (d,) in conn.execute(f"SELECT data FROM {entity} ORDER BY id")]
+            for entity in ENTITIES
+        }
+
+    def replace_all(self, data):
+        conn = self._conn()
+        data = {**_empty_schema(), **data}
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            for entity in ENTITIES:
+                conn.execute(f"DELETE FROM {entity}")
+                conn.executemany(self._insert_sql(entity, "INSERT OR REPLACE"),
+                                 [self._row(entity, r) for r in data[entity]])
+
+    def get(self, entity, record_id):
+        row = self._conn().execute(f"SELECT data FROM {entity} WHERE id = ?", (record_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def insert(self, entity, record):
+        try:
+            self._conn().execute(self._insert_sql(entity), self._row(entity, record))
+        except sqlite3.IntegrityError as e:
+            raise _integrity_error(e, entity, record.get("id"))
+
+    def update(self, entity, record_id, changes):
+        conn = self._conn()
+        try:
+            with conn:
+                conn.execute("BEGIN IMMEDIATE")
+                self._update(conn, entity, record_id, changes)
+        except sqlite3.IntegrityError as e:
+            raise _integrity_error(e, entity, record_id)
+
+    def _update(self, conn, entity, record_id, changes):
+        row = conn.execute(f"SELECT data FROM {entity} WHERE id = ?", (record_id,)).fetchone()
+        if row is None:
+            return
+        record = {**json.loads(row[0]), **changes}
+        fields = INDEXES.get(entity, ())
+        sets = "".join(f"{f} = ?, " for f in fields)
+        conn.execute(f"UPDATE {entity} SET {sets}data = ? WHERE id = ?",
+                     (*[record.get(f) for f in fields], json.dumps(record), record_id))
+
+    def delete(self, entity, record_id):
+        self._conn().execute(f"DELETE FROM {entity} WHERE id = ?", (record_id,))
+
+    def find(self, entity, field, values):
+        conn = self._conn()
+        results = []
+        for value in dict.fromkeys(values):
+            rows = conn.execute(f"SELECT data FROM {entity} WHERE {field} IS ? ORDER BY id", (value,))
+            results.extend(json.loads(d) for (d,) in rows)
+        return results
+
+    def count(self, entity, field=None, value=None):
+        if field is None:
+            return self._conn().execute(f"SELECT COUNT(*) FROM {entity}").fetchone()[0]
+        return self._conn().execute(f"SELECT COUNT(*) FROM {entity} WHERE {field} IS ?", (value,)).fetchone()[0]
+
+    def find_pair(self, resume_id, jd_id):
+        row = self._conn().execute(
+            "SELECT data FROM evaluations WHERE resume_id IS ? AND jd_id IS ?", (resume_id, jd_id)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def page(self, entity, after=None, limit=None, field=None, values=None):
+        where, params = [], []
+        if after is not None:
+            where.append("id > ?")
+            params.append(after)
+        if field is not None:
+            values = list(dict.fromkeys(values))
+            if not values:
+                return []
+            # NULL-safe like find / count (`IS ?`): None matches records without the field
+            known = [v for v in values if v is not None]
+            match = [f"{field} IN ({', '.join('?' * len(known))})"] if known else []
+            if len(known) < len(values):
+                match.append(f"{field} IS NULL")
+            where.append(f"({' OR '.join(match)})")
+            params.extend(known)
+        sql = f"SELECT data FROM {entity}"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY id"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        return [json.loads(d) for (d,) in self._conn().execute(sql, params)]
+
+    def commit(self, ops, check=None, read=()):
+        """
+        Apply a batch in one IMMEDIATE transaction (rolled back on any error);
+        `check` runs first inside it, so it sees no concurrent writes
+        """
+        conn = self._conn()
+        try:
+            with conn:
+                conn.execute("BEGIN IMMEDIATE")
+                if check is not None:
+                    check()
+                for op in ops:
+                    if op[0] == "insert":
+                        conn.execute(self._insert_sql(op[1]), self._row(op[1], op[2]))
+                    elif op[0] == "update":
+                        self._update(conn, op[1], op[2], op[3])
+                    elif op[0] == "delete":
+                        conn.execute(f"DELETE FROM {op[1]} WHERE id = ?", (op[2],))
+        except sqlite3.IntegrityError as e:
+            raise _integrity_error(e)
+
+    def version(self, entity):
+        """Seq of the entity's last logged change (the same in every thread and process)"""
+        return self._conn().execute(
+            "SELECT COALESCE(MAX(seq), 0) FROM change_log WHERE entity = ?", (entity,)
+        ).fetchone()[0]
+
+    def changes(self, entity, since=None):
+        """Ids written after `since` from change_log (triggers log every write)"""
+        if since is None:
+            return self.version(entity), None
+        rows = self._conn().execute(
+            "SELECT seq, record_id FROM change_log WHERE entity = ? AND seq > ? ORDER BY seq", (entity, since)
+        ).fetchall()
+        return (rows[-1][0] if rows else since), {rid for _, rid in rows}
+
+    def next_id(self, entity):
+        """
+        Allocate an id: max(last issued, max id) + 1, bumped in id_sequence
+        under a write lock so concurrent workers never get the same id
+        """
+        conn = self._conn()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute("SELECT last FROM id_sequence WHERE entity = ?", (entity,)).fetchone()
+            top = conn.execute(f"SELECT COALESCE(MAX(id), 0) FROM {entity}").fetchone()[0]
+            issued = max(row[0] if row else 0, top) + 1
+            conn.execute("INSERT OR REPLACE INTO id_sequence (entity, last) VALUES (?, ?)", (entity, issued))
+        return issued
+
+
+def _integrity_error(e: sqlite3.IntegrityError, entity: str = None, record_id=None) -> ValueError:
+    """ValueError (as the JSON backend raises) for a violated key / unique index"""
+    message = str(e)
+    if "resume_id" in message:
+        return ValueError("evaluation already exists for this resume and jd")
+    for table, fields in UNIQUE.items():
+        for field in fields:
+            if f"{table}.{field}" in message:
+                return ValueError(f"duplicate {table} {field}")
+    if entity is not None:
+        return ValueError(f"duplicate {entity} id: {record_id}")
+    return ValueError(f"duplicate id in batch: {e}")
@@ -1,66 +1,994 @@
+import bisect
+import contextlib
+import heapq
 import json
 import os
 import threading
+import uuid
+import zlib
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - non-POSIX: in-process locking only
+    fcntl = None
+
+from utils import blob_store
 
 # --------------------------
 # Global DB file path
 # --------------------------
 BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 INSTANCE_DIR = os.path.join(BASE_DIR, "instance")
+# Per-entity (and optionally per-tenant) shard files + journals live here
+DATA_DIR = os.path.join(INSTANCE_DIR, "db")
+
+# Legacy single-file layout (migrated into DATA_DIR on first start)
 DB_FILE = os.path.join(INSTANCE_DIR, "db.json")
+JOURNAL_FILE = os.path.join(INSTANCE_DIR, "db.journal")
 
-# Thread lock (prevents race conditions if multiple requests write at once)
-_lock = threading.Lock()
+# Number of journal entries (per shard) that triggers a background compaction
+COMPACT_THRESHOLD = int(os.environ.get("DB_COMPACT_THRESHOLD", 1000))
 
+# Hash partitions per tenant-owned entity (1 = one file per entity)
+STORAGE_SHARDS = int(os.environ.get("STORAGE_SHARDS", 1))
 
-# --------------------------
-# Ensure db.json exists
-# --------------------------
-def _init_db():
-    """Create db.json with empty schema if it doesn't exist"""
-    if not os.path.exists(DB_FILE):
-        os.makedirs(INSTANCE_DIR, exist_ok=True)
-        with open(DB_FILE, "w") as f:
-            json.dump(_empty_schema(), f, indent=2)
+# Entities stored by every backend
+ENTITIES = ("admins", "users", "resumes", "jds", "evaluations")
+
+# Secondary (foreign-key / lookup) indexes maintained per entity
+INDEXES = {
+    "admins": ("email",),
+    "users": ("email",),
+    "resumes": ("user_id",),
+    "jds": ("admin_id",),
+    "evaluations": ("resume_id", "jd_id"),
+}
+
+# Indexed fields no two records of an entity may share (None excepted)
+UNIQUE = {
+    "admins": ("email",),
+    "users": ("email",),
+}
+
+# Owner field used to split an entity into per-tenant shards
+SHARD_KEYS = {
+    "resumes": "user_id",
+    "jds": "admin_id",
+    "evaluations": "jd_id",
+}
+
+# Entities whose parsed_text is kept in the blob store, referenced by parsed_text_ref
+TEXT_ENTITIES = ("resumes", "jds")
 
 
 def _empty_schema():
     """Return the default empty schema for db.json"""
-    return {
-        "admins": [],
-        "users": [],
-        "resumes": [],
-        "jds": [],
-        "evaluations": [],
-    }
+    return {entity: [] for entity in ENTITIES}
+
+
+class ConflictError(Exception):
+    """A record read in a transaction changed before the transaction committed"""
 
 
 # --------------------------
-# Load full database
+# Backend interface
 # --------------------------
-def load_data():
-    """Load the entire JSON database safely"""
-    _init_db()
-    with _lock:
-        with open(DB_FILE, "r") as f:
+class StorageBackend:
+    """
+    Storage backend contract. Records are plain dicts keyed by an integer "id".
+    Returned records are shared with the backend cache - never mutate them.
+    """
+
+    def load_all(self) -> dict:
+        """Whole database as {entity: [records]}"""
+        raise NotImplementedError
+
+    def replace_all(self, data: dict):
+        """Replace the whole database"""
+        raise NotImplementedError
+
+    def get(self, entity: str, record_id: int):
+        raise NotImplementedError
+
+    def insert(self, entity: str, record: dict):
+        raise NotImplementedError
+
+    def update(self, entity: str, record_id: int, changes: dict):
+        raise NotImplementedError
+
+    def delete(self, entity: str, record_id: int):
+        raise NotImplementedError
+
+    def find(self, entity: str, field: str, values) -> list:
+        """Records whose indexed `field` is one of `values` (grouped by value)"""
+        raise NotImplementedError
+
+    def count(self, entity: str, field: str = None, value=None) -> int:
+        raise NotImplementedError
+
+    def find_pair(self, resume_id: int, jd_id: int):
+        """Evaluation for a (resume, jd) pair, or None"""
+        raise NotImplementedError
+
+    def page(self, entity: str, after: int = None, limit: int = None, field: str = None, values=None) -> list:
+        """
+        Records ordered by id with id > `after` (at most `limit`); with `field`,
+        restricted to records whose indexed field is one of `values`
+        """
+        raise NotImplementedError
+
+    def next_id(self, entity: str) -> int:
+        raise NotImplementedError
+
+    def version(self, entity: str):
+        """
+        Opaque token that changes whenever `entity` may have changed
+        (in any process); None if the backend can't tell
+        """
+        return None
+
+    def changes(self, entity: str, since=None):
+        """
+        (cursor, ids of `entity` records inserted / updated / deleted after
+        `since`, a cursor returned earlier). The ids are None when the
+        backend can't tell (no `since`, or it lost track): rescan everything.
+        """
+        return None, None
+
+    def commit(self, ops: list, check=None, read=()):
+        """
+        Apply a batch of ("insert", entity, record) / ("update", entity, id, changes)
+        / ("delete", entity, id) operations. `check` is called once the batch
+        holds its write locks (covering the entities in `read` too), before
+        anything is written; it raises to abort. Backends override this to
+        write the batch at once; this fallback applies them one by one.
+        """
+        if check is not None:
+            check()
+        for op in ops:
+            if op[0] == "insert":
+                self.insert(op[1], op[2])
+            elif op[0] == "update":
+                self.update(op[1], op[2], op[3])
+            elif op[0] == "delete":
+                self.delete(op[1], op[2])
+
+
+# --------------------------
+# In-memory image with hash indexes
+# --------------------------
+class _Image:
+    """
+    Database held as {entity: {id: record}} plus secondary indexes:
+    field value -> ids (e.g. user_id -> resumes, jd_id -> evaluations) and
+    the unique (resume_id, jd_id) -> evaluation id pair index.
+    Records are replaced, never mutated, so handed-out dicts stay stable.
+    Ids written since the image was built are kept with a sequence number
+    (`changed`, oldest first) under the image's `generation`, see changes().
+    """
+
+    def __init__(self, data: dict):
+        self.tables = {entity: {} for entity in ENTITIES}
+        self.indexes = {(e, f): {} for e, fields in INDEXES.items() for f in fields}
+        self.pairs = {}
+        self.max_id = {entity: 0 for entity in self.tables}
+        self._view = None
+        # sorted ids per entity, built on first page() and kept up to date
+        self._order = {}
+        self.generation = uuid.uuid4().hex
+        self.seq = 0
+        self.changed = {}
+        for entity, rows in data.items():
+            for record in rows:
+                self.put(entity, record)
+        self.changed.clear()  # a new image is read in full anyway
+
+    def _touch(self, entity, rid):
+        self.seq += 1
+        changed = self.changed.setdefault(entity, {})
+        changed.pop(rid, None)
+        changed[rid] = self.seq
+
+    def changed_since(self, entity, seq):
+        """Ids of `entity` put / removed after sequence number `seq`"""
+        ids = set()
+        for rid, n in reversed(self.changed.get(entity, {}).items()):
+            if n <= seq:
+                break
+            ids.add(rid)
+        return ids
+
+    def _index(self, entity, record, add=True):
+        rid = record.get("id")
+        for field in INDEXES.get(entity, ()):
+            bucket = self.indexes[(entity, field)]
+            value = record.get(field)
+            if add:
+                bucket.setdefault(value, {})[rid] = None
+            elif value in bucket:
+                bucket[value].pop(rid, None)
+                if not bucket[value]:
+                    del bucket[value]
+        if entity == "evaluations":
+            pair = (record.get("resume_id"), record.get("jd_id"))
+            if add:
+                self.pairs[pair] = rid
+            elif self.pairs.get(pair) == rid:
+                del self.pairs[pair]
+
+    def put(self, entity, record):
+        table = self.tables.setdefault(entity, {})
+        rid = record.get("id")
+        old = table.get(rid)
+        if old is not None:
+            self._index(entity, old, add=False)
+        elif entity in self._order:
+            order = self._order[entity]
+            if not order or order[-1] < rid:
+                order.append(rid)
+            else:
+                bisect.insort(order, rid)
+        table[rid] = record
+        self._index(entity, record)
+        if isinstance(rid, int) and rid > self.max_id.get(entity, 0):
+            self.max_id[entity] = rid
+        self._touch(entity, rid)
+        self._view = None
+
+    def patch(self, entity, rid, changes):
+        old = self.tables.get(entity, {}).get(rid)
+        if old is not None:
+            self.put(entity, {**old, **changes})
+
+    def remove(self, entity, rid):
+        old = self.tables.get(entity, {}).pop(rid, None)
+        if old is not None:
+            self._index(entity, old, add=False)
+            self._touch(entity, rid)
+            self._view = None
+            order = self._order.get(entity)
+            if order is not None:
+                i = bisect.bisect_left(order, rid)
+                if i < len(order) and order[i] == rid:
+                    del order[i]
+
+    def apply(self, entry):
+        """Apply one journal entry; inserts are upserts so replay is idempotent"""
+        op = entry["op"]
+        if op == "insert":
+            self.put(entry["entity"], entry["record"])
+        elif op == "update":
+            self.patch(entry["entity"], entry["id"], entry["changes"])
+        elif op == "delete":
+            self.remove(entry["entity"], entry["id"])
+        elif op == "batch":
+            for sub in entry["entries"]:
+                self.apply(sub)
+
+    def lookup(self, entity, field, value):
+        ids = self.indexes[(entity, field)].get(value, ())
+        table = self.tables[entity]
+        return [table[i] for i in ids]
+
+    def page(self, entity, after=None, limit=None, field=None, values=None):
+        """
+        Records in id order with id > `after`, at most `limit` of them.
+        With `field`, only records whose indexed field is one of `values`;
+        walks the index buckets instead of the table.
+        """
+        table = self.tables[entity]
+        if field is None:
+            if entity not in self._order:
+                self._order[entity] = sorted(table)
+            order = self._order[entity]
+            start = bisect.bisect_right(order, after) if after is not None else 0
+            ids = order[start:start + limit] if limit is not None else order[start:]
+            return [table[i] for i in ids]
+        index = self.indexes[(entity, field)]
+        ids = sorted(i for v in dict.fromkeys(values) for i in index.get(v, ()))
+        if after is not None:
+            ids = ids[bisect.bisect_right(ids, after):]
+        if limit is not None:
+            ids = ids[:limit]
+        return [table[i] for i in ids]
+
+    def to_dict(self):
+        """Plain {entity: [records]} view (materialized once per change)"""
+        if self._view is None:
+            self._view = {e: list(t.values()) for e, t in self.tables.items()}
+        return self._view
+
+
+# --------------------------
+# Journal file helpers
+# --------------------------
+def _read_journal(path: str):
+    """Yield journal entries; a torn trailing line (crash mid-write) is ignored"""
+    if not os.path.exists(path):
+        return
+    with open(path, "r") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                break
+
+
+def _stat(path: str):
+    """Cheap file version: (inode, size, mtime) or None if missing"""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (st.st_ino, st.st_size, st.st_mtime_ns)
+
+
+def _replay_tail(image: _Image, path: str, offset: int):
+    """
+    Replay complete journal lines after byte `offset`.
+    Returns (new offset, entries applied).
+    """
+    count = 0
+    try:
+        f = open(path, "rb")
+    except FileNotFoundError:
+        return offset, 0
+    with f:
+        f.seek(offset)
+        for line in f:
+            if not line.endswith(b"\n"):
+                break  # torn / in-flight write, pick it up next time
             try:
-                return json.load(f)
+                entry = json.loads(line)
             except json.JSONDecodeError:
-                # fallback if file corrupted
-                base = _empty_schema()
-                save_data(base)
-                return base
+                break
+            image.apply(entry)
+            offset += len(line)
+            count += 1
+    return offset, count
+
+
+# --------------------------
+# Cross-process file lock
+# --------------------------
+class _FileLock:
+    """
+    flock() on a side file, so several worker processes can share the data
+    files: shared mode for readers (they never wait on each other), exclusive
+    mode for writers. Re-entrant per thread; a held lock is never upgraded,
+    so writers take the exclusive lock up front.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+
+    @contextlib.contextmanager
+    def hold(self, exclusive: bool = False):
+        held = getattr(self._local, "mode", None)
+        if fcntl is None or held == "ex" or (held == "sh" and not exclusive):
+            yield
+            return
+        if held == "sh":
+            raise RuntimeError("cannot upgrade a shared storage lock")
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            self._local.mode = "ex" if exclusive else "sh"
+            yield
+        finally:
+            self._local.mode = held
+            os.close(fd)  # closing the descriptor releases the flock
+
+
+def _atomic_write_json(path: str, data, **kwargs):
+    """Write JSON to a private temp file, fsync, then rename over `path`"""
+    tmp = f"{path}.{os.getpid()}.{uuid.uuid4().hex[:8]}.tmp"
+    try:
+        with open(tmp, "w") as f:
+            json.dump(data, f, **kwargs)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+# --------------------------
+# Shard: one snapshot file + journal
+# --------------------------
+class _Shard:
+    """
+    A snapshot file plus an append-only journal of mutations, served from a
+    cached _Image that is refreshed when the files change. Every shard has
+    its own locks, cache and background compactor.
+    `lock` guards the in-memory cache within a process; `flock` (a
+    <snapshot>.lock file) coordinates file access between processes.
+    `entity` limits the snapshot to one entity (None = legacy whole-db file).
+    """
+
+    def __init__(self, db_file: str, journal_file: str, compact_threshold: int = None,
+                 entity: str = None):
+        self.db_file = db_file
+        self.journal_file = journal_file
+        self.compacting_file = journal_file + ".compacting"
+        self.compact_threshold = compact_threshold or COMPACT_THRESHOLD
+        self.entity = entity
+
+        # Thread lock (prevents race conditions if multiple requests write at once)
+        self.lock = threading.RLock()
+        # Process lock (shared for readers, exclusive for writers)
+        self.flock = _FileLock(db_file + ".lock")
+        # journal bookkeeping (entries written since last compaction)
+        self._journal_entries = None
+        self._compactor = None
+        # cached image, the file versions it was built from (snapshot,
+        # compacting) and the (inode, byte offset) of journal already replayed
+        self._cache = None
+        self._cache_key = None
+        self._cache_journal = None
+
+    # ---- files ----
+    def _empty(self):
+        return {self.entity: []} if self.entity else _empty_schema()
+
+    def _init_file(self):
+        """Create the snapshot with an empty schema if it doesn't exist"""
+        if not os.path.exists(self.db_file):
+            os.makedirs(os.path.dirname(self.db_file), exist_ok=True)
+            with self.flock.hold(exclusive=True):
+                if not os.path.exists(self.db_file):
+                    self._write_snapshot(self._empty())
+
+    def _write_snapshot(self, data: dict):
+        """Atomically replace the snapshot (write to temp file, then rename)"""
+        if self.entity:
+            data = {self.entity: data.get(self.entity, [])}
+        _atomic_write_json(self.db_file, data, indent=2)
+
+    def _read_snapshot(self):
+        with open(self.db_file, "r") as f:
+            return json.load(f)
+
+    def journal(self, entry: dict):
+        """Append a single mutation to the write-ahead log"""
+        self._init_file()
+        with self.lock, self.flock.hold(exclusive=True):
+            if self._journal_entries is None:
+                self._journal_entries = sum(1 for _ in _read_journal(self.journal_file))
+            with open(self.journal_file, "a") as f:
+                f.write(json.dumps(entry, separators=(",", ":")) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            self._journal_entries += 1
+            if self._journal_entries >= self.compact_threshold:
+                self._schedule_compaction()
+
+    # ---- background compaction ----
+    def _schedule_compaction(self):
+        """Start the compactor thread unless one is already running"""
+        if self._compactor is not None and self._compactor.is_alive():
+            return
+        self._compactor = threading.Thread(target=self.compact, name="db-compactor", daemon=True)
+        self._compactor.start()
+
+    def compact(self):
+        """
+        Fold the journal into a fresh snapshot.
+        The live journal is rotated aside under the lock, so writers keep appending
+        while the (expensive) snapshot serialization happens outside of it.
+        """
+        self._init_file()
+        with self.lock, self.flock.hold(exclusive=True):
+            if not os.path.exists(self.compacting_file):
+                if not os.path.exists(self.journal_file):
+                    return
+                os.replace(self.journal_file, self.compacting_file)
+                self._journal_entries = 0
+            data = self._read_snapshot()
+            version = (_stat(self.db_file), _stat(self.compacting_file))
+
+        image = _Image(data)
+        _replay_tail(image, self.compacting_file, 0)
+
+        with self.lock, self.flock.hold(exclusive=True):
+            if version != (_stat(self.db_file), _stat(self.compacting_file)):
+                return  # a full replace() or another process got there first
+            self._write_snapshot(image.to_dict())
+            os.remove(self.compacting_file)
+
+    # ---- cached image ----
+    def image(self) -> _Image:
+        """
+        Return the cached image, refreshing it if needed.
+        Only re-parsed when the snapshot changes; journal appends are replayed
+        incrementally. Caller must hold self.lock.
+        """
+        self._init_file()
+        with self.flock.hold():
+            return self._refresh()
+
+    def _refresh(self) -> _Image:
+        key = (_stat(self.db_file), _stat(self.compacting_file))
+        journal = _stat(self.journal_file)
+        inode = journal[0] if journal else None
+
+        if self._cache is not None and key == self._cache_key and self._cache_journal[0] in (inode, None):
+            offset = self._cache_journal[1]
+            if journal is None or journal[1] == offset:
+                return self._cache
+            if journal[1] > offset:
+                offset, count = _replay_tail(self._cache, self.journal_file, offset)
+                self._cache_journal = (inode, offset)
+                self._journal_entries = (self._journal_entries or 0) + count
+                return self._cache
+
+        # full reload: snapshot + pending journals
+        try:
+            data = self._read_snapshot()
+        except json.JSONDecodeError:
+            # fallback if file corrupted
+            data = self._empty()
+            self._write_snapshot(data)
+            key = (_stat(self.db_file), key[1])
+        image = _Image(data)
+        _replay_tail(image, self.compacting_file, 0)
+        offset, self._journal_entries = _replay_tail(image, self.journal_file, 0)
+        self._cache, self._cache_key, self._cache_journal = image, key, (inode, offset)
+        return self._cache
+
+    def replace(self, data: dict):
+        """Rewrite the snapshot with `data` and discard the journal"""
+        self._init_file()
+        with self.lock, self.flock.hold(exclusive=True):
+            self._write_snapshot(data)
+            for path in (self.compacting_file, self.journal_file):
+                if os.path.exists(path):
+                    os.remove(path)
+            self._journal_entries = 0
+
+    def retire(self, suffix: str = ".migrated"):
+        """Rename the shard's files out of the way (after a migration)"""
+        with self.lock, self.flock.hold(exclusive=True):
+            for path in (self.db_file, self.compacting_file, self.journal_file):
+                if os.path.exists(path):
+                    os.replace(path, path + suffix)
+            self._cache = None
+
+
+# --------------------------
+# JSON backend (per-entity / per-tenant shards)
+# --------------------------
+class JSONBackend(StorageBackend):
+    """
+    One shard file + journal per entity under instance/db/, so a write to
+    evaluations never rewrites or locks users, resumes or jds.
+    With shards > 1, resumes / jds / evaluations are further split by owner
+    (SHARD_KEYS) into `shards` hash partitions, each with its own lock.
+    A legacy single-file db.json is migrated into this layout on first start.
+    Safe to share between worker processes: shards are guarded by file locks
+    and ids come from a file-locked sequence (ids.json).
+    """
+
+    def __init__(self, data_dir: str = None, shards: int = None, compact_threshold: int = None):
+        self.data_dir = data_dir or DATA_DIR
+        self.shards = max(1, int(shards or STORAGE_SHARDS))
+        self.compact_threshold = compact_threshold or COMPACT_THRESHOLD
+        # ids are allocated from a shared sequence file, under its own locks
+        self._id_lock = threading.Lock()
+        self._id_file = os.path.join(self.data_dir, "ids.json")
+        self._id_flock = _FileLock(self._id_file + ".lock")
+        self._layout_flock = _FileLock(os.path.join(self.data_dir, "layout.lock"))
+
+        self._tables = self._open(self.shards)
+        self._migrate()
+
+    # ---- layout ----
+    def _open(self, shards):
+        tables = {}
+        for entity in ENTITIES:
+            n = shards if entity in SHARD_KEYS else 1
+            tables[entity] = [
+                _Shard(
+                    os.path.join(self.data_dir, f"{entity}.json" if n == 1 else f"{entity}.{i}.json"),
+                    os.path.join(self.data_dir, f"{entity}.journal" if n == 1 else f"{entity}.{i}.journal"),
+                    self.compact_threshold,
+                    entity=entity,
+                )
+                for i in range(n)
+            ]
+        return tables
+
+    def _migrate(self):
+        """
+        Bring older layouts into the current one:
+        - legacy instance/db.json (+ journal) -> per-entity shard files
+        - a different shard count -> reshard every entity
+        Runs under an exclusive lock so only one worker process migrates.
+        """
+        with self._layout_flock.hold(exclusive=True):
+            self._migrate_locked()
+
+    def _migrate_locked(self):
+        layout_file = os.path.join(self.data_dir, "layout.json")
+        layout = None
+        if os.path.exists(layout_file):
+            with open(layout_file, "r") as f:
+                layout = json.load(f)
+
+        if layout is None:
+            if os.path.exists(DB_FILE):
+                legacy = _Shard(DB_FILE, JOURNAL_FILE, self.compact_threshold)
+                with legacy.lock:
+                    data = legacy.image().to_dict()
+                self.replace_all(data)
+                legacy.retire()
+        elif layout.get("shards") != self.shards:
+            old_tables = self._open(layout["shards"])
+            data = self._collect(old_tables)
+            current = {shard.db_file for shards in self._tables.values() for shard in shards}
+            for shards in old_tables.values():
+                for shard in shards:
+                    if shard.db_file not in current:
+                        shard.retire(".resharded")
+            self.replace_all(data)
+        else:
+            return
+
+        os.makedirs(self.data_dir, exist_ok=True)
+        _atomic_write_json(layout_file, {"version": 1, "shards": self.shards})
+
+    def _shard_for(self, entity, key_value) -> _Shard:
+        shards = self._tables[entity]
+        if len(shards) == 1:
+            return shards[0]
+        if isinstance(key_value, int):
+            return shards[key_value % len(shards)]
+        return shards[zlib.crc32(str(key_value).encode()) % len(shards)]
+
+    def _owner(self, entity, record_id):
+        """(shard, record) holding `record_id`, or (None, None)"""
+        for shard in self._tables[entity]:
+            with shard.lock:
+                record = shard.image().tables[entity].get(record_id)
+            if record is not None:
+                return shard, record
+        return None, None
+
+    def compact(self):
+        for shards in self._tables.values():
+            for shard in shards:
+                shard.compact()
+
+    @staticmethod
+    def _collect(tables):
+        """Merge the shards of every entity back into one list per entity"""
+        data = {}
+        for entity, shards in tables.items():
+            rows = []
+            for shard in shards:
+                with shard.lock:
+                    rows.extend(shard.image().tables[entity].values())
+            if len(shards) > 1:
+                rows.sort(key=lambda r: r.get("id") or 0)
+            data[entity] = rows
+        return data
+
+    # ---- StorageBackend ----
+    def load_all(self):
+        return self._collect(self._tables)
+
+    def replace_all(self, data):
+        for entity, shards in self._tables.items():
+            parts = [[] for _ in shards]
+            for record in data.get(entity, []):
+                shard = self._shard_for(entity, record.get(SHARD_KEYS.get(entity)))
+                parts[shards.index(shard)].append(record)
+            for shard, rows in zip(shards, parts):
+                shard.replace({entity: rows})
+        with self._id_lock, self._id_flock.hold(exclusive=True):
+            if os.path.exists(self._id_file):
+                os.remove(self._id_file)
+
+    def get(self, entity, record_id):
+        return self._owner(entity, record_id)[1]
+
+    def _check_unique(self, entity, record, batch=None):
+        """ValueError if another record already holds one of `record`'s UNIQUE values"""
+        for field in UNIQUE.get(entity, ()):
+            value = record.get(field)
+            if value is None:
+                continue
+            taken = {r["id"] for r in self.find(entity, field, [value])}
+            if batch is not None:
+                taken.add(batch.setdefault((entity, field, value), record.get("id")))
+            if taken - {record.get("id")}:
+                raise ValueError(f"duplicate {entity} {field}: {value}")
+
+    def insert(self, entity, record):
+        shard = self._shard_for(entity, record.get(SHARD_KEYS.get(entity)))
+        with shard.lock, shard.flock.hold(exclusive=True):
+            self._check_unique(entity, record)
+            if entity == "evaluations":
+                # evaluations shard by jd_id, so the pair can only live here
+                eval_id = shard.image().pairs.get((record.get("resume_id"), record.get("jd_id")))
+                if eval_id is not None and eval_id != record.get("id"):
+                    raise ValueError("evaluation already exists for this resume and jd")
+            shard.journal({"op": "insert", "entity": entity, "record": record})
+
+    def update(self, entity, record_id, changes):
+        shard, _ = self._owner(entity, record_id)
+        if shard is None:
+            return
+        key = SHARD_KEYS.get(entity)
+        target = self._shard_for(entity, changes[key]) if key in changes else shard
+        with shard.lock, shard.flock.hold(exclusive=True):
+            record = shard.image().tables[entity].get(record_id)
+            if record is None:
+                return  # deleted (or moved) by another worker meanwhile
+            self._check_unique(entity, {**record, **changes})
+            if target is shard:
+                shard.journal({"op": "update", "entity": entity, "id": record_id, "changes": changes})
+            else:
+                # owner changed: move the record to its new shard
+                target.journal({"op": "insert", "entity": entity, "record": {**record, **changes}})
+                shard.journal({"op": "delete", "entity": entity, "id": record_id})
+
+    def delete(self, entity, record_id):
+        shard, _ = self._owner(entity, record_id)
+        if shard is not None:
+            shard.journal({"op": "delete", "entity": entity, "id": record_id})
+
+    def find(self, entity, field, values):
+        results = []
+        for value in dict.fromkeys(values):
+            if field == SHARD_KEYS.get(entity):
+                shards = [self._shard_for(entity, value)]
+            else:
+                shards = self._tables[entity]
+            for shard in shards:
+                with shard.lock:
+                    results.extend(shard.image().lookup(entity, field, value))
+        return results
+
+    def count(self, entity, field=None, value=None):
+        total = 0
+        for shard in self._tables[entity]:
+            with shard.lock:
+                image = shard.image()
+                if field is None:
+                    total += len(image.tables[entity])
+                else:
+                    total += len(image.indexes[(entity, field)].get(value, ()))
+        return total
+
+    def find_pair(self, resume_id, jd_id):
+        shard = self._shard_for("evaluations", jd_id)
+        with shard.lock:
+            image = shard.image()
+            eval_id = image.pairs.get((resume_id, jd_id))
+            return image.tables["evaluations"].get(eval_id) if eval_id is not None else None
+
+    def page(self, entity, after=None, limit=None, field=None, values=None):
+        shards = self._tables[entity]
+        if field is not None and field == SHARD_KEYS.get(entity) and len(shards) > 1:
+            shards = list({id(s): s for s in (self._shard_for(entity, v) for v in values)}.values())
+        parts = []
+        for shard in shards:
+            with shard.lock:
+                parts.append(shard.image().page(entity, after, limit, field, values))
+        if len(parts) == 1:
+            return parts[0]
+        merged = heapq.merge(*parts, key=lambda r: r["id"])
+        return list(merged)[:limit] if limit is not None else list(merged)
+
+    def next_id(self, entity):
+        """
+        Allocate an id: max id over all shards + 1, never handed out twice
+        (the last issued id per entity is kept in ids.json, shared by workers).
+        """
+        with self._id_lock, self._id_flock.hold(exclusive=True):
+            issued = {}
+            if os.path.exists(self._id_file):
+                with open(self._id_file, "r") as f:
+                    issued = json.load(f)
+            current = issued.get(entity, 0)
+            for shard in self._tables[entity]:
+                with shard.lock:
+                    current = max(current, shard.image().max_id.get(entity, 0))
+            issued[entity] = current + 1
+            _atomic_write_json(self._id_file, issued)
+            return current + 1
+
+    def version(self, entity):
+        """File versions of the entity's shards (snapshot, journal, compaction)"""
+        return tuple(
+            (_stat(s.db_file), _stat(s.journal_file), _stat(s.compacting_file))
+            for s in self._tables[entity]
+        )
+
+    def changes(self, entity, since=None):
+        """Per shard: (image generation, seq); a reloaded image can't tell what changed"""
+        cursor, ids = [], set()
+        shards = self._tables[entity]
+        if since is not None and len(since) != len(shards):
+            since = None  # STORAGE_SHARDS changed
+        for i, shard in enumerate(shards):
+            with shard.lock:
+                image = shard.image()
+                cursor.append((image.generation, image.seq))
+                if ids is not None and since is not None and since[i][0] == image.generation:
+                    ids |= image.changed_since(entity, since[i][1])
+                else:
+                    ids = None
+        return tuple(cursor), ids
+
+    def commit(self, ops, check=None, read=()):
+        """
+        Write a batch under the exclusive locks of every shard it touches
+        (and of every shard of the entities in `read`, which `check` then
+        validates), as one journal entry per shard (all-or-nothing per shard).
+        Raises ValueError (and writes nothing) on a resume/jd pair or UNIQUE conflict.
+        """
+        owners = {}
+        shards = {}
+        for entity in {*read, *(op[1] for op in ops if UNIQUE.get(op[1]))}:
+            for shard in self._tables[entity]:
+                shards[shard.db_file] = shard
+        for op in ops:
+            if op[0] == "insert":
+                shard = self._shard_for(op[1], op[2].get(SHARD_KEYS.get(op[1])))
+                shards[shard.db_file] = shard
+            else:
+                shard, _ = self._owner(op[1], op[2])
+                if shard is None:
+                    continue
+                owners[(op[1], op[2])] = shard
+                shards[shard.db_file] = shard
+                key = SHARD_KEYS.get(op[1])
+                if op[0] == "update" and key in op[3]:
+                    target = self._shard_for(op[1], op[3][key])
+                    shards[target.db_file] = target
+
+        with contextlib.ExitStack() as stack:
+            # fixed lock order, so concurrent batches cannot deadlock
+            for path in sorted(shards):
+                stack.enter_context(shards[path].lock)
+                stack.enter_context(shards[path].flock.hold(exclusive=True))
+            if check is not None:
+                check()
+
+            entries = {path: [] for path in shards}
+            pairs = set()
+            unique = {}
+            for op in ops:
+                entity = op[1]
+                if op[0] == "insert":
+                    record = op[2]
+                    self._check_unique(entity, record, unique)
+                    shard = self._shard_for(entity, record.get(SHARD_KEYS.get(entity)))
+                    if entity == "evaluations":
+                        pair = (record.get("resume_id"), record.get("jd_id"))
+                        eval_id = shard.image().pairs.get(pair)
+                        if pair in pairs or (eval_id is not None and eval_id != record.get("id")):
+                            raise ValueError("evaluation already exists for this resume and jd")
+                        pairs.add(pair)
+                    entries[shard.db_file].append({"op": "insert", "entity": entity, "record": record})
+                    continue
+
+                shard = owners.get((entity, op[2]))
+                record = shard.image().tables[entity].get(op[2]) if shard else None
+                if record is None:
+                    continue  # gone (or moved by another worker) - same as update()/delete()
+                if op[0] == "delete":
+                    entries[shard.db_file].append({"op": "delete", "entity": entity, "id": op[2]})
+                    continue
+                self._check_unique(entity, {**record, **op[3]}, unique)
+                key = SHARD_KEYS.get(entity)
+                target = self._shard_for(entity, op[3][key]) if key in op[3] else shard
+                if target is shard:
+                    entries[shard.db_file].append(
+                        {"op": "update", "entity": entity, "id": op[2], "changes": op[3]})
+                else:
+                    entries[target.db_file].append(
+                        {"op": "insert", "entity": entity, "record": {**record, **op[3]}})
+                    entries[shard.db_file].append({"op": "delete", "entity": entity, "id": op[2]})
+
+            for path, batch in entries.items():
+                if len(batch) == 1:
+                    shards[path].journal(batch[0])
+                elif batch:
+                    shards[path].journal({"op": "batch", "entries": batch})
+
+
+# --------------------------
+# Backend selection
+# --------------------------
+_backend = None
+_backend_lock = threading.Lock()
+_settings = {
+    "STORAGE_BACKEND": os.environ.get("STORAGE_BACKEND", "json"),
+    "STORAGE_SHARDS": STORAGE_SHARDS,
+}
+
+
+def configure(config):
+    """
+    Select the storage backend from a config mapping (app.config):
+    STORAGE_BACKEND = "json" | "sqlite", SQLITE_DB_FILE = path,
+    STORAGE_SHARDS = per-tenant partitions of the json backend.
+    """
+    global _backend
+    with _backend_lock:
+        keys = ("STORAGE_BACKEND", "SQLITE_DB_FILE", "STORAGE_SHARDS")
+        _settings.update({k: config[k] for k in keys if k in config})
+        _backend = None
+
+
+def get_backend() -> StorageBackend:
+    """Return the active backend, creating it on first use"""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                kind = (_settings.get("STORAGE_BACKEND") or "json").lower()
+                if kind == "sqlite":
+                    from utils.sqlite_backend import SQLiteBackend
+                    _backend = SQLiteBackend(_settings.get("SQLITE_DB_FILE"))
+                elif kind == "json":
+                    _backend = JSONBackend(shards=_settings.get("STORAGE_SHARDS"))
+                else:
+                    raise ValueError(f"Unknown storage backend: {kind}")
+    return _backend
+
+
+def _check_entity(entity: str):
+    if entity not in ENTITIES:
+        raise ValueError(f"Unknown entity: {entity}")
+
+
+def _check_index(entity: str, field: str):
+    if field not in INDEXES.get(entity, ()):
+        raise ValueError(f"No index on {entity}.{field}")
+
+
+def _externalize(entity: str, record: dict) -> dict:
+    """Move parsed_text into the blob store, keeping only its content hash"""
+    if entity not in TEXT_ENTITIES or record.get("parsed_text") is None:
+        return record
+    stored = {k: v for k, v in record.items() if k != "parsed_text"}
+    stored["parsed_text_ref"] = blob_store.put_text(record["parsed_text"])
+    return stored
+
+
+# --------------------------
+# Load full database
+# --------------------------
+def load_data():
+    """
+    Return the whole database as {entity: [records]}.
+    The records are shared - never mutate them, write through
+    append_to / update_record / delete_record instead.
+    Prefer the indexed lookup helpers below over scanning these lists.
+    """
+    return get_backend().load_all()
 
 
 # --------------------------
 # Save full database
 # --------------------------
 def save_data(data: dict):
-    """Save the entire JSON database safely"""
-    _init_db()
-    with _lock:
-        with open(DB_FILE, "w") as f:
-            json.dump(data, f, indent=2)
+    """
+    Save the entire database safely.
+    Rewrites everything - prefer the record helpers below for
+    single-record mutations.
+    """
+    get_backend().replace_all(data)
 
 
 # --------------------------
@@ -86,22 +1014,322 @@ def get_evaluations():
     return load_data().get("evaluations", [])
 
 
+# --------------------------
+# Indexed lookups (O(1) / O(result size))
+# --------------------------
+def get_record(entity: str, record_id: int):
+    """Return the record with primary key `record_id`, or None"""
+    _check_entity(entity)
+    return get_backend().get(entity, record_id)
+
+
+def find_by(entity: str, field: str, value):
+    """Return all records whose indexed `field` equals `value`"""
+    _check_index(entity, field)
+    return get_backend().find(entity, field, [value])
+
+
+def find_by_any(entity: str, field: str, values):
+    """Return all records whose indexed `field` is one of `values`"""
+    _check_index(entity, field)
+    return get_backend().find(entity, field, list(values))
+
+
+def count_by(entity: str, field: str, value) -> int:
+    """Number of records whose indexed `field` equals `value`"""
+    _check_index(entity, field)
+    return get_backend().count(entity, field, value)
+
+
+def count(entity: str) -> int:
+    """Number of records in an entity"""
+    _check_entity(entity)
+    return get_backend().count(entity)
+
+
+def find_evaluation(resume_id: int, jd_id: int):
+    """Return the evaluation for a (resume, jd) pair via the unique index, or None"""
+    return get_backend().find_pair(resume_id, jd_id)
+
+
+def next_id(entity: str) -> int:
+    """Next free primary key (max id + 1, never reuses a deleted id)"""
+    _check_entity(entity)
+    return get_backend().next_id(entity)
+
+
+def data_version(entity: str):
+    """Token that changes when `entity` changes (None = unknown), for caches built on it"""
+    _check_entity(entity)
+    return get_backend().version(entity)
+
+
+def changes_since(entity: str, cursor=None):
+    """
+    (new cursor, ids of `entity` records written since `cursor`), for
+    caches kept in step with storage; ids None = rescan the whole entity
+    """
+    _check_entity(entity)
+    return get_backend().changes(entity, cursor)
+
+
+def list_page(entity: str, after: int = None, limit: int = None, field: str = None, values=None):
+    """
+    One page of records in id order, optionally restricted to an indexed
+    `field` matching `values`. Returns (records, next_cursor), where
+    next_cursor is the `after` for the following page (None on the last page).
+    """
+    _check_entity(entity)
+    if field is not None:
+        _check_index(entity, field)
+        values = list(values)
+    rows = get_backend().page(entity, after, limit + 1 if limit else None, field, values)
+    if limit and len(rows) > limit:
+        return rows[:limit], rows[limit - 1]["id"]
+    return rows, None
+
+
+def iter_records(entity: str, field: str = None, values=None, batch: int = 500):
+    """
+    Yield records in id order, one page (`batch` records) in memory at a time.
+    Used by the streaming list responses.
+    """
+    values = list(values) if values is not None else None
+    after = None
+    while True:
+        rows, after = list_page(entity, after, batch, field, values)
+        yield from rows
+        if after is None:
+            return
+
+
 # --------------------------
 # Append Helper
 # --------------------------
 def append_to(entity: str, record: dict):
     """
     Append a new record to an entity list (admins, users, resumes, jds, evaluations).
-    Automatically saves to db.json.
+    O(record), not O(database).
+    Raises ValueError if an evaluation for the same (resume_id, jd_id) exists.
     """
-    data = load_data()
-    if entity not in data:
-        raise ValueError(f"Unknown entity: {entity}")
-    data[entity].append(record)
-    save_data(data)
+    _check_entity(entity)
+    get_backend().insert(entity, _externalize(entity, record))
     return record
 
 
+# --------------------------
+# Update / Delete Helpers
+# --------------------------
+def update_record(entity: str, record_id: int, changes: dict):
+    """Merge `changes` into the record with id `record_id`"""
+    _check_entity(entity)
+    get_backend().update(entity, record_id, _externalize(entity, changes))
+    return changes
+
+
+def delete_record(entity: str, record_id: int):
+    """Remove the record with id `record_id`"""
+    _check_entity(entity)
+    get_backend().delete(entity, record_id)
+
+
+# --------------------------
+# Transactions (read-modify-write + batch commits)
+# --------------------------
+class Transaction:
+    """
+    Records mutations and commits them as one batch when the `with` block
+    exits cleanly (nothing is written if it raises).
+    Reads see the transaction's own pending writes on top of the store.
+    Reads from the store are remembered and re-run at commit under the
+    batch's write locks: if any result changed meanwhile (another worker
+    wrote it), the commit raises ConflictError and writes nothing.
+    """
+
+    def __init__(self, backend: StorageBackend):
+        self.backend = backend
+        self._ops = []
+        # (entity, id) -> pending record, or None if deleted in this transaction
+        self._pending = {}
+        # (kind, entity, args) -> result, for store reads validated at commit
+        self._reads = {}
+
+    def _read(self, kind: str, entity: str, *args):
+        if kind == "get":
+            result = self.backend.get(entity, *args)
+        elif kind == "find":
+            result = self.backend.find(entity, *args)
+        else:
+            result = self.backend.find_pair(*args)
+        self._reads.setdefault((kind, entity, args), _snapshot(kind, result))
+        return result
+
+    def _validate(self):
+        for (kind, entity, args), seen in self._reads.items():
+            fn = {"get": self.backend.get, "find": self.backend.find}.get(kind)
+            current = fn(entity, *args) if fn else self.backend.find_pair(*args)
+            if _snapshot(kind, current) != seen:
+                raise ConflictError(f"{entity} changed during the transaction, retry")
+
+    # ---- reads ----
+    def get_record(self, entity: str, record_id: int):
+        _check_entity(entity)
+        if (entity, record_id) in self._pending:
+            return self._pending[(entity, record_id)]
+        return self._read("get", entity, record_id)
+
+    def find_by(self, entity: str, field: str, value):
+        return self.find_by_any(entity, field, [value])
+
+    def find_by_any(self, entity: str, field: str, values):
+        _check_index(entity, field)
+        values = list(values)
+        results = []
+        for record in self._read("find", entity, field, tuple(values)):
+            key = (entity, record["id"])
+            if key not in self._pending:
+                results.append(record)
+            elif self._pending[key] is not None and self._pending[key].get(field) in values:
+                results.append(self._pending[key])
+        seen = {r["id"] for r in results}
+        for (e, rid), record in self._pending.items():
+            if e == entity and record is not None and rid not in seen and record.get(field) in values:
+                results.append(record)
+        return results
+
+    def find_evaluation(self, resume_id: int, jd_id: int):
+        for (e, _), record in self._pending.items():
+            if e == "evaluations" and record is not None \
+                    and (record.get("resume_id"), record.get("jd_id")) == (resume_id, jd_id):
+                return record
+        record = self._read("pair", "evaluations", resume_id, jd_id)
+        if record is not None and ("evaluations", record["id"]) in self._pending:
+            return None  # deleted or re-keyed in this transaction
+        return record
+
+    def next_id(self, entity: str) -> int:
+        _check_entity(entity)
+        # skip ids already taken by this transaction's pending inserts
+        pending = [rid for (e, rid) in self._pending if e == entity and isinstance(rid, int)]
+        return max([self.backend.next_id(entity), *(rid + 1 for rid in pending)])
+
+    # ---- writes ----
+    def append_to(self, entity: str, record: dict):
+        _check_entity(entity)
+        stored = _externalize(entity, record)
+        if entity == "evaluations" and self.find_evaluation(stored.get("resume_id"), stored.get("jd_id")):
+            raise ValueError("evaluation already exists for this resume and jd")
+        self._ops.append(["insert", entity, stored])
+        self._pending[(entity, stored["id"])] = stored
+        return record
+
+    def update_record(self, entity: str, record_id: int, changes: dict):
+        _check_entity(entity)
+        stored = _externalize(entity, changes)
+        for op in self._ops:
+            if op[0] == "insert" and op[1] == entity and op[2]["id"] == record_id:
+                # record created in this transaction: fold the changes into its insert
+                op[2] = {**op[2], **stored}
+                self._pending[(entity, record_id)] = op[2]
+                return changes
+        current = self.get_record(entity, record_id)
+        if current is not None:
+            self._ops.append(["update", entity, record_id, stored])
+            self._pending[(entity, record_id)] = {**current, **stored}
+        return changes
+
+    def delete_record(self, entity: str, record_id: int):
+        _check_entity(entity)
+        inserted = [op for op in self._ops if op[0] == "insert" and op[1] == entity and op[2]["id"] == record_id]
+        if inserted:
+            # created in this transaction: just drop the insert
+            self._ops = [op for op in self._ops if op not in inserted]
+        else:
+            self._ops.append(["delete", entity, record_id])
+        self._pending[(entity, record_id)] = None
+
+    def commit(self):
+        if self._ops:
+            read = {entity for _, entity, _ in self._reads}
+            self.backend.commit([tuple(op) for op in self._ops], self._validate, read)
+        self._ops, self._pending, self._reads = [], {}, {}
+
+
+def _snapshot(kind: str, result):
+    """Comparable form of a read result (find results keyed by id: order may vary)"""
+    if kind == "find":
+        return {r["id"]: r for r in result}
+    return result
+
+
+@contextlib.contextmanager
+def transaction():
+    """
+    Group reads and writes into one commit:
+
+        with transaction() as tx:
+            resume = tx.get_record("resumes", resume_id)
+            tx.update_record("resumes", resume_id, {...})
+
+    The JSON backend writes the batch as one journal entry per shard under
+    the shards' exclusive locks; SQLite uses a single transaction. Raises
+    ConflictError if something the block read was changed by another
+    writer before the commit (see Transaction).
+    """
+    tx = Transaction(get_backend())
+    yield tx
+    tx.commit()
+
+
+# --------------------------
+# Blob-backed text
+# --------------------------
+def load_text(record: dict) -> str:
+    """
+    Full parsed_text of a resume / jd record, read lazily from the blob store.
+    Records written before the blob store still carry the text inline.
+    """
+    if record.get("parsed_text") is not None:
+        return record["parsed_text"]
+    ref = record.get("parsed_text_ref")
+    return blob_store.get_text(ref) if ref else ""
+
+
+def with_text(record: dict) -> dict:
+    """Copy of a resume / jd record with parsed_text filled in"""
+    return {**record, "parsed_text": load_text(record)}
+
+
+def migrate_texts_to_blobs() -> int:
+    """
+    One-off rewrite of records that still carry parsed_text inline.
+    Returns the number of records moved (0 = nothing to do, nothing written).
+    """
+    data = load_data()
+    moved = 0
+    migrated = {}
+    for entity, rows in data.items():
+        new_rows = []
+        for record in rows:
+            stored = _externalize(entity, record)
+            moved += stored is not record
+            new_rows.append(stored)
+        migrated[entity] = new_rows
+    if moved:
+        save_data(migrated)
+    return moved
+
+
+def gc_blobs() -> int:
+    """Remove blobs no longer referenced by any record"""
+    data = load_data()
+    live = {
+        r.get(ref) for e in TEXT_ENTITIES for r in data.get(e, [])
+        for ref in ("parsed_text_ref", "tokens_ref")
+    }
+    return blob_store.gc(live)
+
+
 # --------------------------
 # Reset database (utility)
 # --------------------------
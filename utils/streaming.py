@@ -0,0 +1,51 @@
+import json
+from flask import Response
+
+from utils.pagination import project
+from utils.storage import iter_records
+
+# ?stream=<format> -> response mimetype
+STREAM_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "json": "application/json",
+}
+
+
+# --------------------------
+# request args
+# --------------------------
+def stream_format(args):
+    """Requested streaming format ("ndjson" / "json"), or None for a normal response"""
+    fmt = (args.get("stream") or "").lower()
+    return fmt if fmt in STREAM_FORMATS else None
+
+
+# --------------------------
+# streamed list response
+# --------------------------
+def stream_records(entity: str, fmt: str, field: str = None, values=None, fields=None, decode=None) -> Response:
+    """
+    Chunked response over storage.iter_records, so memory stays flat
+    whatever the result size and the first record goes out immediately.
+    - ndjson: one JSON record per line
+    - json:   {"status": "success", "data": [...]} encoded incrementally
+    """
+    def rows():
+        for record in iter_records(entity, field, values):
+            yield project(decode(record) if decode else record, fields)
+
+    def ndjson():
+        for record in rows():
+            yield json.dumps(record, separators=(",", ":")) + "\n"
+
+    def array():
+        yield '{"status": "success", "data": ['
+        sep = ""
+        for record in rows():
+            yield sep + json.dumps(record, separators=(",", ":"))
+            sep = ","
+        yield "]}"
+
+    body = ndjson() if fmt == "ndjson" else array()
+    # X-Accel-Buffering: tell nginx not to buffer the whole stream
+    return Response(body, mimetype=STREAM_FORMATS[fmt], headers={"X-Accel-Buffering": "no"})